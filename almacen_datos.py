@@ -0,0 +1,184 @@
+"""
+🔄 Almacén de datos con recarga en caliente
+Guarda la versión vigente del consolidado y vigila el archivo: cuando cambia,
+lo carga en segundo plano y publica la versión nueva de una sola vez. Los
+callbacks que ya tomaron el DataFrame anterior terminan con él y los
+siguientes ven el nuevo, sin reiniciar el servidor.
+
+La vigilancia se activa con config.AUTOREFRESH_DASHBOARD y revisa el archivo
+cada config.INTERVALO_ACTUALIZACION_SEGUNDOS.
+
+Para servir con varios procesos el consolidado se guarda además como Arrow IPC
+(.arrow): cada proceso lo mapea en memoria en lugar de tener su propia copia.
+"""
+
+import functools
+import hashlib
+import os
+import threading
+
+import pandas as pd
+
+import config
+
+COLUMNAS_NUMERICAS = ['CANTIDAD', 'PRECIO_UNITARIO', 'TOTAL_VENTA']
+
+def identidad_archivo(ruta):
+    """(ruta absoluta, tamaño, modificación en ns) del archivo, o None si no existe"""
+    try:
+        estado = os.stat(ruta)
+    except (OSError, TypeError):
+        return None
+    return (os.path.abspath(ruta), estado.st_size, estado.st_mtime_ns)
+
+@functools.lru_cache(maxsize=32)
+def _hash_contenido(identidad):
+    """SHA-1 del archivo; memorizado por identidad, así solo se relee cuando cambia"""
+    resumen = hashlib.sha1()
+    with open(identidad[0], 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(1024 * 1024), b''):
+            resumen.update(bloque)
+    return resumen.hexdigest()
+
+def huella_contenido(ruta):
+    """
+    (tamaño, modificación en ns, SHA-1) del archivo, o None si no existe.
+    El hash solo se calcula cuando cambian el tamaño o la fecha de modificación
+    """
+    identidad = identidad_archivo(ruta)
+    if identidad is None:
+        return None
+    return (identidad[1], identidad[2], _hash_contenido(identidad))
+
+def escribir_dataset_compartido(df, ruta):
+    """
+    Guardar el DataFrame como Arrow IPC sin comprimir, listo para mapearse en memoria.
+    Se escribe en un temporal y se reemplaza de una vez: los procesos que tienen
+    mapeada la versión anterior la siguen leyendo sin errores.
+    """
+    import pyarrow as pa
+
+    carpeta = os.path.dirname(ruta)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    temporal = f"{ruta}.tmp"
+    with pa.OSFile(temporal, 'wb') as archivo:
+        with pa.ipc.new_file(archivo, tabla.schema) as escritor:
+            escritor.write_table(tabla)
+    os.replace(temporal, ruta)
+    return ruta
+
+def leer_dataset_compartido(ruta):
+    """
+    Abrir un dataset Arrow IPC mapeado en memoria. Las columnas numéricas y de
+    fechas (y los textos, con pandas 3) apuntan directamente a las páginas del
+    archivo: el sistema operativo las comparte entre todos los procesos.
+    Los arreglos resultantes son de solo lectura.
+    """
+    import pyarrow as pa
+
+    tabla = pa.ipc.open_file(pa.memory_map(ruta, 'r')).read_all()
+    return tabla.to_pandas(split_blocks=True)
+
+def leer_ventas(ruta):
+    """Leer un consolidado (xlsx, csv, parquet o arrow) con fechas y números ya convertidos"""
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension == '.arrow':
+        # Los tipos ya se normalizaron al escribirlo
+        return leer_dataset_compartido(ruta)
+    if extension == '.csv':
+        df = pd.read_csv(ruta)
+    elif extension == '.parquet':
+        df = pd.read_parquet(ruta)
+    else:
+        df = pd.read_excel(ruta)
+
+    if 'FECHA' in df.columns:
+        df['FECHA'] = pd.to_datetime(df['FECHA'], errors='coerce')
+    for col in COLUMNAS_NUMERICAS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+class AlmacenDatos:
+    """Versión vigente del dataset de ventas, recargada cuando cambia el archivo"""
+    def __init__(self, archivo, cargador=leer_ventas, intervalo=None):
+        self.archivo = archivo
+        self.cargador = cargador
+        self.intervalo = intervalo or config.INTERVALO_ACTUALIZACION_SEGUNDOS
+        self.candado = threading.Lock()
+        self.df = None
+        self.version = 0
+        self.identidad = None
+        self.oyentes = []
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def cargar(self):
+        """Carga inicial en el hilo actual; los errores se propagan a quien llama"""
+        identidad = identidad_archivo(self.archivo)
+        df = self.cargador(self.archivo)
+        self._publicar(df, identidad)
+        return df
+
+    def instantanea(self):
+        """(df, versión) coherentes para usar durante todo un callback"""
+        with self.candado:
+            return self.df, self.version
+
+    def agregar_oyente(self, funcion):
+        """Llamar a funcion(df, version) cada vez que se publique una versión nueva"""
+        self.oyentes.append(funcion)
+
+    def refrescar(self):
+        """Recargar si el archivo cambió. Devuelve True si se publicó una versión nueva"""
+        identidad = identidad_archivo(self.archivo)
+        if identidad is None or identidad == self.identidad:
+            return False
+
+        try:
+            df = self.cargador(self.archivo)
+        except Exception as e:
+            # Lo normal es que el archivo se esté escribiendo: se reintenta en la próxima revisión
+            print(f"⚠️ No se pudo recargar {self.archivo}: {e}")
+            return False
+
+        # Si el archivo cambió mientras se leía, la copia puede estar incompleta
+        if identidad_archivo(self.archivo) != identidad:
+            return False
+
+        self._publicar(df, identidad)
+        print(f"🔄 Datos actualizados desde {self.archivo}: {len(df):,} registros (versión {self.version})")
+        return True
+
+    def _publicar(self, df, identidad):
+        """Cambiar de versión de una sola vez y avisar a los oyentes"""
+        with self.candado:
+            self.df = df
+            self.identidad = identidad
+            self.version += 1
+            version = self.version
+
+        for oyente in list(self.oyentes):
+            try:
+                oyente(df, version)
+            except Exception as e:
+                print(f"⚠️ Error al aplicar la versión {version} de los datos: {e}")
+
+    def iniciar_vigilancia(self):
+        """Revisar el archivo en un hilo de fondo cada `intervalo` segundos"""
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._vigilar, name='vigilancia-datos', daemon=True)
+            self._hilo.start()
+            print(f"👀 Vigilando {self.archivo} cada {self.intervalo} s")
+        return self._hilo
+
+    def _vigilar(self):
+        while not self._detener.wait(self.intervalo):
+            self.refrescar()
+
+    def detener(self):
+        """Terminar la vigilancia"""
+        self._detener.set()
@@ -5,37 +5,47 @@ Sistema avanzado de predicciones y análisis inteligente de ventas
 
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime, timedelta
+import importlib.util
+import itertools
+import threading
 import warnings
 warnings.filterwarnings('ignore')
 
-# Librerías de Machine Learning
-try:
-    from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-    from sklearn.linear_model import LinearRegression
-    from sklearn.preprocessing import StandardScaler, LabelEncoder
-    from sklearn.model_selection import train_test_split
-    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-    from sklearn.cluster import KMeans
-    ML_DISPONIBLE = True
-except ImportError:
-    ML_DISPONIBLE = False
+# Librerías de Machine Learning: solo se comprueba que estén instaladas.
+# scikit-learn y matplotlib se importan al usar cada funcionalidad
+ML_DISPONIBLE = importlib.util.find_spec('sklearn') is not None
+if not ML_DISPONIBLE:
     print("⚠️  Librerías de ML no instaladas. Ejecuta: pip install scikit-learn")
 
 import config
+from anomalias import DetectorAnomalias, DIMENSIONES as DIMENSIONES_ANOMALIAS
+from metricas import instrumentar, registrar_cache
+from perfilado import perfilar_funcion
+
+# Versiones de modelo únicas en el proceso: un AnalisisIA nuevo no repite la de otro
+_VERSIONES_MODELO = itertools.count(1)
 
 class AnalisisIA:
-    def __init__(self, archivo_datos=None):
-        """Inicializar el análisis de IA"""
+    def __init__(self, archivo_datos=None, df=None, base=None):
+        """
+        Inicializar el análisis de IA desde un archivo o un DataFrame ya cargado.
+        base: backend_sql.BaseVentas opcional; los análisis agregados se consultan en ella
+        """
         self.df = None
+        self.base = base
         self.modelo_ventas = None
         self.scaler = None
-        self.le_categoria = LabelEncoder() if ML_DISPONIBLE else None
-        self.le_vendedor = LabelEncoder() if ML_DISPONIBLE else None
-        
-        if archivo_datos:
+        self.cuantiles_residuo = (0.0, 0.0)
+        self.version_modelo = 0  # 0 sin modelo; cada modelo publicado toma la siguiente de _VERSIONES_MODELO
+        self.cache_predicciones = {}
+        self.candado_predicciones = threading.Lock()
+        self.le_categoria = None
+        self.le_vendedor = None
+        
+        if df is not None:
+            self.cargar_dataframe(df)
+        elif archivo_datos:
             self.cargar_datos(archivo_datos)
     
     def cargar_datos(self, archivo):
@@ -43,18 +53,30 @@ class AnalisisIA:
         try:
             self.df = pd.read_excel(archivo)
             self.df['FECHA'] = pd.to_datetime(self.df['FECHA'])
+            self.cache_predicciones = {}
             print(f"✅ Datos cargados: {len(self.df)} registros")
             return True
         except Exception as e:
             print(f"❌ Error al cargar datos: {e}")
             return False
     
+    def cargar_dataframe(self, df):
+        """Usar un DataFrame ya consolidado sin volver a leer el archivo"""
+        if not pd.api.types.is_datetime64_any_dtype(df['FECHA']):
+            df = df.assign(FECHA=pd.to_datetime(df['FECHA']))
+        self.df = df
+        self.cache_predicciones = {}
+        print(f"✅ Datos cargados: {len(self.df)} registros")
+        return True
+    
     def preparar_datos_para_ml(self):
         """Preparar datos para machine learning"""
         if not ML_DISPONIBLE:
             print("❌ Librerías de ML no disponibles")
             return None
         
+        from sklearn.preprocessing import LabelEncoder
+        
         df_ml = self.df.copy()
         
         # Crear características temporales
@@ -65,9 +87,11 @@ class AnalisisIA:
         
         # Codificar variables categóricas
         if 'CATEGORIA' in df_ml.columns:
+            self.le_categoria = LabelEncoder()
             df_ml['CATEGORIA_COD'] = self.le_categoria.fit_transform(df_ml['CATEGORIA'].fillna('Sin Categoría'))
         
         if 'VENDEDOR' in df_ml.columns:
+            self.le_vendedor = LabelEncoder()
             df_ml['VENDEDOR_COD'] = self.le_vendedor.fit_transform(df_ml['VENDEDOR'].fillna('Sin Vendedor'))
         
         # Características de agregación
@@ -76,6 +100,8 @@ class AnalisisIA:
         
         return df_ml
     
+    @instrumentar('analisis_ia.entrenar_modelo_prediccion')
+    @perfilar_funcion('entrenar_modelo_prediccion')
     def entrenar_modelo_prediccion(self):
         """Entrenar modelo para predicción de ventas"""
         if not ML_DISPONIBLE:
@@ -84,6 +110,12 @@ class AnalisisIA:
         
         print("🤖 Entrenando modelo de predicción de ventas...")
         
+        from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+        from sklearn.linear_model import LinearRegression
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.model_selection import train_test_split
+        from sklearn.metrics import mean_absolute_error, mean_squared_error
+        
         df_ml = self.preparar_datos_para_ml()
         if df_ml is None:
             return False
@@ -107,9 +139,9 @@ class AnalisisIA:
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
         
         # Escalar datos
-        self.scaler = StandardScaler()
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        scaler = StandardScaler()
+        X_train_scaled = scaler.fit_transform(X_train)
+        X_test_scaled = scaler.transform(X_test)
         
         # Entrenar múltiples modelos y elegir el mejor
         modelos = {
@@ -130,13 +162,24 @@ class AnalisisIA:
                 mejor_score = score
                 mejor_modelo = modelo
         
-        self.modelo_ventas = mejor_modelo
-        
         # Evaluación detallada
-        y_pred = self.modelo_ventas.predict(X_test_scaled)
+        y_pred = mejor_modelo.predict(X_test_scaled)
         mae = mean_absolute_error(y_test, y_pred)
         rmse = np.sqrt(mean_squared_error(y_test, y_pred))
         
+        # Residuos de validación para intervalos de modelos sin ensamble
+        alfa = (1 - config.NIVEL_CONFIANZA_PREDICCION) / 2
+        residuos = np.asarray(y_test) - y_pred
+        
+        # Publicar el modelo de una vez: el entrenamiento puede correr en segundo
+        # plano mientras el dashboard ya atiende predicciones
+        with self.candado_predicciones:
+            self.scaler = scaler
+            self.modelo_ventas = mejor_modelo
+            self.cuantiles_residuo = tuple(np.quantile(residuos, [alfa, 1 - alfa]))
+            self.version_modelo = next(_VERSIONES_MODELO)
+            self.cache_predicciones = {}
+        
         print(f"\n📊 Métricas del mejor modelo:")
         print(f"   R² Score: {mejor_score:.3f}")
         print(f"   MAE: ${mae:.2f}")
@@ -144,75 +187,175 @@ class AnalisisIA:
         
         return True
     
+    @instrumentar('analisis_ia.predecir_ventas_futuras')
+    @perfilar_funcion('predecir_ventas_futuras')
     def predecir_ventas_futuras(self, dias_adelante=30):
-        """Predecir ventas para los próximos días"""
+        """Predecir ventas para los próximos días con intervalos de predicción"""
         if not ML_DISPONIBLE or self.modelo_ventas is None:
             print("❌ Modelo no entrenado")
             return None
         
+        with self.candado_predicciones:
+            clave = (self.version_modelo, self._clave_serie())
+            cacheado = self.cache_predicciones.get(clave)
+            acierto = cacheado is not None and len(cacheado) >= dias_adelante
+            registrar_cache('predicciones', acierto)
+            if not acierto:
+                # Se calcula el horizonte más largo y los más cortos se sirven como cortes
+                horizonte = max(dias_adelante, config.HORIZONTE_PREDICCION_CACHE,
+                                len(cacheado) if cacheado is not None else 0)
+                cacheado = self._calcular_predicciones(horizonte)
+                self.cache_predicciones = {clave: cacheado}
+        
+        return cacheado.head(dias_adelante).copy()
+    
+    def _clave_serie(self):
+        """Identificar la serie histórica que se está extendiendo"""
+        return ('TOTAL', self.df['FECHA'].max(), len(self.df))
+    
+    def _calcular_predicciones(self, dias_adelante):
+        """Calcular predicciones e intervalos para todo el horizonte en una sola pasada"""
         print(f"🔮 Generando predicciones para los próximos {dias_adelante} días...")
         
-        # Obtener estadísticas históricas
+        # Todo el horizonte se construye y predice en una sola operación
         fecha_actual = self.df['FECHA'].max()
+        fechas_futuras = pd.date_range(fecha_actual + timedelta(days=1), periods=dias_adelante, freq='D')
         
-        predicciones = []
+        X_pred_scaled = self.scaler.transform(self._caracteristicas_futuras(fechas_futuras))
+        prediccion = self.modelo_ventas.predict(X_pred_scaled)
+        limite_inferior, limite_superior = self._intervalos_prediccion(X_pred_scaled, prediccion)
         
-        for i in range(1, dias_adelante + 1):
-            fecha_futura = fecha_actual + timedelta(days=i)
-            
-            # Características basadas en promedios históricos
-            cantidad_promedio = self.df['CANTIDAD'].mean()
-            precio_promedio = self.df['PRECIO_UNITARIO'].mean()
-            
-            # Crear características temporales
-            caracteristicas = [
-                cantidad_promedio,
-                precio_promedio,
-                fecha_futura.year,
-                fecha_futura.month,
-                fecha_futura.weekday(),
-                fecha_futura.day
-            ]
-            
-            # Agregar características categóricas si están disponibles
-            if hasattr(self.le_categoria, 'classes_'):
-                caracteristicas.append(0)  # Categoría más común
-            if hasattr(self.le_vendedor, 'classes_'):
-                caracteristicas.append(0)  # Vendedor más común
-            if 'CATEGORIA' in self.df.columns:
-                caracteristicas.append(self.df.groupby('CATEGORIA')['PRECIO_UNITARIO'].mean().mean())
-            if 'VENDEDOR' in self.df.columns:
-                caracteristicas.append(self.df.groupby('VENDEDOR')['TOTAL_VENTA'].mean().mean())
-            
-            # Ajustar longitud de características
-            X_pred = np.array(caracteristicas).reshape(1, -1)
-            
-            # Asegurar que tenga el número correcto de características
-            if X_pred.shape[1] != self.scaler.n_features_in_:
-                # Rellenar o truncar según sea necesario
-                if X_pred.shape[1] < self.scaler.n_features_in_:
-                    padding = np.zeros((1, self.scaler.n_features_in_ - X_pred.shape[1]))
-                    X_pred = np.hstack([X_pred, padding])
-                else:
-                    X_pred = X_pred[:, :self.scaler.n_features_in_]
-            
-            X_pred_scaled = self.scaler.transform(X_pred)
-            prediccion = self.modelo_ventas.predict(X_pred_scaled)[0]
-            
-            predicciones.append({
-                'FECHA': fecha_futura,
-                'VENTA_PREDICHA': max(0, prediccion),  # No ventas negativas
-                'CONFIANZA': min(100, 85 - (i * 0.5))  # Confianza decrece con el tiempo
-            })
+        venta_predicha = np.maximum(prediccion, 0)  # No ventas negativas
+        limite_inferior = np.maximum(limite_inferior, 0)
+        limite_superior = np.maximum(limite_superior, venta_predicha)
+        
+        # Confianza: 100% menos la semiamplitud relativa del intervalo
+        semiamplitud = (limite_superior - limite_inferior) / 2
+        confianza = 100 * (1 - semiamplitud / np.maximum(venta_predicha, 1e-9))
+        
+        predicciones = pd.DataFrame({
+            'FECHA': fechas_futuras,
+            'VENTA_PREDICHA': venta_predicha,
+            'CONFIANZA': np.clip(confianza, 0, 100),
+            'LIMITE_INFERIOR': limite_inferior,
+            'LIMITE_SUPERIOR': limite_superior
+        })
+        
+        return predicciones
+    
+    def _caracteristicas_futuras(self, fechas):
+        """Construir la matriz de características para un rango de fechas futuras"""
+        n = len(fechas)
+        
+        # Características basadas en promedios históricos
+        columnas = [
+            np.full(n, self.df['CANTIDAD'].mean()),
+            np.full(n, self.df['PRECIO_UNITARIO'].mean()),
+            fechas.year,
+            fechas.month,
+            fechas.dayofweek,
+            fechas.day
+        ]
+        
+        # Agregar características categóricas si están disponibles
+        if hasattr(self.le_categoria, 'classes_'):
+            columnas.append(np.zeros(n))  # Categoría más común
+        if hasattr(self.le_vendedor, 'classes_'):
+            columnas.append(np.zeros(n))  # Vendedor más común
+        if 'CATEGORIA' in self.df.columns:
+            columnas.append(np.full(n, self.df.groupby('CATEGORIA')['PRECIO_UNITARIO'].mean().mean()))
+        if 'VENDEDOR' in self.df.columns:
+            columnas.append(np.full(n, self.df.groupby('VENDEDOR')['TOTAL_VENTA'].mean().mean()))
+        
+        X_pred = np.column_stack(columnas).astype(float)
+        
+        # Asegurar que tenga el número correcto de características
+        num_caracteristicas = self.scaler.n_features_in_
+        if X_pred.shape[1] < num_caracteristicas:
+            X_pred = np.hstack([X_pred, np.zeros((n, num_caracteristicas - X_pred.shape[1]))])
+        
+        return X_pred[:, :num_caracteristicas]
+    
+    def _intervalos_prediccion(self, X_pred_scaled, prediccion):
+        """Calcular límites inferior y superior para todo el horizonte a la vez"""
+        from sklearn.ensemble import RandomForestRegressor
+        
+        alfa = (1 - config.NIVEL_CONFIANZA_PREDICCION) / 2
         
-        return pd.DataFrame(predicciones)
+        if isinstance(self.modelo_ventas, RandomForestRegressor):
+            # Dispersión entre árboles: matriz (árboles x días) en una sola pasada
+            por_arbol = np.stack([arbol.predict(X_pred_scaled) for arbol in self.modelo_ventas.estimators_])
+            return np.quantile(por_arbol, alfa, axis=0), np.quantile(por_arbol, 1 - alfa, axis=0)
+        
+        # Otros modelos: cuantiles empíricos de los residuos de validación
+        residuo_inferior, residuo_superior = self.cuantiles_residuo
+        return prediccion + residuo_inferior, prediccion + residuo_superior
+    
+    def guardar_modelo(self, ruta):
+        """Persistir el modelo entrenado y sus transformadores con joblib"""
+        import os
+        import joblib
+        
+        carpeta = os.path.dirname(ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        
+        estado = {
+            'modelo_ventas': self.modelo_ventas,
+            'scaler': self.scaler,
+            'le_categoria': self.le_categoria,
+            'le_vendedor': self.le_vendedor,
+            'cuantiles_residuo': self.cuantiles_residuo
+        }
+        # Temporal + reemplazo: quien esté cargando el modelo anterior no ve un archivo a medias
+        temporal = f"{ruta}.tmp"
+        joblib.dump(estado, temporal)
+        os.replace(temporal, ruta)
+        
+        print(f"💾 Modelo guardado en: {ruta}")
+        return ruta
+    
+    def cargar_modelo(self, ruta, mmap=False):
+        """
+        Cargar un modelo persistido con guardar_modelo. Con mmap=True los arreglos
+        de numpy se mapean desde el archivo y se comparten entre procesos
+        """
+        import joblib
+        
+        try:
+            estado = joblib.load(ruta, mmap_mode='r' if mmap else None)
+        except Exception as e:
+            print(f"❌ Error al cargar modelo: {e}")
+            return False
+        
+        with self.candado_predicciones:
+            for atributo, valor in estado.items():
+                setattr(self, atributo, valor)
+            self.version_modelo = next(_VERSIONES_MODELO)
+            self.cache_predicciones = {}
+        print(f"✅ Modelo cargado desde: {ruta}")
+        return True
+    
+    def _columnas(self):
+        """Columnas disponibles (de la base SQL si se usa)"""
+        return self.base.columnas if self.base is not None else self.df.columns
+    
+    def _ventas_por(self, columna, valores=('TOTAL_VENTA',)):
+        """Sumas de `valores` por `columna` (groupby de pandas o consulta a la base)"""
+        if self.base is not None:
+            return self.base.agregar(columna, valores=valores).set_index(columna)[list(valores)]
+        return self.df.groupby(columna)[list(valores)].sum()
     
+    @instrumentar('analisis_ia.analizar_tendencias')
     def analizar_tendencias(self):
         """Análisis inteligente de tendencias"""
         print("📈 Analizando tendencias con IA...")
         
         # Ventas por día
-        ventas_diarias = self.df.groupby('FECHA')['TOTAL_VENTA'].sum().reset_index()
+        if self.base is not None:
+            ventas_diarias = self.base.serie(granularidad='D')[0][['FECHA', 'TOTAL_VENTA']]
+        else:
+            ventas_diarias = self.df.groupby('FECHA')['TOTAL_VENTA'].sum().reset_index()
         ventas_diarias = ventas_diarias.sort_values('FECHA')
         
         # Calcular tendencia
@@ -232,9 +375,11 @@ class AnalisisIA:
             color = "amarillo"
         
         # Análisis de estacionalidad
-        if 'FECHA' in self.df.columns:
-            self.df['MES'] = self.df['FECHA'].dt.month
-            ventas_por_mes = self.df.groupby('MES')['TOTAL_VENTA'].sum()
+        if 'FECHA' in self._columnas():
+            if self.base is not None:
+                ventas_por_mes = self.base.sumar_por_parte_fecha('mes')
+            else:
+                ventas_por_mes = self.df.groupby(self.df['FECHA'].dt.month)['TOTAL_VENTA'].sum()
             mes_mayor_venta = ventas_por_mes.idxmax()
             mes_menor_venta = ventas_por_mes.idxmin()
             
@@ -242,7 +387,7 @@ class AnalisisIA:
                     'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
         
         # Productos top y flop
-        productos_ventas = self.df.groupby('PRODUCTO')['TOTAL_VENTA'].sum().sort_values(ascending=False)
+        productos_ventas = self._ventas_por('PRODUCTO')['TOTAL_VENTA'].sort_values(ascending=False)
         
         return {
             'tendencia_general': direccion,
@@ -253,6 +398,8 @@ class AnalisisIA:
             'ventas_diarias': ventas_diarias
         }
     
+    @instrumentar('analisis_ia.segmentar_clientes')
+    @perfilar_funcion('segmentar_clientes')
     def segmentar_clientes(self):
         """Segmentación inteligente de vendedores/productos"""
         if not ML_DISPONIBLE:
@@ -261,21 +408,24 @@ class AnalisisIA:
         
         print("🎯 Segmentando vendedores con IA...")
         
-        if 'VENDEDOR' not in self.df.columns:
+        if 'VENDEDOR' not in self._columnas():
             print("❌ No hay datos de vendedores para segmentar")
             return None
         
         # Crear métricas por vendedor
-        vendedor_metricas = self.df.groupby('VENDEDOR').agg({
-            'TOTAL_VENTA': ['sum', 'mean', 'count'],
-            'CANTIDAD': 'sum',
-            'FECHA': ['min', 'max']
-        }).reset_index()
-        
-        # Aplanar columnas
-        vendedor_metricas.columns = ['VENDEDOR', 'TOTAL_VENTAS', 'VENTA_PROMEDIO', 
-                                   'NUM_TRANSACCIONES', 'TOTAL_PRODUCTOS', 
-                                   'PRIMERA_VENTA', 'ULTIMA_VENTA']
+        if self.base is not None:
+            vendedor_metricas = self.base.resumen_por('VENDEDOR')
+        else:
+            vendedor_metricas = self.df.groupby('VENDEDOR').agg({
+                'TOTAL_VENTA': ['sum', 'mean', 'count'],
+                'CANTIDAD': 'sum',
+                'FECHA': ['min', 'max']
+            }).reset_index()
+            
+            # Aplanar columnas
+            vendedor_metricas.columns = ['VENDEDOR', 'TOTAL_VENTAS', 'VENTA_PROMEDIO', 
+                                       'NUM_TRANSACCIONES', 'TOTAL_PRODUCTOS', 
+                                       'PRIMERA_VENTA', 'ULTIMA_VENTA']
         
         # Calcular días activos
         vendedor_metricas['DIAS_ACTIVO'] = (vendedor_metricas['ULTIMA_VENTA'] - 
@@ -285,6 +435,9 @@ class AnalisisIA:
         caracteristicas_clustering = ['TOTAL_VENTAS', 'VENTA_PROMEDIO', 'NUM_TRANSACCIONES']
         X_cluster = vendedor_metricas[caracteristicas_clustering].fillna(0)
         
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.cluster import KMeans
+        
         # Normalizar
         scaler_cluster = StandardScaler()
         X_cluster_scaled = scaler_cluster.fit_transform(X_cluster)
@@ -318,6 +471,7 @@ class AnalisisIA:
         
         return segmentos_info
     
+    @instrumentar('analisis_ia.generar_recomendaciones')
     def generar_recomendaciones(self):
         """Generar recomendaciones inteligentes"""
         print("💡 Generando recomendaciones con IA...")
@@ -325,11 +479,8 @@ class AnalisisIA:
         recomendaciones = []
         
         # Análisis de rendimiento de productos
-        if 'PRODUCTO' in self.df.columns:
-            productos_rendimiento = self.df.groupby('PRODUCTO').agg({
-                'TOTAL_VENTA': 'sum',
-                'CANTIDAD': 'sum'
-            }).reset_index()
+        if 'PRODUCTO' in self._columnas():
+            productos_rendimiento = self._ventas_por('PRODUCTO', ('TOTAL_VENTA', 'CANTIDAD')).reset_index()
             
             productos_rendimiento['VENTA_POR_UNIDAD'] = (productos_rendimiento['TOTAL_VENTA'] / 
                                                         productos_rendimiento['CANTIDAD'])
@@ -352,9 +503,11 @@ class AnalisisIA:
                 })
         
         # Análisis temporal
-        if 'FECHA' in self.df.columns:
-            self.df['DIA_SEMANA'] = self.df['FECHA'].dt.day_name()
-            ventas_por_dia = self.df.groupby('DIA_SEMANA')['TOTAL_VENTA'].sum()
+        if 'FECHA' in self._columnas():
+            if self.base is not None:
+                ventas_por_dia = self.base.sumar_por_parte_fecha('dia_semana')
+            else:
+                ventas_por_dia = self.df.groupby(self.df['FECHA'].dt.day_name())['TOTAL_VENTA'].sum()
             mejor_dia = ventas_por_dia.idxmax()
             peor_dia = ventas_por_dia.idxmin()
             
@@ -365,8 +518,8 @@ class AnalisisIA:
             })
         
         # Análisis de vendedores
-        if 'VENDEDOR' in self.df.columns:
-            vendedor_performance = self.df.groupby('VENDEDOR')['TOTAL_VENTA'].sum().sort_values(ascending=False)
+        if 'VENDEDOR' in self._columnas():
+            vendedor_performance = self._ventas_por('VENDEDOR')['TOTAL_VENTA'].sort_values(ascending=False)
             if len(vendedor_performance) > 1:
                 top_vendedor = vendedor_performance.index[0]
                 recomendaciones.append({
@@ -377,15 +530,38 @@ class AnalisisIA:
         
         return recomendaciones
     
+    @instrumentar('analisis_ia.detectar_anomalias')
+    def detectar_anomalias(self):
+        """Días atípicos de las ventas totales y de cada categoría, vendedor y producto (ver anomalias.py)"""
+        print("🚨 Detectando anomalías en las ventas diarias...")
+        detector = DetectorAnomalias()
+        if self.base is None:
+            return detector.ajustar(self.df)
+        
+        # Con la base solo se traen las sumas diarias de los días que se puntúan
+        _, fin = self.base.rango_fechas()
+        if fin is None:
+            return detector.anomalias
+        inicio = pd.Timestamp(fin).normalize() - pd.Timedelta(days=detector.dias + detector.ventana - 1)
+        diarias = {None: self.base.ventas_diarias(inicio=inicio)}
+        for dimension in DIMENSIONES_ANOMALIAS:
+            if dimension in self._columnas():
+                diarias[dimension] = self.base.ventas_diarias(dimension, inicio=inicio)
+        return detector.ajustar(diarias)
+    
+    @instrumentar('analisis_ia.crear_reporte_ia')
+    @perfilar_funcion('crear_reporte_ia')
     def crear_reporte_ia(self, archivo_salida='outputs/Reporte_IA.png'):
         """Crear reporte visual con análisis de IA"""
         print("📊 Generando reporte visual de IA...")
         
+        import matplotlib.pyplot as plt
+        
         # Crear directorio si no existe
         import os
         os.makedirs(os.path.dirname(archivo_salida), exist_ok=True)
         
-        fig, axes = plt.subplots(2, 2, figsize=(16, 12))
+        fig, axes = plt.subplots(3, 2, figsize=(16, 18))
         fig.suptitle('🤖 ANÁLISIS INTELIGENTE DE VENTAS', fontsize=20, fontweight='bold')
         
         # 1. Tendencias de ventas
@@ -415,8 +591,8 @@ class AnalisisIA:
             axes[0,1].set_title('🔮 Predicciones', fontweight='bold')
         
         # 3. Top productos
-        if 'PRODUCTO' in self.df.columns:
-            top_productos = self.df.groupby('PRODUCTO')['TOTAL_VENTA'].sum().nlargest(5)
+        if 'PRODUCTO' in self._columnas():
+            top_productos = self._ventas_por('PRODUCTO')['TOTAL_VENTA'].nlargest(5)
             axes[1,0].barh(range(len(top_productos)), top_productos.values, 
                           color=config.COLORES_GRAFICOS[2])
             axes[1,0].set_yticks(range(len(top_productos)))
@@ -425,9 +601,14 @@ class AnalisisIA:
             axes[1,0].set_xlabel('Ventas ($)')
         
         # 4. Métricas clave
-        total_ventas = self.df['TOTAL_VENTA'].sum()
-        productos_unicos = self.df['PRODUCTO'].nunique() if 'PRODUCTO' in self.df.columns else 0
-        venta_promedio = self.df['TOTAL_VENTA'].mean()
+        if self.base is not None:
+            metricas = self.base.metricas()
+            total_ventas, venta_promedio = metricas['total_ventas'], metricas['venta_promedio']
+            productos_unicos = self.base.contar_distintos('PRODUCTO') if 'PRODUCTO' in self._columnas() else 0
+        else:
+            total_ventas = self.df['TOTAL_VENTA'].sum()
+            productos_unicos = self.df['PRODUCTO'].nunique() if 'PRODUCTO' in self.df.columns else 0
+            venta_promedio = self.df['TOTAL_VENTA'].mean()
         
         axes[1,1].axis('off')
         metricas_text = f"""
@@ -447,6 +628,31 @@ class AnalisisIA:
         axes[1,1].text(0.1, 0.9, metricas_text, transform=axes[1,1].transAxes,
                       fontsize=14, verticalalignment='top', fontweight='bold')
         
+        # 5. Anomalías: días atípicos de las ventas totales y las más marcadas de cada serie
+        anomalias = self.detectar_anomalias()
+        recientes = ventas_diarias[ventas_diarias['FECHA'] >= ventas_diarias['FECHA'].max()
+                                   - pd.Timedelta(days=config.DIAS_ANOMALIAS - 1)]
+        axes[2,0].plot(recientes['FECHA'], recientes['TOTAL_VENTA'], color=config.COLOR_PRIMARIO, linewidth=2)
+        anomalias_total = anomalias[anomalias['DIMENSION'] == 'TOTAL']
+        axes[2,0].scatter(anomalias_total['FECHA'], anomalias_total['TOTAL_VENTA'],
+                          color=config.COLORES_GRAFICOS[1], s=80, zorder=3, label='Día atípico')
+        axes[2,0].set_title(f'🚨 Ventas Diarias y Anomalías ({config.DIAS_ANOMALIAS} días)', fontweight='bold')
+        axes[2,0].set_xlabel('Fecha')
+        axes[2,0].set_ylabel('Ventas ($)')
+        axes[2,0].grid(True, alpha=0.3)
+        if not anomalias_total.empty:
+            axes[2,0].legend()
+        
+        axes[2,1].axis('off')
+        principales = anomalias.reindex(anomalias['IMPACTO'].abs().sort_values(ascending=False).index).head(8)
+        # \$ para que matplotlib no tome los importes como fórmulas
+        lineas = [f"{fila.FECHA:%d/%m} {fila.TIPO} {fila.DIMENSION.title()} {str(fila.VALOR)[:18]}: "
+                  f"\\${fila.TOTAL_VENTA:,.0f} (esperado \\${fila.ESPERADO:,.0f})"
+                  for fila in principales.itertuples()]
+        axes[2,1].text(0.02, 0.95, f"🚨 ANOMALÍAS ({len(anomalias)} en total)\n\n" +
+                       ('\n'.join(lineas) if lineas else 'Sin días atípicos'),
+                       transform=axes[2,1].transAxes, fontsize=11, verticalalignment='top')
+        
         plt.tight_layout()
         plt.savefig(archivo_salida, dpi=300, bbox_inches='tight')
         plt.close()
@@ -478,8 +684,12 @@ def main():
         print("❌ Error al cargar datos")
         return
     
+    ejecutar_analisis(ia)
+
+def ejecutar_analisis(ia, entrenar=True, archivo_salida='outputs/Reporte_IA.png'):
+    """Ejecutar el análisis completo sobre datos ya cargados"""
     # Entrenar modelo
-    if ML_DISPONIBLE:
+    if ML_DISPONIBLE and entrenar:
         ia.entrenar_modelo_prediccion()
     
     # Análisis de tendencias
@@ -517,9 +727,10 @@ def main():
     
     # Generar reporte visual
     print("\n" + "="*50)
-    ia.crear_reporte_ia()
+    archivo_reporte = ia.crear_reporte_ia(archivo_salida)
     
     print("\n🎉 ¡Análisis de IA completado!")
+    return archivo_reporte
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,271 @@
+"""
+🚨 Detección de anomalías en las ventas diarias
+Cada serie (ventas totales y ventas diarias de cada categoría, vendedor y
+producto) se compara día a día con los config.VENTANA_ANOMALIAS días anteriores:
+
+- Series regulares (con ventas en al menos config.MIN_DIAS_CON_VENTAS_ANOMALIA
+  días de la ventana): puntaje z robusto del importe, (venta - mediana) / (1.4826 * MAD).
+- Series intermitentes (la mayoría de los productos): una venta suelta en una
+  serie que casi no vende es normal, así que se evalúa la cantidad de
+  transacciones del día con una Poisson de media igual a la de la ventana, y la
+  probabilidad de ver esas o más se expresa como puntaje z. Solo se marcan alzas.
+
+Los días con |z| > config.UMBRAL_ANOMALIA se marcan como alza o caída. IMPACTO es
+la diferencia en pesos con lo esperado: ordena las anomalías para que las series
+chicas no tapen a las que mueven las ventas.
+
+Todas las series se guardan en una matriz (series x días) y se puntúan a la vez
+con ventanas deslizantes de numpy. El detector conserva solo la última ventana
+de cada serie: al llegar días nuevos se puntúan esos días sin recalcular el resto.
+"""
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.special import gammainc, ndtri
+
+import config
+
+DIMENSIONES = ['CATEGORIA', 'VENDEDOR', 'PRODUCTO']
+TOTAL = ('TOTAL', 'Todas las ventas')  # Serie de las ventas totales
+COLUMNAS_ANOMALIAS = ['FECHA', 'DIMENSION', 'VALOR', 'TOTAL_VENTA', 'ESPERADO', 'IMPACTO', 'PUNTAJE', 'TIPO']
+ESCALA_MAD = 1.4826  # MAD -> desviación estándar con datos normales
+ESCALA_DESVIO_MEDIO = 1.2533  # Desvío absoluto medio -> desviación estándar
+PREVIA_POISSON = 0.5  # Transacciones que se suman a cada ventana (una serie sin ventas no tiene media 0)
+
+def puntajes_robustos(matriz, ventana, minimo_dias=None):
+    """
+    (puntaje, esperado, valida) de cada día desde el día `ventana` de la matriz (series x
+    días) respecto de los `ventana` días anteriores. Las ventanas con menos de `minimo_dias`
+    días con ventas o con mediana 0 no son válidas y puntúan 0 (series intermitentes)
+    """
+    minimo_dias = config.MIN_DIAS_CON_VENTAS_ANOMALIA if minimo_dias is None else minimo_dias
+    # Copia ordenada de cada ventana (series, días evaluados, ventana): ordenar ventanas
+    # cortas es mucho más rápido que np.median, y para la MAD el orden no importa
+    ventanas = np.sort(sliding_window_view(matriz[:, :-1], ventana, axis=1), axis=2)
+    mediana = _mediana_ordenada(ventanas)
+    desvios = np.abs(ventanas - mediana[..., None])
+    desvios.sort(axis=2)
+    # Con series asimétricas o con muchos ceros la MAD subestima la dispersión: se toma
+    # la mayor entre ella y el desvío absoluto medio (ambos llevados a desviación estándar)
+    escala = np.maximum(ESCALA_MAD * _mediana_ordenada(desvios), ESCALA_DESVIO_MEDIO * desvios.mean(axis=2))
+
+    valida = (escala > 0) & (mediana > 0) & ((ventanas > 0).sum(axis=2) >= minimo_dias)
+    actual = matriz[:, ventana:]
+    puntaje = np.zeros_like(actual)
+    np.divide(actual - mediana, escala, out=puntaje, where=valida)
+    return puntaje, mediana, valida
+
+def puntajes_poisson(conteos, matriz, ventana):
+    """
+    (puntaje, esperado) de series intermitentes: P(X >= transacciones del día) con X
+    Poisson de media la de los `ventana` días anteriores, como puntaje z (0 si no es
+    un alza). esperado es el importe diario medio de la ventana
+    """
+    # Sumas de las ventanas por diferencia de acumulados
+    acumulado = np.zeros((len(conteos), conteos.shape[1] + 1))
+    np.cumsum(conteos, axis=1, out=acumulado[:, 1:])
+    media = (acumulado[:, ventana:-1] - acumulado[:, :-ventana - 1] + PREVIA_POISSON) / ventana
+    acumulado_ventas = np.zeros_like(acumulado)
+    np.cumsum(matriz, axis=1, out=acumulado_ventas[:, 1:])
+    esperado = (acumulado_ventas[:, ventana:-1] - acumulado_ventas[:, :-ventana - 1]) / ventana
+
+    actual = conteos[:, ventana:]
+    # P(X >= k) = gamma incompleta regularizada P(k, media) para k >= 1
+    cola = np.ones_like(actual)
+    hubo = actual > 0
+    cola[hubo] = gammainc(actual[hubo], media[hubo])
+    puntaje = np.maximum(-ndtri(np.clip(cola, 1e-300, 1.0)), 0.0)
+    return puntaje, esperado
+
+def _mediana_ordenada(ordenadas):
+    """Mediana del último eje de un arreglo ya ordenado en ese eje"""
+    mitad = ordenadas.shape[-1] // 2
+    if ordenadas.shape[-1] % 2:
+        return ordenadas[..., mitad]
+    return (ordenadas[..., mitad - 1] + ordenadas[..., mitad]) / 2
+
+class DetectorAnomalias:
+    """Anomalías de las ventas diarias de todas las series, actualizables día a día"""
+    def __init__(self, ventana=None, umbral=None, dias=None, dimensiones=None):
+        self.ventana = ventana or config.VENTANA_ANOMALIAS
+        self.umbral = umbral or config.UMBRAL_ANOMALIA
+        self.dias = dias or config.DIAS_ANOMALIAS
+        self.dimensiones = DIMENSIONES if dimensiones is None else dimensiones
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Olvidar las series, la ventana guardada y las anomalías"""
+        self.indice = {}  # (dimensión, valor) -> fila de la matriz
+        self.claves = []
+        self.historia = np.zeros((0, self.ventana))  # Ventas de los últimos `ventana` días de cada serie
+        self.historia_transacciones = np.zeros((0, self.ventana))  # Y sus transacciones
+        self.ultima_fecha = None
+        self.anomalias = pd.DataFrame(columns=COLUMNAS_ANOMALIAS)
+
+    @property
+    def ajustado(self):
+        return self.ultima_fecha is not None
+
+    def _filas(self, dimension, valores):
+        """Fila de cada valor de la dimensión, agregando las series nuevas"""
+        filas = np.empty(len(valores), dtype=np.int64)
+        for i, valor in enumerate(valores):
+            clave = (dimension, valor)
+            if clave not in self.indice:
+                self.indice[clave] = len(self.claves)
+                self.claves.append(clave)
+            filas[i] = self.indice[clave]
+        return filas
+
+    def _bloques(self, datos, desde):
+        """
+        (dimensión, valores, día desde `desde`, ventas, transacciones) de cada dimensión.
+        datos es un DataFrame de ventas (una fila por venta) o un dict {dimensión: DataFrame
+        con la dimensión, FECHA diaria, TOTAL_VENTA y TRANSACCIONES} ya agregado (ver
+        BaseVentas.ventas_diarias; sin TRANSACCIONES cada fila cuenta como una)
+        """
+        tablas = datos if isinstance(datos, dict) else dict.fromkeys([None] + self.dimensiones, datos)
+        for dimension, tabla in tablas.items():
+            if dimension is not None and dimension not in tabla.columns:
+                continue
+            fechas = tabla['FECHA'].dt.normalize()
+            dentro = (fechas >= desde).to_numpy()
+            dia = ((fechas[dentro] - desde) // pd.Timedelta(days=1)).to_numpy(dtype=np.int64)
+            ventas = tabla['TOTAL_VENTA'].to_numpy(dtype=float, na_value=0.0)[dentro]
+            if 'TRANSACCIONES' in tabla.columns:
+                transacciones = tabla['TRANSACCIONES'].to_numpy(dtype=float, na_value=0.0)[dentro]
+            else:
+                transacciones = np.ones(len(dia))
+            if dimension is None:
+                yield TOTAL[0], np.zeros(len(dia), dtype=np.int64), [TOTAL[1]], dia, ventas, transacciones
+                continue
+            codigos, valores = pd.factorize(tabla[dimension][dentro])
+            conocidos = codigos >= 0
+            yield (dimension, codigos[conocidos], list(valores), dia[conocidos],
+                   ventas[conocidos], transacciones[conocidos])
+
+    def _matriz(self, datos, desde, num_dias):
+        """
+        (ventas, transacciones) de cada serie en los `num_dias` días desde `desde`
+        (series x días, 0 si no hubo)
+        """
+        posiciones, pesos, conteos = [], [], []
+        for dimension, codigos, valores, dia, ventas, transacciones in self._bloques(datos, desde):
+            filas = self._filas(dimension, valores)[codigos]
+            posiciones.append(filas * num_dias + dia)
+            pesos.append(ventas)
+            conteos.append(transacciones)
+        total = len(self.claves) * num_dias
+        if not posiciones:
+            return np.zeros((len(self.claves), num_dias)), np.zeros((len(self.claves), num_dias))
+        posiciones = np.concatenate(posiciones)
+        return (np.bincount(posiciones, np.concatenate(pesos), minlength=total).reshape(-1, num_dias),
+                np.bincount(posiciones, np.concatenate(conteos), minlength=total).reshape(-1, num_dias))
+
+    def _puntuar(self, matriz, transacciones, primera_fecha):
+        """Anomalías de los días puntuables de la matriz (el primero es primera_fecha + ventana)"""
+        puntaje, esperado, regular = puntajes_robustos(matriz, self.ventana)
+        # Las series intermitentes se puntúan por la cantidad de transacciones
+        puntaje_poisson, media = puntajes_poisson(transacciones, matriz, self.ventana)
+        puntaje = np.where(regular, puntaje, puntaje_poisson)
+        esperado = np.where(regular, esperado, media)
+        filas, dias = np.nonzero(np.abs(puntaje) > self.umbral)
+        claves = [self.claves[fila] for fila in filas]
+        anomalias = pd.DataFrame({
+            'FECHA': primera_fecha + pd.to_timedelta(dias + self.ventana, unit='D'),
+            'DIMENSION': [clave[0] for clave in claves],
+            'VALOR': [clave[1] for clave in claves],
+            'TOTAL_VENTA': matriz[filas, dias + self.ventana],
+            'ESPERADO': esperado[filas, dias],
+            'IMPACTO': matriz[filas, dias + self.ventana] - esperado[filas, dias],
+            'PUNTAJE': puntaje[filas, dias]
+        })
+        anomalias['TIPO'] = np.where(anomalias['PUNTAJE'] > 0, '📈 Alza', '📉 Caída')
+        return _ordenar(anomalias)
+
+    def _guardar(self, nuevas):
+        """Sumar las anomalías nuevas y quitar las que quedaron fuera de los últimos `dias` días"""
+        if not nuevas.empty:
+            self.anomalias = nuevas if self.anomalias.empty else pd.concat([self.anomalias, nuevas], ignore_index=True)
+        limite = self.ultima_fecha - pd.Timedelta(days=self.dias - 1)
+        self.anomalias = _ordenar(self.anomalias[self.anomalias['FECHA'] >= limite])
+
+    def ajustar(self, datos):
+        """Puntuar los últimos `dias` días de todas las series desde cero. Devuelve las anomalías"""
+        self.reiniciar()
+        fechas = _fechas(datos)
+        if fechas.empty:
+            return self.anomalias
+
+        self.ultima_fecha = fechas.max()
+        # Los días anteriores a la primera venta no cuentan como días sin ventas
+        desde = max(fechas.min(), self.ultima_fecha - pd.Timedelta(days=self.dias + self.ventana - 1))
+        num_dias = (self.ultima_fecha - desde).days + 1
+        matriz, transacciones = self._matriz(datos, desde, num_dias)
+        self.historia = _ultimos_dias(matriz, self.ventana)
+        self.historia_transacciones = _ultimos_dias(transacciones, self.ventana)
+        if num_dias > self.ventana:
+            self._guardar(self._puntuar(matriz, transacciones, desde))
+        return self.anomalias
+
+    def actualizar(self, datos):
+        """
+        Puntuar solo los días posteriores al último ya procesado (los datos pueden ser
+        el consolidado completo o solo las ventas nuevas). Devuelve las anomalías nuevas
+        """
+        if not self.ajustado:
+            return self.ajustar(datos)
+        fechas = _fechas(datos)
+        if fechas.empty or fechas.max() <= self.ultima_fecha:
+            return self.anomalias.iloc[0:0]
+
+        desde = self.ultima_fecha + pd.Timedelta(days=1)
+        num_dias = (fechas.max() - self.ultima_fecha).days
+        nuevos, nuevas_transacciones = self._matriz(datos, desde, num_dias)
+        # Las series que aparecen recién no tienen ventas en la ventana guardada
+        matriz = np.hstack([_completar(self.historia, len(self.claves)), nuevos])
+        transacciones = np.hstack([_completar(self.historia_transacciones, len(self.claves)), nuevas_transacciones])
+
+        self.ultima_fecha = fechas.max()
+        self.historia = matriz[:, -self.ventana:]
+        self.historia_transacciones = transacciones[:, -self.ventana:]
+        nuevas = self._puntuar(matriz, transacciones, desde - pd.Timedelta(days=self.ventana))
+        self._guardar(nuevas)
+        return nuevas
+
+    def recientes(self, inicio=None, fin=None, limite=None):
+        """Anomalías dentro de [inicio, fin], las más recientes y marcadas primero"""
+        anomalias = self.anomalias
+        if inicio is not None:
+            anomalias = anomalias[anomalias['FECHA'] >= pd.Timestamp(inicio)]
+        if fin is not None:
+            anomalias = anomalias[anomalias['FECHA'] <= pd.Timestamp(fin)]
+        return anomalias.head(limite) if limite else anomalias
+
+def _fechas(datos):
+    """Fechas (normalizadas, sin vacías) de un DataFrame de ventas o de tablas diarias"""
+    tablas = datos.values() if isinstance(datos, dict) else [datos]
+    fechas = [tabla['FECHA'].dropna() for tabla in tablas if 'FECHA' in tabla.columns]
+    if not fechas:
+        return pd.Series(dtype='datetime64[ns]')
+    return pd.concat(fechas).dt.normalize()
+
+def _ultimos_dias(matriz, ventana):
+    """Últimas `ventana` columnas, con ceros a la izquierda si hay menos días"""
+    historia = np.zeros((len(matriz), ventana))
+    ultimos = matriz[:, -ventana:]
+    historia[:, ventana - ultimos.shape[1]:] = ultimos
+    return historia
+
+def _completar(historia, num_series):
+    """Ventana guardada con filas en cero para las series nuevas"""
+    completa = np.zeros((num_series, historia.shape[1]))
+    completa[:len(historia)] = historia
+    return completa
+
+def _ordenar(anomalias):
+    """Las más recientes primero y, dentro de cada día, las de mayor |impacto| en pesos"""
+    return (anomalias.sort_values(['FECHA', 'IMPACTO'], ascending=False,
+                                  key=lambda columna: columna.abs() if columna.name == 'IMPACTO' else columna)
+            .reset_index(drop=True))
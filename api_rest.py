@@ -0,0 +1,296 @@
+"""
+🔌 API REST de solo lectura
+Expone los números de los dashboards en el mismo servidor Flask de la app Dash
+(mismo puerto, mismos workers de gunicorn), sin tener que leer la página:
+
+    GET /api                     Rutas disponibles y versión de los datos
+    GET /api/kpis                Total, unidades, promedio, transacciones y mejor vendedor
+    GET /api/productos/top?n=10  Productos con más ventas
+    GET /api/vendedores          Ventas y unidades por vendedor
+    GET /api/predicciones?dias=7 Pronóstico diario con intervalos (Dashboard Premium)
+
+Filtros (opcionales): inicio, fin (AAAA-MM-DD), categoria, vendedor.
+Formato: ?formato=json (por defecto) o ?formato=arrow (flujo Arrow IPC, requiere
+pyarrow); también por el encabezado Accept.
+
+Las consultas usan los mismos datos que el tablero (su AlmacenDatos o su base
+SQL) y las predicciones salen de la caché del modelo. Cada respuesta lleva un
+ETag derivado de la versión del archivo de datos (igual en todos los workers; en
+las predicciones también del modelo, propio de cada proceso): con If-None-Match
+se responde 304 sin recalcular. Las respuestas grandes se
+comprimen con gzip si el cliente lo acepta (con un ETag propio, terminado en -gz).
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+import config
+from almacen_datos import identidad_archivo
+
+TIPO_ARROW = 'application/vnd.apache.arrow.stream'
+TIPO_JSON = 'application/json'
+FILTROS = ('inicio', 'fin', 'categoria', 'vendedor')
+SUFIJO_GZIP = '-gz'  # ETag del cuerpo comprimido
+
+class ErrorAPI(Exception):
+    """Error de la petición con su código HTTP"""
+    def __init__(self, mensaje, estado=400):
+        super().__init__(mensaje)
+        self.estado = estado
+
+class ConsultasAPI:
+    """Resultados de la API (DataFrames) a partir del tablero que la sirve"""
+    def __init__(self, tablero):
+        self.tablero = tablero
+
+    @property
+    def base(self):
+        return getattr(self.tablero, 'base', None)
+
+    def version(self):
+        """Versión de los datos: hash de la identidad del archivo (ruta, tamaño, modificación)"""
+        if self.base is not None:
+            identidad = identidad_archivo(self.base.ruta)
+        else:
+            almacen = self.tablero.almacen
+            identidad = almacen.identidad if almacen.df is self.tablero.df else ('ejemplo', id(self.tablero.df))
+        return hashlib.sha1(repr(identidad).encode()).hexdigest()[:16]
+
+    def version_modelo(self):
+        """
+        Versión del modelo de predicción: proceso y versión (única en el proceso) del
+        modelo publicado, '0' si el tablero no tiene IA
+        """
+        ia = getattr(self.tablero, 'ia', None)
+        version = getattr(ia, 'version_modelo', 0)
+        return f"{os.getpid()}.{version}" if version else '0'
+
+    def _filtrar(self, filtros):
+        """Filas del tablero que cumplen los filtros"""
+        df = self.tablero.df
+        if df is None:
+            raise ErrorAPI("No hay datos cargados", 503)
+        mascara = pd.Series(True, index=df.index)
+        if filtros['inicio'] is not None:
+            mascara &= df['FECHA'] >= filtros['inicio']
+        if filtros['fin'] is not None:
+            mascara &= df['FECHA'] <= filtros['fin']
+        for filtro, columna in (('categoria', 'CATEGORIA'), ('vendedor', 'VENDEDOR')):
+            if filtros[filtro] is not None and columna in df.columns:
+                mascara &= df[columna] == filtros[filtro]
+        return df[mascara]
+
+    def kpis(self, filtros):
+        """Una fila con las métricas de la selección"""
+        if self.base is not None:
+            metricas = self.base.metricas(**filtros)
+            vendedores = (self.base.agregar('VENDEDOR', top=1, **filtros)
+                          if 'VENDEDOR' in self.base.columnas else pd.DataFrame())
+        else:
+            df = self._filtrar(filtros)
+            metricas = {
+                'total_ventas': float(df['TOTAL_VENTA'].sum()),
+                'total_productos': int(df['CANTIDAD'].sum()) if 'CANTIDAD' in df.columns else 0,
+                'venta_promedio': float(df['TOTAL_VENTA'].mean()) if len(df) else 0.0,
+                'num_transacciones': len(df)
+            }
+            vendedores = (df.groupby('VENDEDOR')['TOTAL_VENTA'].sum().nlargest(1).reset_index()
+                          if 'VENDEDOR' in df.columns else pd.DataFrame())
+        metricas['mejor_vendedor'] = vendedores['VENDEDOR'].iloc[0] if len(vendedores) else None
+        return pd.DataFrame([metricas])
+
+    def top_productos(self, filtros, n):
+        """PRODUCTO y TOTAL_VENTA de los n productos con más ventas"""
+        if self.base is not None:
+            return self.base.agregar('PRODUCTO', top=n, **filtros)
+        df = self._filtrar(filtros)
+        return df.groupby('PRODUCTO')['TOTAL_VENTA'].sum().nlargest(n).reset_index()
+
+    def vendedores(self, filtros):
+        """VENDEDOR, TOTAL_VENTA y CANTIDAD de cada vendedor, de mayor a menor venta"""
+        if self.base is not None:
+            return self.base.agregar('VENDEDOR', valores=('TOTAL_VENTA', 'CANTIDAD'), **filtros)
+        df = self._filtrar(filtros)
+        return (df.groupby('VENDEDOR')[['TOTAL_VENTA', 'CANTIDAD']].sum()
+                .sort_values('TOTAL_VENTA', ascending=False).reset_index())
+
+    def predicciones(self, dias):
+        """Pronóstico de los próximos `dias` días (caché de predicciones de AnalisisIA)"""
+        ia = getattr(self.tablero, 'ia', None)
+        if ia is None or ia.modelo_ventas is None:
+            raise ErrorAPI("Predicciones no disponibles: el modelo no está entrenado", 503)
+        predicciones = ia.predecir_ventas_futuras(dias)
+        if predicciones is None:
+            raise ErrorAPI("No se pudieron calcular las predicciones", 503)
+        return predicciones
+
+def _leer_filtros(argumentos):
+    """Filtros de la query string (vacíos, 'todas' y 'todos' = sin filtro)"""
+    filtros = {}
+    for filtro in FILTROS:
+        valor = argumentos.get(filtro) or None
+        if filtro in ('inicio', 'fin') and valor is not None:
+            try:
+                valor = pd.Timestamp(valor)
+            except ValueError:
+                raise ErrorAPI(f"Fecha no válida en '{filtro}': {valor}")
+            if filtro == 'fin' and valor == valor.normalize():
+                # Una fecha sin hora incluye todo ese día
+                valor = valor + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+        filtros[filtro] = None if valor in ('todas', 'todos') else valor
+    return filtros
+
+def _leer_entero(argumentos, nombre, defecto, maximo):
+    try:
+        valor = int(argumentos.get(nombre, defecto))
+    except ValueError:
+        raise ErrorAPI(f"'{nombre}' debe ser un número entero")
+    if not 1 <= valor <= maximo:
+        raise ErrorAPI(f"'{nombre}' debe estar entre 1 y {maximo}")
+    return valor
+
+def _formato(peticion):
+    """'json' o 'arrow' según ?formato= o el encabezado Accept"""
+    formato = peticion.args.get('formato')
+    if formato is None:
+        aceptados = peticion.accept_mimetypes
+        formato = 'arrow' if aceptados.best_match([TIPO_JSON, TIPO_ARROW]) == TIPO_ARROW else 'json'
+    if formato not in ('json', 'arrow'):
+        raise ErrorAPI(f"Formato no soportado: {formato} (json o arrow)", 406)
+    return formato
+
+def serializar(df, formato, version):
+    """Cuerpo de la respuesta: JSON {version, datos} o flujo Arrow IPC"""
+    if formato == 'arrow':
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ErrorAPI("El formato arrow requiere pyarrow (pip install pyarrow)", 406)
+        tabla = pa.Table.from_pandas(df, preserve_index=False)
+        salida = pa.BufferOutputStream()
+        with pa.ipc.new_stream(salida, tabla.schema) as escritor:
+            escritor.write_table(tabla)
+        return salida.getvalue().to_pybytes()
+    datos = df.to_json(orient='records', date_format='iso', force_ascii=False)
+    return f'{{"version": "{version}", "datos": {datos}}}'.encode('utf-8')
+
+def instalar_api(tablero):
+    """Agregar las rutas de la API al servidor Flask de un tablero (DashboardVentas o DashboardIA)"""
+    if not config.API_HABILITADA:
+        return
+
+    from flask import Response, abort, jsonify, request
+
+    servidor = tablero.app.server
+    consultas = ConsultasAPI(tablero)
+    prefijo = config.API_PREFIJO.rstrip('/')
+    # Cuerpos ya serializados por (ruta, ETag, codificación): 'identity' o 'gzip'
+    respuestas = OrderedDict()
+    candado = threading.Lock()
+    modelo_vigente = [None]  # Versión del modelo de las predicciones guardadas
+
+    rutas = {
+        '/kpis': ('Métricas de la selección', lambda filtros, argumentos: consultas.kpis(filtros)),
+        '/productos/top': ('Productos con más ventas (?n=)', lambda filtros, argumentos: consultas.top_productos(
+            filtros, _leer_entero(argumentos, 'n', 10, config.API_MAX_TOP))),
+        '/vendedores': ('Ventas por vendedor', lambda filtros, argumentos: consultas.vendedores(filtros)),
+        '/predicciones': ('Pronóstico diario (?dias=)', lambda filtros, argumentos: consultas.predicciones(
+            _leer_entero(argumentos, 'dias', 7, config.API_MAX_DIAS_PREDICCION)))
+    }
+
+    def _version(ruta):
+        """Versión de los datos (y del modelo para las predicciones)"""
+        version = consultas.version()
+        if ruta == '/predicciones':
+            modelo = consultas.version_modelo()
+            # Se reemplazó el modelo: sus predicciones guardadas ya no se van a pedir
+            with candado:
+                if modelo != modelo_vigente[0]:
+                    modelo_vigente[0] = modelo
+                    for clave in [clave for clave in respuestas if clave[0] == ruta]:
+                        del respuestas[clave]
+            version = f"{version}-m{modelo}"
+        return version
+
+    def responder(ruta):
+        if config.API_SOLO_LOCAL and request.remote_addr not in ('127.0.0.1', '::1'):
+            abort(403)
+        try:
+            formato = _formato(request)
+            version = _version(ruta)
+            # Mismos datos + misma petición = misma respuesta
+            consulta = sorted((clave, valor) for clave, valor in request.args.items(multi=True) if clave != 'formato')
+            etag = hashlib.sha1(repr((version, ruta, consulta, formato)).encode()).hexdigest()[:20]
+            # Cada codificación es otra representación: el cuerpo con gzip lleva su propio ETag
+            for vigente in (etag, f"{etag}{SUFIJO_GZIP}"):
+                if vigente in request.if_none_match:
+                    return _encabezados(Response(status=304), vigente)
+
+            with candado:
+                cuerpo = respuestas.get((ruta, etag, 'identity'))
+            guardar = True
+            if cuerpo is None:
+                if ruta == '':
+                    df = pd.DataFrame([{'ruta': f"{prefijo}{nombre}", 'descripcion': descripcion}
+                                       for nombre, (descripcion, _) in rutas.items()])
+                else:
+                    df = rutas[ruta][1](_leer_filtros(request.args), request.args)
+                cuerpo = serializar(df, formato, version)
+                # Si los datos se recargaron mientras se consultaban, el cuerpo puede ser de
+                # la versión nueva: se responde sin guardarlo ni asociarlo al ETag anterior
+                guardar = _version(ruta) == version
+                if guardar:
+                    _guardar(respuestas, candado, (ruta, etag, 'identity'), cuerpo)
+
+            comprimir = request.accept_encodings['gzip'] > 0 and len(cuerpo) >= config.API_MIN_BYTES_GZIP
+            if comprimir:
+                with candado:
+                    comprimido = respuestas.get((ruta, etag, 'gzip'))
+                if comprimido is None:
+                    comprimido = gzip.compress(cuerpo, compresslevel=6)
+                    if guardar:
+                        _guardar(respuestas, candado, (ruta, etag, 'gzip'), comprimido)
+                cuerpo, etag = comprimido, f"{etag}{SUFIJO_GZIP}"
+        except ErrorAPI as e:
+            respuesta = jsonify({'error': str(e)})
+            respuesta.status_code = e.estado
+            return respuesta
+        except ValueError as e:
+            # Columna inexistente en la base SQL u otros datos de entrada no válidos
+            respuesta = jsonify({'error': str(e)})
+            respuesta.status_code = 400
+            return respuesta
+
+        respuesta = Response(cuerpo, mimetype=TIPO_ARROW if formato == 'arrow' else TIPO_JSON)
+        if comprimir:
+            respuesta.headers['Content-Encoding'] = 'gzip'
+        if not guardar:
+            respuesta.headers['Cache-Control'] = 'no-store'
+            respuesta.headers['Vary'] = 'Accept, Accept-Encoding'
+            return respuesta
+        return _encabezados(respuesta, etag)
+
+    # El índice ('') lista las demás rutas
+    for nombre in [''] + list(rutas):
+        servidor.add_url_rule(f"{prefijo}{nombre}", endpoint=f"api{nombre.replace('/', '_') or '_indice'}",
+                              view_func=lambda nombre=nombre: responder(nombre), methods=['GET'])
+    print(f"🔌 API de solo lectura en {prefijo or '/'}")
+
+def _guardar(respuestas, candado, clave, cuerpo):
+    """Guardar un cuerpo en la caché de respuestas, descartando las más antiguas"""
+    with candado:
+        respuestas[clave] = cuerpo
+        while len(respuestas) > config.CACHE_MAX_ENTRADAS_FILTROS:
+            respuestas.popitem(last=False)
+
+def _encabezados(respuesta, etag):
+    """ETag y encabezados de caché para clientes y proxies"""
+    respuesta.set_etag(etag)
+    respuesta.headers['Cache-Control'] = f"public, max-age={config.API_MAX_AGE_SEGUNDOS}, must-revalidate"
+    respuesta.headers['Vary'] = 'Accept, Accept-Encoding'
+    return respuesta
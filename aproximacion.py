@@ -0,0 +1,104 @@
+"""
+🎲 Agregados aproximados por muestreo estratificado
+Con rangos de varios años los gráficos de productos, categorías y vendedores
+agrupan millones de filas. Por encima de config.UMBRAL_FILAS_APROXIMACION se
+responden con una muestra estratificada por categoría y mes, calculada una vez
+por versión de los datos, junto con la semiamplitud del intervalo de confianza
+(config.NIVEL_CONFIANZA_APROXIMACION). El resultado exacto se calcula aparte y
+reemplaza al aproximado cuando termina.
+
+Los filtros se aplican a la muestra igual que a los datos completos: cada fila
+filtrada representa N_h / n_h filas de su estrato (estimación por dominios).
+"""
+
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+import config
+
+COLUMNA_ESTRATO = '_ESTRATO'
+TOP_PRODUCTOS = 10
+
+class MuestraEstratificada:
+    """Muestra de filas por estrato (categoría x mes) con asignación proporcional"""
+    def __init__(self, df, tamano=None, semilla=42):
+        self.df = df
+        tamano = tamano or config.TAMANO_MUESTRA_APROXIMACION
+
+        claves = [df[col] for col in ['CATEGORIA'] if col in df.columns]
+        if 'FECHA' in df.columns:
+            claves.append(df['FECHA'].dt.year * 12 + df['FECHA'].dt.month)
+        if claves:
+            estrato = df.groupby(claves, observed=True, dropna=False, sort=False).ngroup().to_numpy()
+        else:
+            estrato = np.zeros(len(df), dtype=np.int64)
+
+        # Proporcional al tamaño del estrato, con al menos 2 filas para poder estimar la varianza
+        self.tamanos_estrato = np.bincount(estrato)
+        fraccion = min(1.0, tamano / max(len(df), 1))
+        self.muestras_estrato = np.minimum(
+            self.tamanos_estrato, np.maximum(np.ceil(self.tamanos_estrato * fraccion).astype(np.int64), 2))
+
+        # Orden aleatorio dentro de cada estrato y se toman las primeras n_h filas
+        orden = np.argsort(estrato + np.random.default_rng(semilla).random(len(df)))
+        inicio_estrato = np.concatenate([[0], np.cumsum(self.tamanos_estrato)[:-1]])
+        posicion = np.arange(len(df)) - inicio_estrato[estrato[orden]]
+        elegidas = np.sort(orden[posicion < self.muestras_estrato[estrato[orden]]])
+        self.muestra = df.iloc[elegidas].assign(**{COLUMNA_ESTRATO: estrato[elegidas]})
+
+    def sumas(self, muestra, por=None, valor='TOTAL_VENTA', nivel=None):
+        """
+        DataFrame con la suma estimada de `valor` por grupo y su ERROR (semiamplitud
+        del intervalo). muestra: self.muestra ya filtrada. Sin `por`, el total.
+        """
+        nivel = nivel or config.NIVEL_CONFIANZA_APROXIMACION
+        columnas = [COLUMNA_ESTRATO] + ([por] if por else [])
+        filas = muestra[columnas].assign(_Y=muestra[valor].fillna(0).astype(float))
+        if por:
+            filas = filas.dropna(subset=[por])
+        filas['_Y2'] = filas['_Y'] ** 2
+
+        # Sumas de y e y² de cada grupo dentro de cada estrato; las filas de otros
+        # grupos (o fuera del filtro) cuentan como ceros del estrato
+        agrupado = filas.groupby(columnas, observed=True)[['_Y', '_Y2']].sum().reset_index()
+        estrato = agrupado[COLUMNA_ESTRATO].to_numpy()
+        N = self.tamanos_estrato[estrato].astype(float)
+        n = self.muestras_estrato[estrato].astype(float)
+        suma, suma_cuadrados = agrupado['_Y'].to_numpy(), agrupado['_Y2'].to_numpy()
+        cuasivarianza = np.where(n > 1, (suma_cuadrados - suma ** 2 / n) / np.maximum(n - 1, 1), 0.0)
+        agrupado['ESTIMADO'] = N / n * suma
+        agrupado['VARIANZA'] = N ** 2 * (1 - n / N) * np.maximum(cuasivarianza, 0) / n
+
+        totales = agrupado.groupby(por or (lambda _: 'TOTAL'))[['ESTIMADO', 'VARIANZA']].sum()
+        z = NormalDist().inv_cdf(0.5 + nivel / 2)
+        return pd.DataFrame({valor: totales['ESTIMADO'], 'ERROR': z * np.sqrt(totales['VARIANZA'])})
+
+def agregados_exactos(df):
+    """Ventas por producto (top 10), categoría y vendedor agrupando todas las filas"""
+    agregados = {'aproximado': False, 'errores': {}}
+    if 'PRODUCTO' in df.columns:
+        agregados['top_productos'] = df.groupby('PRODUCTO')['TOTAL_VENTA'].sum().nlargest(TOP_PRODUCTOS)
+    if 'CATEGORIA' in df.columns:
+        agregados['por_categoria'] = df.groupby('CATEGORIA')['TOTAL_VENTA'].sum()
+    if 'VENDEDOR' in df.columns:
+        agregados['por_vendedor'] = df.groupby('VENDEDOR')['TOTAL_VENTA'].sum()
+    return agregados
+
+def agregados_aproximados(muestra, muestra_filtrada):
+    """Los mismos agregados estimados con la muestra, con sus errores y el error relativo del total"""
+    agregados = {'aproximado': True, 'errores': {}, 'filas_muestra': len(muestra_filtrada)}
+    for clave, columna in [('top_productos', 'PRODUCTO'), ('por_categoria', 'CATEGORIA'), ('por_vendedor', 'VENDEDOR')]:
+        if columna not in muestra_filtrada.columns:
+            continue
+        estimado = muestra.sumas(muestra_filtrada, columna)
+        if clave == 'top_productos':
+            estimado = estimado.nlargest(TOP_PRODUCTOS, 'TOTAL_VENTA')
+        agregados[clave] = estimado['TOTAL_VENTA']
+        agregados['errores'][clave] = estimado['ERROR']
+
+    total = muestra.sumas(muestra_filtrada)
+    valor_total = total['TOTAL_VENTA'].iloc[0] if len(total) else 0.0
+    agregados['error_relativo'] = total['ERROR'].iloc[0] / valor_total if valor_total else 0.0
+    return agregados
@@ -2,6 +2,10 @@ import pandas as pd
 import os # Biblioteca para manejar archivos y carpetas
 import sys # Para manejo de errores del sistema
 
+import config
+
+from perfilado import activar_perfilado, mostrar_resumen, perfilar_funcion
+
 def ajustar_columnas_excel(worksheet):
     """
     Función para ajustar automáticamente el ancho de las columnas en Excel
@@ -9,14 +13,14 @@ def ajustar_columnas_excel(worksheet):
     for column in worksheet.columns:
         max_length = 0
         column_letter = column[0].column_letter
-        
+
         for cell in column:
             try:
                 if len(str(cell.value)) > max_length:
                     max_length = len(str(cell.value))
             except:
                 pass
-        
+
         # Agregar padding y establecer ancho máximo para evitar columnas muy anchas
         adjusted_width = min(max_length + 2, 50)
         worksheet.column_dimensions[column_letter].width = adjusted_width
@@ -27,88 +31,164 @@ carpeta_ventas = os.path.dirname(os.path.abspath(__file__))  # Carpeta del scrip
 archivo_salida = 'Reporte_Consolidado.xlsx'
 
 # --- LÓGICA DEL SCRIPT ---
-# 1. Verificar que la carpeta existe
-if not os.path.exists(carpeta_ventas):
-    print(f"Error: La carpeta '{carpeta_ventas}' no existe.")
-    sys.exit(1)
-
-# 2. Crear una lista vacía para guardar los datos de cada archivo
-lista_de_datos = []
-
-# 3. Buscar archivos de Excel en la carpeta
-archivos_excel = [archivo for archivo in os.listdir(carpeta_ventas) if archivo.endswith(('.xlsx', '.xls'))]
-
-if not archivos_excel:
-    print(f"No se encontraron archivos de Excel en la carpeta '{carpeta_ventas}'")
-    print("Asegúrate de que los archivos tengan extensión .xlsx o .xls")
-    sys.exit(1)
-
-# 4. Recorrer cada archivo en la carpeta especificada
-print(f"Se encontraron {len(archivos_excel)} archivos de Excel")
-print("Leyendo archivos...")
-
-for archivo in archivos_excel:
-    ruta_completa = os.path.join(carpeta_ventas, archivo)
-    print(f" > Procesando {archivo}...")
-    
-    try:
-        # Leer el archivo de Excel y añadir sus datos a la lista
-        df = pd.read_excel(ruta_completa)
-        if not df.empty:
-            lista_de_datos.append(df)
-        else:
-            print(f"   Advertencia: El archivo {archivo} está vacío")
-    except Exception as e:
-        print(f"   Error al leer {archivo}: {e}")
-        continue
-
-# 5. Combinar todos los datos en un único DataFrame
-if not lista_de_datos:
-    print("Error: No se pudo leer ningún archivo válido.")
-    sys.exit(1)
-
-print("Consolidando información...")
-df_consolidado = pd.concat(lista_de_datos, ignore_index=True)
-
-# 6. (Opcional) Realizar cálculos. Por ejemplo, calcular el total de la venta
-if 'PRECIO_UNITARIO' in df_consolidado.columns and 'CANTIDAD' in df_consolidado.columns:
-    df_consolidado['TOTAL_VENTA'] = df_consolidado['PRECIO_UNITARIO'] * df_consolidado['CANTIDAD']
-    print("Se calculó la columna TOTAL_VENTA")
-else:
-    print("Advertencia: No se encontraron las columnas PRECIO_UNITARIO y CANTIDAD para calcular el total")
-
-# 7. Guardar el resultado en un nuevo archivo de Excel con columnas ajustadas
-try:
-    ruta_salida = os.path.join(carpeta_ventas, archivo_salida)
-    
-    # Usar ExcelWriter para tener más control sobre el formato
-    with pd.ExcelWriter(ruta_salida, engine='openpyxl') as writer:
-        # Escribir los datos
-        df_consolidado.to_excel(writer, index=False, sheet_name='Datos Consolidados')
-        
-        # Obtener el objeto worksheet y ajustar las columnas
-        worksheet = writer.sheets['Datos Consolidados']
-        ajustar_columnas_excel(worksheet)
-    
+def buscar_archivos_excel(carpeta=carpeta_ventas, salida=archivo_salida):
+    """
+    Buscar los archivos de Excel de entrada, excluyendo el propio reporte consolidado
+    """
+    return sorted(archivo for archivo in os.listdir(carpeta)
+                  if archivo.endswith(('.xlsx', '.xls')) and archivo != salida)
+
+@perfilar_funcion('consolidar_datos')
+def consolidar_datos(carpeta=carpeta_ventas, salida=archivo_salida):
+    """
+    Leer todos los archivos de Excel de la carpeta y devolver un único DataFrame.
+    Devuelve None si no hay datos que consolidar.
+    """
+    # 1. Verificar que la carpeta existe
+    if not os.path.exists(carpeta):
+        print(f"Error: La carpeta '{carpeta}' no existe.")
+        return None
+
+    # 2. Crear una lista vacía para guardar los datos de cada archivo
+    lista_de_datos = []
+
+    # 3. Buscar archivos de Excel en la carpeta
+    archivos_excel = buscar_archivos_excel(carpeta, salida)
+
+    if not archivos_excel:
+        print(f"No se encontraron archivos de Excel en la carpeta '{carpeta}'")
+        print("Asegúrate de que los archivos tengan extensión .xlsx o .xls")
+        return None
+
+    # 4. Recorrer cada archivo en la carpeta especificada
+    print(f"Se encontraron {len(archivos_excel)} archivos de Excel")
+    print("Leyendo archivos...")
+
+    for archivo in archivos_excel:
+        ruta_completa = os.path.join(carpeta, archivo)
+        print(f" > Procesando {archivo}...")
+
+        try:
+            # Leer el archivo de Excel y añadir sus datos a la lista
+            df = pd.read_excel(ruta_completa)
+            if not df.empty:
+                lista_de_datos.append(df)
+            else:
+                print(f"   Advertencia: El archivo {archivo} está vacío")
+        except Exception as e:
+            print(f"   Error al leer {archivo}: {e}")
+            continue
+
+    # 5. Combinar todos los datos en un único DataFrame
+    if not lista_de_datos:
+        print("Error: No se pudo leer ningún archivo válido.")
+        return None
+
+    print("Consolidando información...")
+    df_consolidado = pd.concat(lista_de_datos, ignore_index=True)
+
+    # 6. (Opcional) Realizar cálculos. Por ejemplo, calcular el total de la venta
+    if 'PRECIO_UNITARIO' in df_consolidado.columns and 'CANTIDAD' in df_consolidado.columns:
+        df_consolidado['TOTAL_VENTA'] = df_consolidado['PRECIO_UNITARIO'] * df_consolidado['CANTIDAD']
+        print("Se calculó la columna TOTAL_VENTA")
+    else:
+        print("Advertencia: No se encontraron las columnas PRECIO_UNITARIO y CANTIDAD para calcular el total")
+
+    return df_consolidado
+
+@perfilar_funcion('guardar_consolidado')
+def guardar_consolidado(df_consolidado, ruta_salida):
+    """
+    Guardar el resultado en un archivo de Excel con columnas ajustadas,
+    o en CSV si la ruta de salida termina en .csv
+    """
+    if ruta_salida.endswith('.csv'):
+        df_consolidado.to_csv(ruta_salida, index=False)
+    else:
+        # Usar ExcelWriter para tener más control sobre el formato
+        with pd.ExcelWriter(ruta_salida, engine='openpyxl') as writer:
+            # Escribir los datos
+            df_consolidado.to_excel(writer, index=False, sheet_name='Datos Consolidados')
+
+            # Obtener el objeto worksheet y ajustar las columnas
+            worksheet = writer.sheets['Datos Consolidados']
+            ajustar_columnas_excel(worksheet)
+
     print(f"\n¡Proceso finalizado! El reporte ha sido guardado en '{ruta_salida}'")
     print(f"Total de registros consolidados: {len(df_consolidado)}")
     print("✅ Las columnas se han ajustado automáticamente")
-    
-    # Preguntar si desea ejecutar el dashboard
+
+    if config.CREAR_RESPALDO:
+        # Instantánea comprimida; los meses sin cambios no se vuelven a escribir
+        from respaldos import respaldar_consolidado
+        respaldar_consolidado(df_consolidado, ruta_salida)
+    return ruta_salida
+
+def preguntar_dashboard(carpeta=carpeta_ventas):
+    """
+    Preguntar si se desea ejecutar el dashboard interactivo
+    """
     print("\n" + "="*50)
     respuesta = input("¿Deseas ejecutar el dashboard interactivo? (s/n): ").lower()
     if respuesta in ['s', 'si', 'sí', 'y', 'yes']:
-        print("🚀 Iniciando dashboard...")
-        try:
-            import subprocess
-            import sys
-            subprocess.Popen([sys.executable, 'dashboard.py'], cwd=carpeta_ventas)
-            print("✅ Dashboard iniciado en segundo plano")
-            print("📱 Abre tu navegador en: http://localhost:8050")
-        except Exception as e:
-            print(f"❌ Error al iniciar dashboard: {e}")
-            print("💡 Puedes ejecutarlo manualmente con: python dashboard.py")
-    
-except Exception as e:
-    print(f"Error al guardar el archivo: {e}")
-    sys.exit(1)
\ No newline at end of file
+        iniciar_dashboard(carpeta)
+
+def iniciar_dashboard(carpeta=carpeta_ventas):
+    """
+    Iniciar el dashboard interactivo en segundo plano
+    """
+    print("🚀 Iniciando dashboard...")
+    try:
+        import subprocess
+        subprocess.Popen([sys.executable, 'dashboard.py'], cwd=carpeta)
+        print("✅ Dashboard iniciado en segundo plano")
+        print("📱 Abre tu navegador en: http://localhost:8050")
+    except Exception as e:
+        print(f"❌ Error al iniciar dashboard: {e}")
+        print("💡 Puedes ejecutarlo manualmente con: python dashboard.py")
+
+def crear_parser():
+    """Opciones de línea de comandos para ejecuciones desatendidas"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Consolidar archivos de Excel de ventas')
+    parser.add_argument('--carpeta', default=carpeta_ventas, help='Carpeta con los archivos de entrada')
+    parser.add_argument('--salida', default=archivo_salida, help='Nombre del archivo consolidado')
+    parser.add_argument('--formato', choices=['xlsx', 'csv'], default='xlsx', help='Formato del archivo consolidado')
+    dashboard = parser.add_mutually_exclusive_group()
+    dashboard.add_argument('--dashboard', dest='dashboard', action='store_true', default=None,
+                           help='Iniciar el dashboard al terminar sin preguntar')
+    dashboard.add_argument('--sin-dashboard', dest='dashboard', action='store_false',
+                           help='No preguntar por el dashboard (modo batch)')
+    parser.add_argument('--perfilar', action='store_true',
+                        help='Perfilar la consolidación (cProfile/tracemalloc) y mostrar un resumen')
+    return parser
+
+def main(argv=None):
+    """Consolidar los archivos de la carpeta y guardar el reporte"""
+    args = crear_parser().parse_args(argv)
+    if args.perfilar:
+        activar_perfilado()
+
+    df_consolidado = consolidar_datos(args.carpeta, args.salida)
+    if df_consolidado is None:
+        sys.exit(1)
+
+    # 7. Guardar el resultado en un nuevo archivo de Excel con columnas ajustadas
+    nombre_salida = os.path.splitext(args.salida)[0] + '.' + args.formato
+    try:
+        guardar_consolidado(df_consolidado, os.path.join(args.carpeta, nombre_salida))
+    except Exception as e:
+        print(f"Error al guardar el archivo: {e}")
+        sys.exit(1)
+
+    mostrar_resumen()
+
+    # Solo se pregunta si hay una terminal interactiva y no se indicó nada
+    if args.dashboard is None and sys.stdin.isatty():
+        preguntar_dashboard(args.carpeta)
+    elif args.dashboard:
+        iniciar_dashboard(args.carpeta)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+"""
+🦆 Base analítica SQL para el dataset de ventas
+Guarda el consolidado en un archivo local de DuckDB (si está instalado) o de
+SQLite, con índices sobre FECHA, CATEGORIA y VENDEDOR. Los filtros y las
+agregaciones de los dashboards y de AnalisisIA se resuelven como consultas:
+solo viajan a pandas los resultados (sumas, series, filas de la tabla), así
+que el historial puede ser mayor que la memoria disponible.
+
+Se activa con config.USAR_BASE_SQL; el motor se elige con config.MOTOR_SQL.
+duckdb es opcional (pip install duckdb); sqlite3 viene con Python.
+"""
+
+import importlib.util
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+import config
+from almacen_datos import COLUMNAS_NUMERICAS, identidad_archivo
+from series_tiempo import elegir_granularidad
+
+TABLA = 'ventas'
+COLUMNAS_INDICE = ['FECHA', 'CATEGORIA', 'VENDEDOR']
+EXTENSIONES = {'duckdb': '.duckdb', 'sqlite': '.sqlite'}
+# Inicio de cada periodo según la granularidad (ver series_tiempo.GRANULARIDADES)
+PERIODOS_SQL = {
+    'duckdb': {'D': "date_trunc('day', FECHA)",
+               'W-MON': "date_trunc('week', FECHA)",
+               'MS': "date_trunc('month', FECHA)"},
+    'sqlite': {'D': "date(FECHA)",
+               'W-MON': "date(FECHA, 'weekday 0', '-6 days')",
+               'MS': "date(FECHA, 'start of month')"}
+}
+DIA_SQL = {'duckdb': "CAST(FECHA AS DATE)", 'sqlite': "date(FECHA)"}
+# Partes de la fecha para agrupar: mes del año (1-12) y día de la semana (0 = domingo)
+PARTES_FECHA_SQL = {
+    'duckdb': {'mes': "month(FECHA)", 'dia_semana': "dayofweek(FECHA)"},
+    'sqlite': {'mes': "CAST(strftime('%m', FECHA) AS INTEGER)", 'dia_semana': "CAST(strftime('%w', FECHA) AS INTEGER)"}
+}
+DIAS_SEMANA = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+
+def duckdb_disponible():
+    """duckdb instalado"""
+    return importlib.util.find_spec('duckdb') is not None
+
+def elegir_motor(motor=None):
+    """Motor configurado, o SQLite si DuckDB no está instalado"""
+    motor = motor or config.MOTOR_SQL
+    if motor == 'duckdb' and not duckdb_disponible():
+        print("⚠️ duckdb no está instalado (pip install duckdb): se usa SQLite")
+        return 'sqlite'
+    return motor
+
+def archivo_base_sql(motor=None):
+    """Ruta relativa de la base según el motor: outputs/ventas.duckdb u outputs/ventas.sqlite"""
+    return os.path.join('outputs', 'ventas' + EXTENSIONES[elegir_motor(motor)])
+
+def es_base_sql(ruta):
+    """Si la ruta es un archivo de base SQL (por su extensión)"""
+    return os.path.splitext(str(ruta))[1].lower() in EXTENSIONES.values()
+
+def _motor_de_archivo(ruta):
+    extension = os.path.splitext(ruta)[1].lower()
+    return 'duckdb' if extension == EXTENSIONES['duckdb'] else 'sqlite'
+
+def escribir_base_sql(datos, ruta, motor=None):
+    """
+    Crear la base con la tabla de ventas y sus índices.
+    datos puede ser un DataFrame o un iterable de DataFrames (bloques), para
+    cargar historiales que no caben enteros en memoria. Se escribe en un
+    temporal y se reemplaza de una vez: las conexiones abiertas siguen leyendo
+    la versión anterior hasta que se reabren.
+    """
+    motor = motor or _motor_de_archivo(ruta)
+    carpeta = os.path.dirname(ruta)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+    temporal = f"{ruta}.tmp"
+    if os.path.exists(temporal):
+        os.remove(temporal)
+
+    bloques = [datos] if isinstance(datos, pd.DataFrame) else datos
+    columnas = None
+    if motor == 'duckdb':
+        import duckdb
+
+        conexion = duckdb.connect(temporal)
+    else:
+        conexion = sqlite3.connect(temporal)
+
+    try:
+        for bloque in bloques:
+            if columnas is None:
+                columnas = list(bloque.columns)
+            if motor == 'duckdb':
+                conexion.register('bloque', bloque)
+                existe = conexion.execute(
+                    "SELECT count(*) FROM information_schema.tables WHERE table_name = ?", [TABLA]).fetchone()[0]
+                conexion.execute(f"INSERT INTO {TABLA} SELECT * FROM bloque" if existe
+                                 else f"CREATE TABLE {TABLA} AS SELECT * FROM bloque")
+                conexion.unregister('bloque')
+            else:
+                bloque.to_sql(TABLA, conexion, if_exists='append', index=False,
+                              chunksize=config.FILAS_POR_LOTE_SQL)
+
+        for columna in COLUMNAS_INDICE:
+            if columna in (columnas or []):
+                conexion.execute(f'CREATE INDEX idx_{TABLA}_{columna.lower()} ON {TABLA} ("{columna}")')
+        conexion.commit()
+    finally:
+        conexion.close()
+
+    os.replace(temporal, ruta)
+    return ruta
+
+class BaseVentas:
+    """Consultas de filtros y agregados sobre la base SQL (una conexión de solo lectura por hilo)"""
+    def __init__(self, ruta, motor=None):
+        self.ruta = ruta
+        self.motor = motor or _motor_de_archivo(ruta)
+        self._local = threading.local()
+
+    def _conexion(self):
+        """Conexión del hilo actual; se reabre cuando el archivo se reemplaza por una versión nueva"""
+        identidad = identidad_archivo(self.ruta)
+        if identidad is None:
+            raise FileNotFoundError(f"No se encontró la base {self.ruta}")
+        if getattr(self._local, 'identidad', None) != identidad:
+            anterior = getattr(self._local, 'conexion', None)
+            if anterior is not None:
+                anterior.close()
+            if self.motor == 'duckdb':
+                import duckdb
+
+                self._local.conexion = duckdb.connect(self.ruta, read_only=True)
+            else:
+                uri = f"file:{os.path.abspath(self.ruta)}?mode=ro"
+                self._local.conexion = sqlite3.connect(uri, uri=True)
+            self._local.identidad = identidad
+            self._local.columnas = None
+        return self._local.conexion
+
+    def consultar(self, sql, parametros=()):
+        """DataFrame con el resultado de la consulta (FECHA y PERIODO como fechas)"""
+        conexion = self._conexion()
+        if self.motor == 'duckdb':
+            resultado = conexion.execute(sql, list(parametros)).df()
+        else:
+            resultado = pd.read_sql_query(sql, conexion, params=list(parametros))
+        for columna in ('FECHA', 'PERIODO'):
+            if columna in resultado.columns:
+                resultado[columna] = pd.to_datetime(resultado[columna], errors='coerce')
+        return resultado
+
+    @property
+    def columnas(self):
+        """Columnas de la tabla de ventas"""
+        self._conexion()
+        if self._local.columnas is None:
+            self._local.columnas = list(self.consultar(f"SELECT * FROM {TABLA} LIMIT 0").columns)
+        return self._local.columnas
+
+    def _columna(self, columna):
+        """Validar un nombre de columna antes de ponerlo en la consulta"""
+        if columna not in self.columnas:
+            raise ValueError(f"La columna {columna} no existe en la base")
+        return f'"{columna}"'
+
+    def _fecha(self, valor):
+        """Límite de fecha como parámetro: SQLite guarda las fechas como texto ISO"""
+        fecha = pd.Timestamp(valor)
+        return fecha.strftime('%Y-%m-%d %H:%M:%S') if self.motor == 'sqlite' else fecha.to_pydatetime()
+
+    def _donde(self, inicio=None, fin=None, categoria=None, vendedor=None):
+        """Cláusula WHERE y parámetros de los filtros (None = sin filtro)"""
+        condiciones, parametros = [], []
+        if inicio is not None:
+            condiciones.append('FECHA >= ?')
+            parametros.append(self._fecha(inicio))
+        if fin is not None:
+            condiciones.append('FECHA <= ?')
+            parametros.append(self._fecha(fin))
+        if categoria is not None:
+            condiciones.append(f"{self._columna('CATEGORIA')} = ?")
+            parametros.append(categoria)
+        if vendedor is not None:
+            condiciones.append(f"{self._columna('VENDEDOR')} = ?")
+            parametros.append(vendedor)
+        return (' WHERE ' + ' AND '.join(condiciones)) if condiciones else '', parametros
+
+    def contar(self, **filtros):
+        """Número de registros que cumplen los filtros"""
+        donde, parametros = self._donde(**filtros)
+        return int(self.consultar(f"SELECT count(*) AS N FROM {TABLA}{donde}", parametros)['N'].iloc[0])
+
+    def filtrar(self, inicio=None, fin=None, categoria=None, vendedor=None, limite=None):
+        """Filas que cumplen los filtros (a lo sumo `limite`), con los tipos normalizados"""
+        donde, parametros = self._donde(inicio, fin, categoria, vendedor)
+        sql = f"SELECT * FROM {TABLA}{donde} ORDER BY FECHA"
+        if limite is not None:
+            sql += f" LIMIT {int(limite)}"
+        df = self.consultar(sql, parametros)
+        for columna in COLUMNAS_NUMERICAS:
+            if columna in df.columns:
+                df[columna] = pd.to_numeric(df[columna], errors='coerce')
+        return df
+
+    def filtrar_por_bloques(self, inicio=None, fin=None, categoria=None, vendedor=None, tamano=None):
+        """
+        Filas que cumplen los filtros en DataFrames de a `tamano` filas, leídas del
+        cursor a medida que se consumen: la selección completa nunca está en memoria
+        """
+        tamano = tamano or config.FILAS_POR_LOTE_SQL
+        donde, parametros = self._donde(inicio, fin, categoria, vendedor)
+        sql = f"SELECT * FROM {TABLA}{donde} ORDER BY FECHA"
+        conexion = self._conexion()
+        if self.motor == 'duckdb':
+            lector = conexion.execute(sql, list(parametros)).fetch_record_batch(tamano)
+            bloques = (lote.to_pandas() for lote in lector)
+        else:
+            bloques = pd.read_sql_query(sql, conexion, params=list(parametros), chunksize=tamano)
+        for bloque in bloques:
+            if 'FECHA' in bloque.columns:
+                bloque['FECHA'] = pd.to_datetime(bloque['FECHA'], errors='coerce')
+            for columna in COLUMNAS_NUMERICAS:
+                if columna in bloque.columns:
+                    bloque[columna] = pd.to_numeric(bloque[columna], errors='coerce')
+            yield bloque
+
+    def metricas(self, **filtros):
+        """Total y promedio de ventas, unidades y transacciones de la selección"""
+        donde, parametros = self._donde(**filtros)
+        fila = self.consultar(
+            f"SELECT COALESCE(SUM(TOTAL_VENTA), 0) AS TOTAL_VENTAS, COALESCE(SUM(CANTIDAD), 0) AS TOTAL_PRODUCTOS, "
+            f"AVG(TOTAL_VENTA) AS VENTA_PROMEDIO, count(*) AS NUM_TRANSACCIONES FROM {TABLA}{donde}",
+            parametros).iloc[0]
+        return {
+            'total_ventas': float(fila['TOTAL_VENTAS']),
+            'total_productos': int(fila['TOTAL_PRODUCTOS']),
+            'venta_promedio': float(fila['VENTA_PROMEDIO']) if pd.notna(fila['VENTA_PROMEDIO']) else 0.0,
+            'num_transacciones': int(fila['NUM_TRANSACCIONES'])
+        }
+
+    def agregar(self, por, valores=('TOTAL_VENTA',), funcion='SUM', top=None, ascendente=False, **filtros):
+        """
+        DataFrame con `por` y funcion(valor) de cada valor, ordenado por el primero.
+        Equivale a df.groupby(por)[valores].agg(funcion), opcionalmente con nlargest(top).
+        """
+        funcion = funcion.upper()
+        if funcion not in ('SUM', 'AVG', 'COUNT', 'MIN', 'MAX'):
+            raise ValueError(f"Función de agregación no soportada: {funcion}")
+        donde, parametros = self._donde(**filtros)
+        columna = self._columna(por)
+        condicion = f"{columna} IS NOT NULL"
+        donde = f"{donde} AND {condicion}" if donde else f" WHERE {condicion}"
+        seleccion = ', '.join(f'{funcion}({self._columna(valor)}) AS "{valor}"' for valor in valores)
+        sql = (f'SELECT {columna} AS "{por}", {seleccion} FROM {TABLA}{donde} '
+               f'GROUP BY {columna} ORDER BY "{valores[0]}" {"ASC" if ascendente else "DESC"}')
+        if top is not None:
+            sql += f" LIMIT {int(top)}"
+        return self.consultar(sql, parametros)
+
+    def sumar_por_parte_fecha(self, parte, valor='TOTAL_VENTA', **filtros):
+        """
+        Serie con la suma de `valor` por mes del año (1-12) o por día de la semana
+        (nombres en inglés, como Series.dt.day_name)
+        """
+        donde, parametros = self._donde(**filtros)
+        expresion = PARTES_FECHA_SQL[self.motor][parte]
+        resultado = self.consultar(
+            f'SELECT {expresion} AS PARTE, SUM({self._columna(valor)}) AS VALOR FROM {TABLA}{donde} '
+            f'GROUP BY PARTE ORDER BY PARTE', parametros).dropna(subset=['PARTE'])
+        indice = resultado['PARTE'].astype(int)
+        if parte == 'dia_semana':
+            indice = indice.map(lambda dia: DIAS_SEMANA[dia])
+        return pd.Series(resultado['VALOR'].to_numpy(), index=indice.to_numpy(), name=valor)
+
+    def resumen_por(self, por, **filtros):
+        """Por cada valor de `por`: suma, promedio y número de ventas, unidades y primera/última fecha"""
+        donde, parametros = self._donde(**filtros)
+        columna = self._columna(por)
+        condicion = f"{columna} IS NOT NULL"
+        donde = f"{donde} AND {condicion}" if donde else f" WHERE {condicion}"
+        return self.consultar(
+            f'SELECT {columna} AS "{por}", SUM(TOTAL_VENTA) AS TOTAL_VENTAS, AVG(TOTAL_VENTA) AS VENTA_PROMEDIO, '
+            f'count(TOTAL_VENTA) AS NUM_TRANSACCIONES, SUM(CANTIDAD) AS TOTAL_PRODUCTOS, '
+            f'MIN(FECHA) AS PRIMERA_VENTA, MAX(FECHA) AS ULTIMA_VENTA FROM {TABLA}{donde} '
+            f'GROUP BY {columna} ORDER BY {columna}', parametros
+        ).assign(PRIMERA_VENTA=lambda d: pd.to_datetime(d['PRIMERA_VENTA']),
+                 ULTIMA_VENTA=lambda d: pd.to_datetime(d['ULTIMA_VENTA']))
+
+    def contar_distintos(self, columna, **filtros):
+        """Número de valores distintos de una columna"""
+        donde, parametros = self._donde(**filtros)
+        return int(self.consultar(
+            f"SELECT count(DISTINCT {self._columna(columna)}) AS N FROM {TABLA}{donde}", parametros)['N'].iloc[0])
+
+    def serie(self, inicio=None, fin=None, categoria=None, vendedor=None, granularidad=None):
+        """
+        (serie, granularidad) como series_tiempo.serie_ventas: FECHA (inicio del
+        periodo), TOTAL_VENTA, CANTIDAD y DIAS con ventas, agregados en la base
+        """
+        if inicio is None or fin is None:
+            minimo, maximo = self.rango_fechas()
+            if minimo is None:
+                return pd.DataFrame(columns=['FECHA', 'TOTAL_VENTA', 'CANTIDAD', 'DIAS']), 'D'
+            inicio = minimo if inicio is None else max(pd.Timestamp(inicio), minimo)
+            fin = maximo if fin is None else min(pd.Timestamp(fin), maximo)
+        granularidad = granularidad or elegir_granularidad(inicio, fin)
+
+        donde, parametros = self._donde(inicio, fin, categoria, vendedor)
+        periodo = PERIODOS_SQL[self.motor][granularidad]
+        serie = self.consultar(
+            f"SELECT {periodo} AS PERIODO, SUM(TOTAL_VENTA) AS TOTAL_VENTA, SUM(CANTIDAD) AS CANTIDAD, "
+            f"count(DISTINCT {DIA_SQL[self.motor]}) AS DIAS FROM {TABLA}{donde} "
+            f"GROUP BY PERIODO ORDER BY PERIODO", parametros)
+        return serie.rename(columns={'PERIODO': 'FECHA'}).dropna(subset=['FECHA']), granularidad
+
+    def ventas_diarias(self, por=None, inicio=None, fin=None):
+        """TOTAL_VENTA y TRANSACCIONES por día (FECHA) y, si se indica, por cada valor de `por`"""
+        donde, parametros = self._donde(inicio, fin)
+        dia = DIA_SQL[self.motor]
+        if por is None:
+            seleccion, grupos = f"{dia} AS DIA", "DIA"
+        else:
+            columna = self._columna(por)
+            condicion = f"{columna} IS NOT NULL"
+            donde = f"{donde} AND {condicion}" if donde else f" WHERE {condicion}"
+            seleccion, grupos = f'{columna} AS "{por}", {dia} AS DIA', f"{columna}, DIA"
+        diarias = self.consultar(
+            f"SELECT {seleccion}, SUM(TOTAL_VENTA) AS TOTAL_VENTA, count(*) AS TRANSACCIONES "
+            f"FROM {TABLA}{donde} GROUP BY {grupos}", parametros)
+        return diarias.rename(columns={'DIA': 'FECHA'}).assign(FECHA=lambda d: pd.to_datetime(d['FECHA']))
+
+    def valores(self, columna):
+        """Valores distintos (no nulos) de una columna, ordenados"""
+        columna_sql = self._columna(columna)
+        return self.consultar(
+            f'SELECT DISTINCT {columna_sql} AS "{columna}" FROM {TABLA} '
+            f'WHERE {columna_sql} IS NOT NULL ORDER BY 1')[columna].tolist()
+
+    def rango_fechas(self):
+        """(primera, última) fecha con ventas, o (None, None) si la tabla está vacía"""
+        fila = self.consultar(f"SELECT MIN(FECHA) AS INICIO, MAX(FECHA) AS FIN FROM {TABLA}").iloc[0]
+        if pd.isna(fila['INICIO']):
+            return None, None
+        return pd.Timestamp(fila['INICIO']), pd.Timestamp(fila['FIN'])
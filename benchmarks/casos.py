@@ -0,0 +1,141 @@
+"""
+📋 Casos de la suite de benchmarks
+Cada caso recibe el tamaño de los datos y una carpeta temporal, prepara lo que
+necesita (sin medir) y devuelve la función que se cronometra.
+"""
+
+import os
+import sys
+from functools import lru_cache
+
+RAIZ_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ_REPO not in sys.path:
+    sys.path.insert(0, RAIZ_REPO)
+
+# Registro de casos: nombre -> (función de preparación, tamaño máximo)
+CASOS = {}
+
+def caso(nombre, tamano_maximo=None):
+    """Registrar un caso de benchmark"""
+    def registrar(preparar):
+        CASOS[nombre] = (preparar, tamano_maximo)
+        return preparar
+    return registrar
+
+@lru_cache(maxsize=4)
+def datos_ventas(tamano, dias=365):
+    """Ventas sintéticas de aproximadamente `tamano` filas (siempre las mismas)"""
+    from demo_ia import generar_ventas_sinteticas
+
+    df = generar_ventas_sinteticas(dias=dias, transacciones_dia=tamano / dias, semilla=42,
+                                   fecha_fin='2025-06-30')
+    # Los componentes trabajan con texto, como al leer los Excel consolidados
+    return df.astype({'PRODUCTO': str, 'CATEGORIA': str, 'VENDEDOR': str})
+
+@lru_cache(maxsize=2)
+def ia_entrenada(tamano):
+    """AnalisisIA con el modelo ya entrenado para los casos de predicción"""
+    from analisis_ia import AnalisisIA
+
+    ia = AnalisisIA(df=datos_ventas(tamano))
+    ia.entrenar_modelo_prediccion()
+    return ia
+
+def archivos_entrada(tamano, carpeta):
+    """Carpeta con los datos sintéticos repartidos en 4 archivos de Excel (se crea una vez)"""
+    df = datos_ventas(tamano).drop(columns=['TOTAL_VENTA'])
+    entrada = os.path.join(carpeta, f'consolidacion_{tamano}')
+    if not os.path.exists(entrada):
+        os.makedirs(entrada)
+        filas_por_archivo = -(-len(df) // 4)
+        for i, inicio in enumerate(range(0, len(df), filas_por_archivo)):
+            df.iloc[inicio:inicio + filas_por_archivo].to_excel(
+                os.path.join(entrada, f'ventas_{i + 1}.xlsx'), index=False)
+    return entrada
+
+@caso('consolidacion')
+def preparar_consolidacion(tamano, carpeta):
+    """automatizacion.consolidar_datos sobre 4 archivos de Excel"""
+    from automatizacion import consolidar_datos
+
+    entrada = archivos_entrada(tamano, carpeta)
+    return lambda: consolidar_datos(entrada, 'Reporte_Consolidado.xlsx')
+
+def _tablero_filtros(tamano, carpeta_particiones=None):
+    """DashboardIA con solo los datos (sin arrancar Dash ni entrenar el modelo) y sus filtros"""
+    from dashboard_ia import DashboardIA
+
+    tablero = DashboardIA.__new__(DashboardIA)
+    tablero.df = datos_ventas(tamano)
+    tablero.carpeta_particiones = carpeta_particiones
+    inicio = tablero.df['FECHA'].quantile(0.25).strftime('%Y-%m-%d')
+    fin = tablero.df['FECHA'].quantile(0.75).strftime('%Y-%m-%d')
+    categoria = tablero.df['CATEGORIA'].iloc[0]
+    return lambda: tablero.filtrar_datos(inicio, fin, categoria, 'todos')
+
+@caso('filtrar_datos')
+def preparar_filtrar_datos(tamano, carpeta):
+    """DashboardIA.filtrar_datos con rango de fechas y categoría"""
+    return _tablero_filtros(tamano)
+
+@caso('filtrar_datos_particionado')
+def preparar_filtrar_datos_particionado(tamano, carpeta):
+    """DashboardIA.filtrar_datos leyendo solo las particiones mensuales del rango"""
+    from particiones import _leer_particion, actualizar_particiones
+
+    entrada = archivos_entrada(tamano, carpeta)
+    actualizar_particiones(entrada)
+    filtrar = _tablero_filtros(tamano, entrada)
+
+    def medir():
+        # Sin la memoria de particiones leídas: se mide la lectura de los meses del rango
+        _leer_particion.cache_clear()
+        return filtrar()
+    return medir
+
+@caso('crear_graficos')
+def preparar_crear_graficos(tamano, carpeta):
+    """DashboardVentas.crear_graficos sobre todos los datos"""
+    from dashboard import DashboardVentas
+
+    tablero = DashboardVentas.__new__(DashboardVentas)
+    tablero.df = datos_ventas(tamano)
+
+    return lambda: tablero.crear_graficos(tablero.df)
+
+@caso('entrenar_modelo', tamano_maximo=200_000)
+def preparar_entrenar_modelo(tamano, carpeta):
+    """AnalisisIA.entrenar_modelo_prediccion (tres modelos candidatos)"""
+    from analisis_ia import AnalisisIA
+
+    ia = AnalisisIA(df=datos_ventas(tamano))
+    return ia.entrenar_modelo_prediccion
+
+@caso('predecir_ventas', tamano_maximo=200_000)
+def preparar_predecir_ventas(tamano, carpeta):
+    """AnalisisIA.predecir_ventas_futuras a 30 días sin caché"""
+    ia = ia_entrenada(tamano)
+
+    def predecir():
+        ia.cache_predicciones = {}
+        return ia.predecir_ventas_futuras(30)
+    return predecir
+
+@caso('segmentar_clientes')
+def preparar_segmentar_clientes(tamano, carpeta):
+    """AnalisisIA.segmentar_clientes (K-means sobre vendedores)"""
+    from analisis_ia import AnalisisIA
+
+    ia = AnalisisIA(df=datos_ventas(tamano))
+    return ia.segmentar_clientes
+
+@caso('reporte_grafico')
+def preparar_reporte_grafico(tamano, carpeta):
+    """reporte_grafico.generar_reporte_grafico sin ventana"""
+    import matplotlib
+    matplotlib.use('Agg')
+    from reporte_grafico import generar_reporte_grafico
+
+    df = datos_ventas(tamano)
+    salida = os.path.join(carpeta, f'reporte_{tamano}.png')
+    return lambda: generar_reporte_grafico(mostrar=False, df=df, archivo_salida=salida)
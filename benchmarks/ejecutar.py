@@ -0,0 +1,180 @@
+"""
+📏 Suite de benchmarks del sistema de ventas
+Mide tiempo (perf_counter) y memoria máxima (tracemalloc) de los componentes
+principales con varios tamaños de datos, guarda los resultados por commit en
+benchmarks/resultados/ y permite compararlos con una ejecución anterior.
+
+Uso:
+    python benchmarks/ejecutar.py
+    python benchmarks/ejecutar.py --tamanos 10000 100000 1000000 --casos filtrar_datos crear_graficos
+    python benchmarks/ejecutar.py --comparar benchmarks/resultados/a1b2c3d4e5.json --umbral 0.15
+    python benchmarks/ejecutar.py --listar
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from casos import CASOS, RAIZ_REPO
+
+CARPETA_RESULTADOS = os.path.join(RAIZ_REPO, 'benchmarks', 'resultados')
+TAMANOS_POR_DEFECTO = [10_000, 100_000]
+
+def commit_actual():
+    """Hash corto del commit actual, marcado si hay cambios sin confirmar"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short=10', 'HEAD'], cwd=RAIZ_REPO,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        cambios = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=RAIZ_REPO,
+                                 capture_output=True, text=True).stdout.strip()
+        return f'{commit}-modificado' if cambios else commit
+    except (OSError, subprocess.CalledProcessError):
+        return 'sin-git'
+
+def medir(funcion, repeticiones):
+    """
+    Cronometrar la función `repeticiones` veces y hacer una pasada extra con
+    tracemalloc para la memoria máxima (tracemalloc ralentiza, por eso va aparte).
+    Una primera pasada sin medir carga los imports diferidos y las cachés.
+    """
+    funcion()
+
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    try:
+        funcion()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'tiempo_mediana_s': statistics.median(tiempos),
+        'tiempo_min_s': min(tiempos),
+        'memoria_pico_mb': pico / 1024 ** 2
+    }
+
+def ejecutar_suite(casos, tamanos, repeticiones=3, silencioso=True):
+    """Ejecutar los casos indicados para cada tamaño y devolver la lista de resultados"""
+    resultados = []
+    with tempfile.TemporaryDirectory(prefix='benchmarks_ventas_') as carpeta:
+        for tamano in tamanos:
+            for nombre in casos:
+                preparar, tamano_maximo = CASOS[nombre]
+                if tamano_maximo and tamano > tamano_maximo:
+                    print(f"⏭️  {nombre} [{tamano:,}]: omitido (máximo {tamano_maximo:,} filas)")
+                    continue
+
+                # Los componentes imprimen mucho: se silencia su salida durante la medición
+                salida = io.StringIO() if silencioso else sys.stdout
+                try:
+                    with contextlib.redirect_stdout(salida):
+                        funcion = preparar(tamano, carpeta)
+                        medicion = medir(funcion, repeticiones)
+                except Exception as e:
+                    print(f"❌ {nombre} [{tamano:,}]: {e}")
+                    continue
+
+                medicion.update({'caso': nombre, 'tamano': tamano})
+                resultados.append(medicion)
+                print(f"✅ {nombre:<26} [{tamano:>10,}] {medicion['tiempo_mediana_s']:9.3f} s "
+                      f"{medicion['memoria_pico_mb']:9.1f} MB")
+    return resultados
+
+def guardar_resultados(resultados, repeticiones, archivo=None):
+    """Guardar los resultados con los datos del commit y de la máquina"""
+    commit = commit_actual()
+    archivo = archivo or os.path.join(CARPETA_RESULTADOS, f'{commit}.json')
+    os.makedirs(os.path.dirname(archivo) or '.', exist_ok=True)
+
+    datos = {
+        'commit': commit,
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'maquina': f'{platform.system()} {platform.machine()} ({os.cpu_count()} CPU)',
+        'repeticiones': repeticiones,
+        'resultados': resultados
+    }
+    with open(archivo, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
+
+    print(f"\n💾 Resultados guardados en: {archivo}")
+    return archivo
+
+def comparar_resultados(actuales, archivo_referencia, umbral=0.10):
+    """
+    Comparar con una ejecución anterior. Devuelve la lista de regresiones:
+    casos cuyo tiempo o memoria crecen más que el umbral relativo
+    """
+    with open(archivo_referencia, encoding='utf-8') as f:
+        referencia = json.load(f)
+    anteriores = {(r['caso'], r['tamano']): r for r in referencia['resultados']}
+
+    print(f"\n📊 COMPARACIÓN CON {referencia['commit']} ({referencia['fecha']})")
+    print(f"   {'caso':<26} {'tamaño':>10} {'tiempo':>10} {'memoria':>10}")
+
+    regresiones = []
+    for actual in actuales:
+        anterior = anteriores.get((actual['caso'], actual['tamano']))
+        if anterior is None:
+            continue
+
+        cambio_tiempo = actual['tiempo_mediana_s'] / max(anterior['tiempo_mediana_s'], 1e-9) - 1
+        cambio_memoria = actual['memoria_pico_mb'] / max(anterior['memoria_pico_mb'], 1e-9) - 1
+        regresion = cambio_tiempo > umbral or cambio_memoria > umbral
+        if regresion:
+            regresiones.append(actual)
+
+        print(f"{'🔴' if regresion else '🟢'} {actual['caso']:<26} {actual['tamano']:>10,} "
+              f"{cambio_tiempo:>+10.1%} {cambio_memoria:>+10.1%}")
+
+    return regresiones
+
+def main():
+    parser = argparse.ArgumentParser(description='Suite de benchmarks del sistema de ventas')
+    parser.add_argument('--casos', nargs='+', choices=list(CASOS), default=list(CASOS),
+                        help='Casos a ejecutar (todos por defecto)')
+    parser.add_argument('--tamanos', nargs='+', type=int, default=TAMANOS_POR_DEFECTO,
+                        help='Tamaños de datos en filas')
+    parser.add_argument('--repeticiones', type=int, default=3, help='Mediciones por caso y tamaño')
+    parser.add_argument('--salida', help='Archivo JSON de resultados (por defecto benchmarks/resultados/<commit>.json)')
+    parser.add_argument('--comparar', help='JSON de una ejecución anterior con el que comparar')
+    parser.add_argument('--umbral', type=float, default=0.10,
+                        help='Crecimiento relativo que se considera regresión (0.10 = 10%%)')
+    parser.add_argument('--detallado', action='store_true', help='Mostrar la salida de los componentes')
+    parser.add_argument('--listar', action='store_true', help='Listar los casos disponibles')
+    args = parser.parse_args()
+
+    if args.listar:
+        for nombre, (preparar, tamano_maximo) in CASOS.items():
+            limite = f' (hasta {tamano_maximo:,} filas)' if tamano_maximo else ''
+            print(f"   {nombre:<26} {preparar.__doc__}{limite}")
+        return
+
+    print(f"📏 Ejecutando {len(args.casos)} casos con tamaños {args.tamanos}...")
+    resultados = ejecutar_suite(args.casos, args.tamanos, args.repeticiones, not args.detallado)
+    guardar_resultados(resultados, args.repeticiones, args.salida)
+
+    if args.comparar:
+        regresiones = comparar_resultados(resultados, args.comparar, args.umbral)
+        if regresiones:
+            print(f"\n⚠️ {len(regresiones)} regresiones por encima del {args.umbral:.0%}")
+            sys.exit(1)
+        print("\n✅ Sin regresiones")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+⏱️ Reporte de tiempos de importación
+Ejecuta `python -X importtime` sobre los puntos de entrada del sistema y
+resume cuánto tarda cada uno en importarse y qué librerías pesan más.
+
+Uso:
+    python benchmarks/importtime.py
+    python benchmarks/importtime.py dashboard main --repeticiones 7 --top 15
+    python benchmarks/importtime.py --json resultados_importacion.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULOS_POR_DEFECTO = ['main', 'pipeline', 'analisis_ia', 'dashboard', 'dashboard_ia']
+
+def parsear_importtime(salida):
+    """
+    Convertir la salida de -X importtime en una lista de
+    (modulo, propio_us, acumulado_us, nivel)
+    """
+    registros = []
+    for linea in salida.splitlines():
+        if not linea.startswith('import time:') or 'self [us]' in linea:
+            continue
+        try:
+            propio, acumulado, nombre = linea[len('import time:'):].split('|', 2)
+        except ValueError:
+            continue
+        # La indentación del nombre indica la profundidad en el árbol de imports
+        nivel = (len(nombre) - len(nombre.lstrip(' ')) - 1) // 2
+        registros.append((nombre.strip(), int(propio), int(acumulado), nivel))
+    return registros
+
+def medir_importacion(modulo, repeticiones=5):
+    """
+    Importar el módulo en procesos nuevos y devolver la mediana del tiempo
+    total y el acumulado de cada librería de primer nivel (en ms)
+    """
+    totales = []
+    librerias = {}
+    for _ in range(repeticiones):
+        resultado = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+                                   cwd=RAIZ_REPO, capture_output=True, text=True)
+        if resultado.returncode != 0:
+            raise RuntimeError(f"No se pudo importar {modulo}: {resultado.stderr.strip().splitlines()[-1]}")
+
+        # La salida está en postorden: los hijos directos del módulo (nivel 1)
+        # aparecen justo antes de su línea de nivel 0
+        hijos = []
+        for nombre, _, acumulado, nivel in parsear_importtime(resultado.stderr):
+            if nivel == 1:
+                hijos.append((nombre, acumulado))
+            elif nivel == 0:
+                if nombre == modulo:
+                    totales.append(acumulado / 1000)
+                    for hijo, acumulado_hijo in hijos:
+                        librerias.setdefault(hijo, []).append(acumulado_hijo / 1000)
+                hijos = []
+
+    return {
+        'modulo': modulo,
+        'total_ms': statistics.median(totales),
+        'min_ms': min(totales),
+        'librerias_ms': {nombre: statistics.median(valores) for nombre, valores in librerias.items()}
+    }
+
+def mostrar_reporte(resultados, top=10):
+    """Imprimir el resumen de tiempos de importación"""
+    print("\n⏱️  TIEMPOS DE IMPORTACIÓN (mediana)")
+    print("=" * 50)
+    for resultado in resultados:
+        print(f"\n📦 {resultado['modulo']}: {resultado['total_ms']:.0f} ms "
+              f"(mín. {resultado['min_ms']:.0f} ms)")
+        pesadas = sorted(resultado['librerias_ms'].items(), key=lambda x: x[1], reverse=True)[:top]
+        for nombre, ms in pesadas:
+            print(f"   {nombre:<30} {ms:8.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description='Medir el tiempo de importación de los puntos de entrada')
+    parser.add_argument('modulos', nargs='*', default=MODULOS_POR_DEFECTO, help='Módulos a medir')
+    parser.add_argument('--repeticiones', type=int, default=5, help='Procesos por módulo')
+    parser.add_argument('--top', type=int, default=10, help='Librerías más pesadas a mostrar')
+    parser.add_argument('--json', help='Guardar los resultados en este archivo JSON')
+    args = parser.parse_args()
+
+    resultados = []
+    for modulo in args.modulos:
+        try:
+            resultados.append(medir_importacion(modulo, args.repeticiones))
+        except RuntimeError as e:
+            print(f"❌ {e}")
+
+    mostrar_reporte(resultados, args.top)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as archivo:
+            json.dump(resultados, archivo, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados guardados en: {args.json}")
+
+if __name__ == "__main__":
+    main()
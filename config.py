@@ -16,6 +16,19 @@ FIGURA_WIDTH = 20
 FIGURA_HEIGHT = 15
 DPI_REPORTE = 300
 ESTILO_GRAFICO = "seaborn-v0_8"
+UMBRAL_FILAS_DENSIDAD = 20000  # Por encima se dibuja densidad 2D en vez de dispersión
+CELDAS_DENSIDAD = 60  # Celdas por eje del histograma 2D
+MAX_FILAS_HEATMAP = 20  # Vendedores visibles en el mapa de calor (el resto va a 'Otros')
+MAX_COLUMNAS_HEATMAP = 12  # Categorías visibles en el mapa de calor (el resto va a 'Otros')
+MAX_CELDAS_ANOTADAS = 150  # Sin anotaciones por encima de este número de celdas
+
+# 📉 CONFIGURACIÓN DE SERIES TEMPORALES
+PUNTOS_MAXIMOS_SERIE = 1000  # Por encima, las series de los gráficos se reducen conservando la forma
+METODO_REDUCCION_SERIE = "lttb"  # "lttb" o "minmax" (conserva siempre picos y valles)
+USAR_WEBGL = True  # Dibujar las series densas con Scattergl
+UMBRAL_PUNTOS_WEBGL = 500  # Puntos a partir de los que se usa WebGL
+UMBRAL_PUNTOS_MARCADORES = 200  # Por encima se dibuja solo la línea, sin marcadores
+PUNTOS_MAXIMOS_GRANULARIDAD = 400  # Se agrega por día, semana o mes: la más fina que no pase de estos puntos
 
 # 📋 CONFIGURACIÓN DE COLUMNAS ESPERADAS
 COLUMNAS_REQUERIDAS = {
@@ -84,6 +97,11 @@ COLORES_GRAFICOS = [
 # 📊 CONFIGURACIÓN DE EXPORTACIÓN
 FORMATOS_EXPORTACION = ['xlsx', 'csv', 'png', 'pdf']
 INCLUIR_GRAFICOS_EN_EXCEL = True
+CARPETA_EXPORTACIONES = "outputs/exportaciones"  # Archivos que se descargan desde los dashboards
+FILAS_POR_BLOQUE_EXPORTACION = 50000  # Filas en memoria a la vez al escribir CSV/Excel
+MAX_EXPORTACIONES_SIMULTANEAS = 2
+HORAS_CONSERVAR_EXPORTACIONES = 24  # Luego se borran al iniciar otra exportación
+INTERVALO_PROGRESO_EXPORTACION_MS = 500
 
 # 💾 CONFIGURACIÓN DE RESPALDO
 CREAR_RESPALDO = True
@@ -105,8 +123,62 @@ FORMATO_MONEDA = "$"
 SEPARADOR_MILES = ","
 DECIMALES_MONEDA = 0
 
+# 🤖 CONFIGURACIÓN DE INTELIGENCIA ARTIFICIAL
+NIVEL_CONFIANZA_PREDICCION = 0.90  # Cobertura de los intervalos de predicción
+HORIZONTE_PREDICCION_CACHE = 30  # Días que se pronostican de una vez y se reutilizan como cortes
+
 # 🎛️ CONFIGURACIÓN AVANZADA
 MODO_DEBUG = True
 LOG_LEVEL = "INFO"  # DEBUG, INFO, WARNING, ERROR
 USAR_CACHE = True
 TIMEOUT_OPERACIONES = 30  # segundos
+
+# 🗃️ CONFIGURACIÓN DE CACHÉ (Streamlit)
+CACHE_TTL_SEGUNDOS = None  # Vida máxima de cada entrada (None = hasta que cambie el archivo)
+CACHE_MAX_VERSIONES = 2  # Versiones del consolidado (datos y modelo) que se mantienen en memoria
+CACHE_MAX_ENTRADAS_FILTROS = 32  # Combinaciones de filtros guardadas por cada caché de agregados
+
+# 🦆 CONFIGURACIÓN DE BASE ANALÍTICA (SQL)
+USAR_BASE_SQL = False  # Resolver filtros y agregados con consultas sobre una base local
+MOTOR_SQL = "duckdb"  # duckdb (pip install duckdb) o sqlite; sin duckdb se usa sqlite
+FILAS_POR_LOTE_SQL = 50000  # Filas por inserción al crear la base
+LIMITE_FILAS_TABLA_SQL = 5000  # Filas que se traen de la base para la tabla de detalle
+
+# 🗂️ CONFIGURACIÓN DE PARTICIONES
+# Acelera la consolidación (solo se releen los meses que cambian) y los filtros por rango, pero los
+# dashboards siguen cargando el historial completo: lo usan el modelo, los resúmenes y las anomalías
+USAR_PARTICIONES = False  # Guardar el consolidado también como un Parquet por mes (requiere pyarrow)
+CARPETA_PARTICIONES = "particiones"  # Dentro de la carpeta de datos
+MAX_PARTICIONES_EN_MEMORIA = 36  # Meses leídos que se mantienen en memoria
+
+# 🎲 CONFIGURACIÓN DE CONSULTAS APROXIMADAS
+USAR_APROXIMACION = True  # Responder con una muestra los agregados de selecciones muy grandes
+UMBRAL_FILAS_APROXIMACION = 1000000  # Filas seleccionadas a partir de las que se aproxima
+TAMANO_MUESTRA_APROXIMACION = 100000  # Filas de la muestra estratificada (categoría x mes)
+NIVEL_CONFIANZA_APROXIMACION = 0.95  # Cobertura de los márgenes de error mostrados
+INTERVALO_CONSULTA_EXACTA_MS = 1000  # Cada cuánto se revisa si ya está el resultado exacto
+
+# 🚨 CONFIGURACIÓN DE ANOMALÍAS
+VENTANA_ANOMALIAS = 28  # Días anteriores con los que se compara cada día
+UMBRAL_ANOMALIA = 3.5  # Puntaje z robusto a partir del que un día es anómalo
+DIAS_ANOMALIAS = 90  # Días recientes que se puntúan y se conservan
+MIN_DIAS_CON_VENTAS_ANOMALIA = 20  # Con menos días con ventas en la ventana la serie es intermitente
+
+# 🔌 CONFIGURACIÓN DE LA API REST
+API_HABILITADA = True  # Rutas /api de solo lectura junto a cada dashboard
+API_SOLO_LOCAL = True  # La API solo responde a peticiones desde esta máquina
+API_PREFIJO = "/api"
+API_MAX_TOP = 100  # Máximo de productos en /api/productos/top
+API_MAX_DIAS_PREDICCION = 90  # Máximo de días en /api/predicciones
+API_MIN_BYTES_GZIP = 1024  # Respuestas más chicas se envían sin comprimir
+API_MAX_AGE_SEGUNDOS = 0  # Cache-Control max-age (0 = revalidar siempre con el ETag)
+
+# 📡 CONFIGURACIÓN DE MONITOREO
+METRICAS_HABILITADAS = True  # Instrumentar callbacks y exponer /metrics en los dashboards
+METRICAS_SOLO_LOCAL = True  # /metrics solo responde a peticiones desde esta máquina
+LIMITES_LATENCIA_SEGUNDOS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+# 🔬 CONFIGURACIÓN DE PERFILADO
+MODO_PERFILADO = False  # Perfilar etapas con cProfile/tracemalloc (también con --profile)
+CARPETA_PERFILES = "perfiles"  # Se crea una subcarpeta por ejecución
+TOP_PERFILADO = 15  # Funciones y sitios de memoria a mostrar en el resumen
@@ -1,19 +1,36 @@
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import dash
-from dash import dcc, html, Input, Output, dash_table
+from dash import dcc, html, Input, Output, State, dash_table
 import dash_bootstrap_components as dbc
 import os
+import importlib
+import threading
 from datetime import datetime
 import numpy as np
 
+import config
+from almacen_datos import AlmacenDatos
+from backend_sql import BaseVentas, es_base_sql
+from exportacion import FuenteExportacion, GestorExportaciones, controles_exportacion, registrar_exportacion
+from api_rest import instalar_api
+from metricas import instalar_metricas, instrumentar
+from muestreo import reducir_dataframe, usar_webgl
+from series_tiempo import ResumenTemporal, nombre_granularidad, serie_ventas
+
 class DashboardVentas:
     def __init__(self, archivo_datos='Reporte_Consolidado.xlsx'):
         self.archivo_datos = archivo_datos
         self.df = None
+        self.resumen = None
+        # Con una base SQL (.duckdb/.sqlite) los filtros y agregados se consultan en ella
+        self.base = None
+        # El almacén recarga el consolidado cuando cambia y publica la versión nueva en self.df
+        self.almacen = AlmacenDatos(archivo_datos)
+        self.almacen.agregar_oyente(self.aplicar_version)
+        self.exportaciones = GestorExportaciones()
         self.app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+        instalar_metricas(self.app, 'dashboard')
+        instalar_api(self)
         self.cargar_datos()
         self.configurar_layout()
         self.configurar_callbacks()
@@ -21,19 +38,12 @@ class DashboardVentas:
     def cargar_datos(self):
         """Cargar y procesar los datos del archivo Excel"""
         try:
-            if os.path.exists(self.archivo_datos):
-                self.df = pd.read_excel(self.archivo_datos)
+            if es_base_sql(self.archivo_datos) and os.path.exists(self.archivo_datos):
+                self.base = BaseVentas(self.archivo_datos)
+                print(f"✅ Base SQL abierta: {self.base.contar():,} registros ({self.base.motor})")
+            elif os.path.exists(self.archivo_datos):
+                self.df = self.almacen.cargar()
                 print(f"✅ Datos cargados: {len(self.df)} registros")
-                
-                # Procesar fechas si existen
-                if 'FECHA' in self.df.columns:
-                    self.df['FECHA'] = pd.to_datetime(self.df['FECHA'], errors='coerce')
-                
-                # Asegurar que las columnas numéricas estén en formato correcto
-                columnas_numericas = ['CANTIDAD', 'PRECIO_UNITARIO', 'TOTAL_VENTA']
-                for col in columnas_numericas:
-                    if col in self.df.columns:
-                        self.df[col] = pd.to_numeric(self.df[col], errors='coerce')
             else:
                 print(f"❌ No se encontró el archivo {self.archivo_datos}")
                 # Crear datos de ejemplo si no existe el archivo
@@ -42,6 +52,11 @@ class DashboardVentas:
             print(f"Error al cargar datos: {e}")
             self.crear_datos_ejemplo()
     
+    def aplicar_version(self, df, version):
+        """Publicar una versión nueva de los datos con sus resúmenes por día, semana y mes"""
+        self.resumen = ResumenTemporal(df)
+        self.df = df
+    
     def crear_datos_ejemplo(self):
         """Crear datos de ejemplo para demostración"""
         datos_ejemplo = {
@@ -54,6 +69,7 @@ class DashboardVentas:
         }
         self.df = pd.DataFrame(datos_ejemplo)
         self.df['TOTAL_VENTA'] = self.df['CANTIDAD'] * self.df['PRECIO_UNITARIO']
+        self.resumen = ResumenTemporal(self.df)
         print("📊 Usando datos de ejemplo para demostración")
     
     def configurar_layout(self):
@@ -141,6 +157,9 @@ class DashboardVentas:
                 ], width=4)
             ]),
             
+            # Exportación de la vista filtrada
+            controles_exportacion(),
+            
             # Gráficos principales
             dbc.Row([
                 dbc.Col([
@@ -198,25 +217,30 @@ class DashboardVentas:
              Output('filtro-fecha', 'end_date')],
             [Input('filtro-categoria', 'id')]
         )
+        @instrumentar('dashboard.actualizar_filtros')
         def actualizar_filtros(_):
-            if self.df is None or self.df.empty:
+            if self.base is not None:
+                return self.filtros_desde_base()
+            # Una sola lectura de self.df: una recarga a mitad del callback no lo afecta
+            df = self.df
+            if df is None or df.empty:
                 return [], [], None, None
             
             # Opciones de categoría
             categorias = [{'label': 'Todas', 'value': 'todas'}]
-            if 'CATEGORIA' in self.df.columns:
+            if 'CATEGORIA' in df.columns:
                 categorias.extend([{'label': cat, 'value': cat} 
-                                 for cat in self.df['CATEGORIA'].unique() if pd.notna(cat)])
+                                 for cat in df['CATEGORIA'].unique() if pd.notna(cat)])
             
             # Opciones de vendedor
             vendedores = [{'label': 'Todos', 'value': 'todos'}]
-            if 'VENDEDOR' in self.df.columns:
+            if 'VENDEDOR' in df.columns:
                 vendedores.extend([{'label': vend, 'value': vend} 
-                                 for vend in self.df['VENDEDOR'].unique() if pd.notna(vend)])
+                                 for vend in df['VENDEDOR'].unique() if pd.notna(vend)])
             
             # Fechas
-            start_date = self.df['FECHA'].min() if 'FECHA' in self.df.columns else None
-            end_date = self.df['FECHA'].max() if 'FECHA' in self.df.columns else None
+            start_date = df['FECHA'].min() if 'FECHA' in df.columns else None
+            end_date = df['FECHA'].max() if 'FECHA' in df.columns else None
             
             return categorias, vendedores, start_date, end_date
         
@@ -236,12 +260,19 @@ class DashboardVentas:
              Input('filtro-fecha', 'start_date'),
              Input('filtro-fecha', 'end_date')]
         )
+        @instrumentar('dashboard.actualizar_dashboard')
         def actualizar_dashboard(categoria, vendedor, fecha_inicio, fecha_fin):
-            if self.df is None or self.df.empty:
+            if self.base is not None:
+                return self.dashboard_desde_base(categoria, vendedor, fecha_inicio, fecha_fin)
+            df = self.df
+            if df is None or df.empty:
                 return "0", "0", "0", "N/A", {}, {}, {}, {}, [], []
+            # El resumen solo sirve si es el de esta misma versión de los datos
+            resumen = self.resumen if self.resumen is not None and self.resumen.df is df else None
             
-            # Filtrar datos
-            df_filtrado = self.df.copy()
+            # Filtrar datos (sin copia: los filtros devuelven marcos nuevos y el dataset,
+            # quizás mapeado en memoria y compartido entre workers, no se duplica)
+            df_filtrado = df
             
             if categoria != 'todas' and 'CATEGORIA' in df_filtrado.columns:
                 df_filtrado = df_filtrado[df_filtrado['CATEGORIA'] == categoria]
@@ -266,8 +297,12 @@ class DashboardVentas:
                 if not ventas_por_vendedor.empty:
                     mejor_vendedor = ventas_por_vendedor.idxmax()
             
-            # Crear gráficos
-            graficos = self.crear_graficos(df_filtrado)
+            # Crear gráficos (la serie temporal sale de los resúmenes precalculados)
+            serie_temporal = serie_ventas(
+                df_filtrado, resumen, fecha_inicio, fecha_fin,
+                categoria=None if categoria == 'todas' else categoria,
+                vendedor=None if vendedor == 'todos' else vendedor)
+            graficos = self.crear_graficos(df_filtrado, serie_temporal)
             
             # Preparar tabla
             columnas = [{"name": col, "id": col} for col in df_filtrado.columns]
@@ -275,23 +310,97 @@ class DashboardVentas:
             
             return (total_ventas, total_productos, venta_promedio, mejor_vendedor,
                    *graficos, columnas, datos)
+        
+        registrar_exportacion(
+            self.app, self.exportaciones,
+            lambda filtros: FuenteExportacion(df=self.df, base=self.base, filtros=filtros),
+            [State('filtro-fecha', 'start_date'), State('filtro-fecha', 'end_date'),
+             State('filtro-categoria', 'value'), State('filtro-vendedor', 'value')])
     
-    def crear_graficos(self, df):
-        """Crear todos los gráficos del dashboard"""
+    def filtros_desde_base(self):
+        """Opciones de los filtros y rango de fechas consultados en la base SQL"""
+        columnas = self.base.columnas
+        categorias = [{'label': 'Todas', 'value': 'todas'}]
+        if 'CATEGORIA' in columnas:
+            categorias.extend([{'label': cat, 'value': cat} for cat in self.base.valores('CATEGORIA')])
+        vendedores = [{'label': 'Todos', 'value': 'todos'}]
+        if 'VENDEDOR' in columnas:
+            vendedores.extend([{'label': vend, 'value': vend} for vend in self.base.valores('VENDEDOR')])
+        start_date, end_date = self.base.rango_fechas()
+        return categorias, vendedores, start_date, end_date
+    
+    def dashboard_desde_base(self, categoria, vendedor, fecha_inicio, fecha_fin):
+        """Métricas, gráficos y tabla con consultas a la base SQL: a pandas solo llegan los resultados"""
+        filtros = {
+            'inicio': fecha_inicio or None,
+            'fin': fecha_fin or None,
+            'categoria': None if categoria == 'todas' else categoria,
+            'vendedor': None if vendedor == 'todos' else vendedor
+        }
+        columnas_base = self.base.columnas
+        metricas = self.base.metricas(**filtros)
+        
+        agregados = {}
+        if 'PRODUCTO' in columnas_base:
+            agregados['top_productos'] = self.base.agregar('PRODUCTO', top=10, **filtros)
+        if 'CATEGORIA' in columnas_base:
+            agregados['por_categoria'] = self.base.agregar('CATEGORIA', **filtros)
+        if 'VENDEDOR' in columnas_base:
+            agregados['por_vendedor'] = self.base.agregar('VENDEDOR', **filtros).sort_values('VENDEDOR')
+        
+        mejor_vendedor = "N/A"
+        if agregados.get('por_vendedor') is not None and not agregados['por_vendedor'].empty:
+            mejor_vendedor = agregados['por_vendedor'].loc[agregados['por_vendedor']['TOTAL_VENTA'].idxmax(), 'VENDEDOR']
+        
+        # La tabla muestra solo las primeras filas de la selección
+        df_tabla = self.base.filtrar(**filtros, limite=config.LIMITE_FILAS_TABLA_SQL)
+        graficos = self.crear_graficos(df_tabla, self.base.serie(**filtros), agregados)
+        columnas = [{"name": col, "id": col} for col in df_tabla.columns]
+        datos = df_tabla.round(2).to_dict('records')
+        
+        return (f"${metricas['total_ventas']:,.0f}", f"{metricas['total_productos']:,}",
+                f"${metricas['venta_promedio']:,.0f}", mejor_vendedor, *graficos, columnas, datos)
+    
+    def calcular_agregados(self, df):
+        """Sumas de TOTAL_VENTA por producto (top 10), categoría y vendedor con pandas"""
+        agregados = {}
+        if 'TOTAL_VENTA' not in df.columns:
+            return agregados
+        if 'PRODUCTO' in df.columns:
+            agregados['top_productos'] = df.groupby('PRODUCTO')['TOTAL_VENTA'].sum().nlargest(10).reset_index()
+        if 'CATEGORIA' in df.columns:
+            agregados['por_categoria'] = df.groupby('CATEGORIA')['TOTAL_VENTA'].sum().reset_index()
+        if 'VENDEDOR' in df.columns:
+            agregados['por_vendedor'] = df.groupby('VENDEDOR')['TOTAL_VENTA'].sum().reset_index()
+        return agregados
+    
+    @instrumentar('dashboard.crear_graficos')
+    def crear_graficos(self, df, serie_temporal=None, agregados=None):
+        """
+        Crear todos los gráficos del dashboard. serie_temporal: (serie, granularidad)
+        y agregados (ver calcular_agregados) ya calculados, por ejemplo en la base SQL
+        """
+        # plotly.express se carga con el primer gráfico, no al arrancar
+        import plotly.express as px
+        
+        if agregados is None:
+            agregados = self.calcular_agregados(df)
         
         # Gráfico de ventas en el tiempo
-        if 'FECHA' in df.columns and 'TOTAL_VENTA' in df.columns:
-            ventas_tiempo = df.groupby('FECHA')['TOTAL_VENTA'].sum().reset_index()
+        if serie_temporal is not None or ('FECHA' in df.columns and 'TOTAL_VENTA' in df.columns):
+            ventas_tiempo, granularidad = serie_temporal or serie_ventas(df)
+            ventas_tiempo = reducir_dataframe(ventas_tiempo, 'FECHA', 'TOTAL_VENTA')
             fig_tiempo = px.line(ventas_tiempo, x='FECHA', y='TOTAL_VENTA',
-                               title='📈 Evolución de Ventas en el Tiempo',
-                               labels={'TOTAL_VENTA': 'Ventas ($)', 'FECHA': 'Fecha'})
+                               title=f'📈 Evolución de Ventas por {nombre_granularidad(granularidad)}',
+                               labels={'TOTAL_VENTA': 'Ventas ($)', 'FECHA': 'Fecha'},
+                               render_mode='webgl' if usar_webgl(len(ventas_tiempo)) else 'svg')
             fig_tiempo.update_layout(title_x=0.5)
         else:
             fig_tiempo = {}
         
         # Top productos
-        if 'PRODUCTO' in df.columns and 'TOTAL_VENTA' in df.columns:
-            top_productos = df.groupby('PRODUCTO')['TOTAL_VENTA'].sum().nlargest(10).reset_index()
+        if 'top_productos' in agregados:
+            top_productos = agregados['top_productos']
             fig_productos = px.bar(top_productos, x='TOTAL_VENTA', y='PRODUCTO',
                                  orientation='h', title='🏆 Top 10 Productos',
                                  labels={'TOTAL_VENTA': 'Ventas ($)', 'PRODUCTO': 'Producto'})
@@ -300,8 +409,8 @@ class DashboardVentas:
             fig_productos = {}
         
         # Ventas por categoría
-        if 'CATEGORIA' in df.columns and 'TOTAL_VENTA' in df.columns:
-            ventas_categoria = df.groupby('CATEGORIA')['TOTAL_VENTA'].sum().reset_index()
+        if 'por_categoria' in agregados:
+            ventas_categoria = agregados['por_categoria']
             fig_categoria = px.pie(ventas_categoria, values='TOTAL_VENTA', names='CATEGORIA',
                                  title='🎯 Ventas por Categoría')
             fig_categoria.update_layout(title_x=0.5)
@@ -309,8 +418,8 @@ class DashboardVentas:
             fig_categoria = {}
         
         # Ventas por vendedor
-        if 'VENDEDOR' in df.columns and 'TOTAL_VENTA' in df.columns:
-            ventas_vendedor = df.groupby('VENDEDOR')['TOTAL_VENTA'].sum().reset_index()
+        if 'por_vendedor' in agregados:
+            ventas_vendedor = agregados['por_vendedor']
             fig_vendedor = px.bar(ventas_vendedor, x='VENDEDOR', y='TOTAL_VENTA',
                                 title='👥 Ventas por Vendedor',
                                 labels={'TOTAL_VENTA': 'Ventas ($)', 'VENDEDOR': 'Vendedor'})
@@ -320,10 +429,15 @@ class DashboardVentas:
         
         return fig_tiempo, fig_productos, fig_categoria, fig_vendedor
     
-    def ejecutar(self, debug=True, port=8050):
+    def ejecutar(self, debug=True, port=8050, host='127.0.0.1'):
         """Ejecutar el dashboard"""
         print(f"🚀 Iniciando dashboard en http://localhost:{port}")
-        self.app.run(debug=debug, port=port, host='127.0.0.1')
+        # La base SQL se reemplaza de una vez y las conexiones se reabren solas
+        if config.AUTOREFRESH_DASHBOARD and self.base is None:
+            self.almacen.iniciar_vigilancia()
+        # Precargar plotly.express mientras el servidor arranca
+        threading.Thread(target=importlib.import_module, args=('plotly.express',), daemon=True).start()
+        self.app.run(debug=debug, port=port, host=host)
 
 # Función principal
 def main():
@@ -4,12 +4,16 @@ Dashboard interactivo mejorado con funcionalidades de inteligencia artificial
 """
 
 import dash
-from dash import dcc, html, Input, Output, dash_table
+from dash import dcc, html, Input, Output, State, dash_table, no_update
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import dash_bootstrap_components as dbc
 
 # Importar módulo de IA
@@ -20,183 +24,98 @@ except ImportError:
     IA_DISPONIBLE = False
 
 import config
+from almacen_datos import AlmacenDatos
+from aproximacion import MuestraEstratificada, agregados_aproximados, agregados_exactos
+from anomalias import DetectorAnomalias
+from api_rest import instalar_api
+from exportacion import FuenteExportacion, GestorExportaciones, controles_exportacion, registrar_exportacion
+from metricas import instalar_metricas, instrumentar
+from particiones import cargar_particiones, particiones_disponibles
+from muestreo import traza_temporal
+from series_tiempo import ResumenTemporal, nombre_granularidad, promedio_diario, serie_ventas
 
 class DashboardIA:
-    def __init__(self, archivo_datos):
+    def __init__(self, archivo_datos, archivo_modelo=None, carpeta_datos=None):
+        self.archivo_modelo = archivo_modelo
+        # Con consolidado particionado por mes, los filtros de fecha solo leen los meses del rango
+        # (self.df sigue siendo el historial completo: lo necesitan el modelo y los resúmenes)
+        carpeta_datos = carpeta_datos or os.path.dirname(os.path.abspath(archivo_datos))
+        self.carpeta_particiones = (carpeta_datos if config.USAR_PARTICIONES
+                                    and particiones_disponibles(carpeta_datos) else None)
         self.app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
-        self.df = pd.read_excel(archivo_datos)
-        self.df['FECHA'] = pd.to_datetime(self.df['FECHA'])
+        # Los gráficos que reemplazan los valores aproximados viven dentro de una pestaña
+        self.app.config.suppress_callback_exceptions = True
+        instalar_metricas(self.app, 'dashboard_ia')
+        instalar_api(self)
+        # El almacén recarga el consolidado cuando cambia y publica la versión nueva en self.df
+        self.almacen = AlmacenDatos(archivo_datos)
+        self.df = self.almacen.cargar()
+        self.resumen = ResumenTemporal(self.df)
+        self.muestra = self.crear_muestra(self.df)
+        # Resultados exactos que se calculan en segundo plano mientras se muestran los aproximados,
+        # por clave de la selección (ver clave_exactos)
+        self.consultas_exactas = {}
+        self.candado_exactas = threading.Lock()
+        self.pool_exactas = ThreadPoolExecutor(max_workers=1, thread_name_prefix='agregados-exactos')
+        # Se ajusta al abrir la pestaña de anomalías; después solo puntúa los días nuevos
+        self.detector = DetectorAnomalias()
+        self.candado_anomalias = threading.Lock()
+        self.exportaciones = GestorExportaciones()
+        self.almacen.agregar_oyente(self.aplicar_version)
         
         # Inicializar IA si está disponible
         if IA_DISPONIBLE:
-            self.ia = AnalisisIA(archivo_datos)
-            self.ia.entrenar_modelo_prediccion()
+            # Reutilizar los datos ya leídos y entrenar en segundo plano: la primera
+            # página se sirve sin esperar al modelo y las predicciones aparecen al terminar
+            self.ia = AnalisisIA(df=self.df)
+            if archivo_modelo:
+                # Modelo ya entrenado y compartido entre procesos (ver servidor.py)
+                self.ia.cargar_modelo(archivo_modelo, mmap=True)
+            else:
+                threading.Thread(target=self.ia.entrenar_modelo_prediccion, daemon=True).start()
         else:
             self.ia = None
         
         self.setup_layout()
         self.setup_callbacks()
     
+    def aplicar_version(self, df, version):
+        """Publicar los datos nuevos (con sus resúmenes temporales) y reentrenar la IA sin cortar el servicio"""
+        self.resumen = ResumenTemporal(df)
+        self.muestra = self.crear_muestra(df)
+        self.df = df
+        with self.candado_anomalias:
+            if self.detector.ajustado:
+                self.detector.actualizar(df)
+        if IA_DISPONIBLE:
+            threading.Thread(target=self.reentrenar_ia, args=(df,), daemon=True).start()
+    
+    def detector_anomalias(self):
+        """Detector ajustado a los datos vigentes (se ajusta la primera vez que se pide)"""
+        with self.candado_anomalias:
+            if not self.detector.ajustado:
+                self.detector.ajustar(self.df)
+            return self.detector
+    
+    def crear_muestra(self, df):
+        """Muestra estratificada para aproximar agregados, solo si los datos son grandes"""
+        if config.USAR_APROXIMACION and len(df) > config.UMBRAL_FILAS_APROXIMACION:
+            return MuestraEstratificada(df)
+        return None
+    
+    def reentrenar_ia(self, df):
+        """Entrenar (o releer) un modelo nuevo y reemplazar el anterior solo cuando esté listo"""
+        ia = AnalisisIA(df=df)
+        if self.archivo_modelo:
+            ia.cargar_modelo(self.archivo_modelo, mmap=True)
+        else:
+            ia.entrenar_modelo_prediccion()
+        # Si mientras tanto llegó otra versión, este modelo ya no corresponde
+        if self.df is df:
+            self.ia = ia
+    
     def setup_layout(self):
         """Configurar el layout del dashboard"""
-        
-        # Header mejorado con gradiente y animaciones
-        header = dbc.Row([
-            dbc.Col([
-                html.Div([
-                    html.H1([
-                        html.I(className="fas fa-robot me-3", style={'color': '#e74c3c'}),
-                        "Dashboard Inteligente de Ventas",
-                        html.Span(" AI", style={'color': '#e74c3c', 'fontSize': '0.8em'})
-                    ], className="text-center mb-3", 
-                       style={
-                           'background': 'linear-gradient(135deg, #667eea 0%, #764ba2 100%)',
-                           'color': 'white',
-                           'padding': '30px',
-                           'borderRadius': '15px',
-                           'boxShadow': '0 10px 30px rgba(0,0,0,0.3)',
-                           'marginBottom': '20px',
-                           'fontWeight': 'bold'
-                       }),
-                    html.P([
-                        html.I(className="fas fa-brain me-2"),
-                        "Sistema avanzado con Inteligencia Artificial y Machine Learning"
-                    ], className="text-center text-muted", 
-                       style={'fontSize': '1.1em', 'fontStyle': 'italic'})
-                ])
-            ], width=12)
-        ])
-        
-        # Métricas principales con diseño moderno
-        metricas = self.crear_tarjetas_metricas_mejoradas()
-        
-        # Controles con diseño premium
-        controles = dbc.Row([
-            dbc.Col([
-                dbc.Card([
-                    dbc.CardHeader([
-                        html.I(className="fas fa-calendar-alt me-2"),
-                        "Rango de Fechas"
-                    ], style={'backgroundColor': '#3498db', 'color': 'white', 'fontWeight': 'bold'}),
-                    dbc.CardBody([
-                        dcc.DatePickerRange(
-                            id='date-picker-range',
-                            start_date=self.df['FECHA'].min(),
-                            end_date=self.df['FECHA'].max(),
-                            display_format='YYYY-MM-DD',
-                            style={'width': '100%'}
-                        )
-                    ])
-                ], style={'boxShadow': '0 4px 15px rgba(0,0,0,0.1)', 'border': 'none'})
-            ], width=3),
-            dbc.Col([
-                dbc.Card([
-                    dbc.CardHeader([
-                        html.I(className="fas fa-tags me-2"),
-                        "Categoría"
-                    ], style={'backgroundColor': '#2ecc71', 'color': 'white', 'fontWeight': 'bold'}),
-                    dbc.CardBody([
-                        dcc.Dropdown(
-                            id='categoria-dropdown',
-                            options=[{'label': '🏷️ Todas', 'value': 'todas'}] + 
-                                   [{'label': f'📂 {cat}', 'value': cat} for cat in self.df['CATEGORIA'].dropna().unique()],
-                            value='todas',
-                            style={'fontWeight': '500'}
-                        )
-                    ])
-                ], style={'boxShadow': '0 4px 15px rgba(0,0,0,0.1)', 'border': 'none'})
-            ], width=3),
-            dbc.Col([
-                dbc.Card([
-                    dbc.CardHeader([
-                        html.I(className="fas fa-user-tie me-2"),
-                        "Vendedor"
-                    ], style={'backgroundColor': '#f39c12', 'color': 'white', 'fontWeight': 'bold'}),
-                    dbc.CardBody([
-                        dcc.Dropdown(
-                            id='vendedor-dropdown',
-                            options=[{'label': '👥 Todos', 'value': 'todos'}] + 
-                                   [{'label': f'👤 {vend}', 'value': vend} for vend in self.df['VENDEDOR'].dropna().unique()],
-                            value='todos',
-                            style={'fontWeight': '500'}
-                        )
-                    ])
-                ], style={'boxShadow': '0 4px 15px rgba(0,0,0,0.1)', 'border': 'none'})
-            ], width=3),
-            dbc.Col([
-                dbc.Card([
-                    dbc.CardHeader([
-                        html.I(className="fas fa-magic me-2"),
-                        "Predicciones IA"
-                    ], style={'backgroundColor': '#9b59b6', 'color': 'white', 'fontWeight': 'bold'}),
-                    dbc.CardBody([
-                        dbc.Switch(
-                            id="predicciones-switch",
-                            label="Activar predicciones",
-                            value=IA_DISPONIBLE,
-                            disabled=not IA_DISPONIBLE,
-                            style={'fontSize': '1.1em', 'fontWeight': '500'}
-                        )
-                    ])
-                ], style={'boxShadow': '0 4px 15px rgba(0,0,0,0.1)', 'border': 'none'})
-            ], width=3)
-        ], className="mb-4")
-        
-        # Pestañas con diseño moderno
-        tabs = dbc.Tabs([
-            dbc.Tab(
-                label=[html.I(className="fas fa-chart-line me-2"), "Análisis Principal"], 
-                tab_id="analisis",
-                label_style={'color': '#3498db', 'fontWeight': 'bold'}
-            ),
-            dbc.Tab(
-                label=[html.I(className="fas fa-robot me-2"), "Inteligencia Artificial"], 
-                tab_id="ia",
-                label_style={'color': '#e74c3c', 'fontWeight': 'bold'}
-            ),
-            dbc.Tab(
-                label=[html.I(className="fas fa-lightbulb me-2"), "Recomendaciones"], 
-                tab_id="recomendaciones",
-                label_style={'color': '#f39c12', 'fontWeight': 'bold'}
-            ),
-            dbc.Tab(
-                label=[html.I(className="fas fa-crystal-ball me-2"), "Predicciones"], 
-                tab_id="predicciones",
-                label_style={'color': '#9b59b6', 'fontWeight': 'bold'}
-            )
-        ], id="tabs", active_tab="analisis", style={'fontSize': '1.1em'})
-        
-        # Contenido de las pestañas con fondo moderno
-        contenido_tabs = html.Div(
-            id="tab-content", 
-            style={
-                'backgroundColor': '#f8f9fa',
-                'padding': '20px',
-                'borderRadius': '10px',
-                'marginTop': '15px',
-                'boxShadow': '0 2px 10px rgba(0,0,0,0.05)'
-            }
-        )
-        
-        # Footer informativo
-        footer = html.Div([
-            html.Hr(style={'margin': '40px 0'}),
-            dbc.Row([
-                dbc.Col([
-                    html.P([
-                        html.I(className="fas fa-info-circle me-2"),
-                        f"Última actualización: {datetime.now().strftime('%d/%m/%Y %H:%M')}"
-                    ], className="text-muted text-center", style={'fontSize': '0.9em'})
-                ], width=6),
-                dbc.Col([
-                    html.P([
-                        html.I(className="fas fa-database me-2"),
-                        f"Registros procesados: {len(self.df):,}"
-                    ], className="text-muted text-center", style={'fontSize': '0.9em'})
-                ], width=6)
-            ])
-        ])
-        
         # CSS personalizado para diseño premium
         self.app.index_string = '''
         <!DOCTYPE html>
@@ -389,12 +308,183 @@ class DashboardIA:
         </html>
         '''
         
+        # Se construye en cada carga de página para que las métricas incluyan la
+        # predicción cuando el modelo esté listo y los controles la última versión de los datos
+        self.app.layout = self.construir_layout
+    
+    def construir_layout(self):
+        """Layout completo con la versión actual de los datos"""
+        df = self.df
+        
+        # Header mejorado con gradiente y animaciones
+        header = dbc.Row([
+            dbc.Col([
+                html.Div([
+                    html.H1([
+                        html.I(className="fas fa-robot me-3", style={'color': '#e74c3c'}),
+                        "Dashboard Inteligente de Ventas",
+                        html.Span(" AI", style={'color': '#e74c3c', 'fontSize': '0.8em'})
+                    ], className="text-center mb-3", 
+                       style={
+                           'background': 'linear-gradient(135deg, #667eea 0%, #764ba2 100%)',
+                           'color': 'white',
+                           'padding': '30px',
+                           'borderRadius': '15px',
+                           'boxShadow': '0 10px 30px rgba(0,0,0,0.3)',
+                           'marginBottom': '20px',
+                           'fontWeight': 'bold'
+                       }),
+                    html.P([
+                        html.I(className="fas fa-brain me-2"),
+                        "Sistema avanzado con Inteligencia Artificial y Machine Learning"
+                    ], className="text-center text-muted", 
+                       style={'fontSize': '1.1em', 'fontStyle': 'italic'})
+                ])
+            ], width=12)
+        ])
+        
+        
+        # Controles con diseño premium
+        controles = dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader([
+                        html.I(className="fas fa-calendar-alt me-2"),
+                        "Rango de Fechas"
+                    ], style={'backgroundColor': '#3498db', 'color': 'white', 'fontWeight': 'bold'}),
+                    dbc.CardBody([
+                        dcc.DatePickerRange(
+                            id='date-picker-range',
+                            start_date=df['FECHA'].min(),
+                            end_date=df['FECHA'].max(),
+                            display_format='YYYY-MM-DD',
+                            style={'width': '100%'}
+                        )
+                    ])
+                ], style={'boxShadow': '0 4px 15px rgba(0,0,0,0.1)', 'border': 'none'})
+            ], width=3),
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader([
+                        html.I(className="fas fa-tags me-2"),
+                        "Categoría"
+                    ], style={'backgroundColor': '#2ecc71', 'color': 'white', 'fontWeight': 'bold'}),
+                    dbc.CardBody([
+                        dcc.Dropdown(
+                            id='categoria-dropdown',
+                            options=[{'label': '🏷️ Todas', 'value': 'todas'}] + 
+                                   [{'label': f'📂 {cat}', 'value': cat} for cat in df['CATEGORIA'].dropna().unique()],
+                            value='todas',
+                            style={'fontWeight': '500'}
+                        )
+                    ])
+                ], style={'boxShadow': '0 4px 15px rgba(0,0,0,0.1)', 'border': 'none'})
+            ], width=3),
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader([
+                        html.I(className="fas fa-user-tie me-2"),
+                        "Vendedor"
+                    ], style={'backgroundColor': '#f39c12', 'color': 'white', 'fontWeight': 'bold'}),
+                    dbc.CardBody([
+                        dcc.Dropdown(
+                            id='vendedor-dropdown',
+                            options=[{'label': '👥 Todos', 'value': 'todos'}] + 
+                                   [{'label': f'👤 {vend}', 'value': vend} for vend in df['VENDEDOR'].dropna().unique()],
+                            value='todos',
+                            style={'fontWeight': '500'}
+                        )
+                    ])
+                ], style={'boxShadow': '0 4px 15px rgba(0,0,0,0.1)', 'border': 'none'})
+            ], width=3),
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader([
+                        html.I(className="fas fa-magic me-2"),
+                        "Predicciones IA"
+                    ], style={'backgroundColor': '#9b59b6', 'color': 'white', 'fontWeight': 'bold'}),
+                    dbc.CardBody([
+                        dbc.Switch(
+                            id="predicciones-switch",
+                            label="Activar predicciones",
+                            value=IA_DISPONIBLE,
+                            disabled=not IA_DISPONIBLE,
+                            style={'fontSize': '1.1em', 'fontWeight': '500'}
+                        )
+                    ])
+                ], style={'boxShadow': '0 4px 15px rgba(0,0,0,0.1)', 'border': 'none'})
+            ], width=3)
+        ], className="mb-4")
+        
+        # Pestañas con diseño moderno
+        tabs = dbc.Tabs([
+            dbc.Tab(
+                label=[html.I(className="fas fa-chart-line me-2"), "Análisis Principal"], 
+                tab_id="analisis",
+                label_style={'color': '#3498db', 'fontWeight': 'bold'}
+            ),
+            dbc.Tab(
+                label=[html.I(className="fas fa-robot me-2"), "Inteligencia Artificial"], 
+                tab_id="ia",
+                label_style={'color': '#e74c3c', 'fontWeight': 'bold'}
+            ),
+            dbc.Tab(
+                label=[html.I(className="fas fa-lightbulb me-2"), "Recomendaciones"], 
+                tab_id="recomendaciones",
+                label_style={'color': '#f39c12', 'fontWeight': 'bold'}
+            ),
+            dbc.Tab(
+                label=[html.I(className="fas fa-crystal-ball me-2"), "Predicciones"], 
+                tab_id="predicciones",
+                label_style={'color': '#9b59b6', 'fontWeight': 'bold'}
+            ),
+            dbc.Tab(
+                label=[html.I(className="fas fa-exclamation-triangle me-2"), "Anomalías"], 
+                tab_id="anomalias",
+                label_style={'color': '#c0392b', 'fontWeight': 'bold'}
+            )
+        ], id="tabs", active_tab="analisis", style={'fontSize': '1.1em'})
+        
+        # Contenido de las pestañas con fondo moderno
+        contenido_tabs = html.Div(
+            id="tab-content", 
+            style={
+                'backgroundColor': '#f8f9fa',
+                'padding': '20px',
+                'borderRadius': '10px',
+                'marginTop': '15px',
+                'boxShadow': '0 2px 10px rgba(0,0,0,0.05)'
+            }
+        )
+        
+        # Footer informativo
+        footer = html.Div([
+            html.Hr(style={'margin': '40px 0'}),
+            dbc.Row([
+                dbc.Col([
+                    html.P([
+                        html.I(className="fas fa-info-circle me-2"),
+                        f"Última actualización: {datetime.now().strftime('%d/%m/%Y %H:%M')}"
+                    ], className="text-muted text-center", style={'fontSize': '0.9em'})
+                ], width=6),
+                dbc.Col([
+                    html.P([
+                        html.I(className="fas fa-database me-2"),
+                        f"Registros procesados: {len(df):,}"
+                    ], className="text-muted text-center", style={'fontSize': '0.9em'})
+                ], width=6)
+            ])
+        ])
+        
         # Layout principal con estilo mejorado
-        self.app.layout = dbc.Container([
+        return dbc.Container([
             header,
-            metricas,
+            # Métricas principales con diseño moderno
+            self.crear_tarjetas_metricas_mejoradas(),
             html.Hr(style={'margin': '30px 0', 'opacity': '0.3'}),
             controles,
+            # Exportación de la vista filtrada
+            controles_exportacion(),
             tabs,
             contenido_tabs,
             footer,
@@ -409,10 +499,11 @@ class DashboardIA:
     
     def crear_tarjetas_metricas_mejoradas(self):
         """Crear tarjetas de métricas con diseño premium"""
-        total_ventas = self.df['TOTAL_VENTA'].sum()
-        productos_vendidos = self.df['CANTIDAD'].sum()
-        venta_promedio = self.df['TOTAL_VENTA'].mean()
-        num_transacciones = len(self.df)
+        df = self.df
+        total_ventas = df['TOTAL_VENTA'].sum()
+        productos_vendidos = df['CANTIDAD'].sum()
+        venta_promedio = df['TOTAL_VENTA'].mean()
+        num_transacciones = len(df)
         
         # Predicción de crecimiento (si IA está disponible)
         crecimiento_predicho = 0
@@ -423,7 +514,7 @@ class DashboardIA:
             try:
                 predicciones = self.ia.predecir_ventas_futuras(7)
                 if predicciones is not None:
-                    venta_semanal_actual = self.df['TOTAL_VENTA'].tail(7).sum()
+                    venta_semanal_actual = df['TOTAL_VENTA'].tail(7).sum()
                     venta_semanal_predicha = predicciones['VENTA_PREDICHA'].sum()
                     crecimiento_predicho = ((venta_semanal_predicha - venta_semanal_actual) / venta_semanal_actual) * 100
                     if crecimiento_predicho < 0:
@@ -597,25 +688,91 @@ class DashboardIA:
              Input('vendedor-dropdown', 'value'),
              Input('predicciones-switch', 'value')]
         )
+        @instrumentar('dashboard_ia.render_tab_content')
         def render_tab_content(active_tab, start_date, end_date, categoria, vendedor, mostrar_predicciones):
             # Filtrar datos
             df_filtrado = self.filtrar_datos(start_date, end_date, categoria, vendedor)
             
             if active_tab == "analisis":
-                return self.crear_tab_analisis(df_filtrado, mostrar_predicciones)
+                # Serie temporal desde los resúmenes precalculados (si son de la versión vigente)
+                resumen = self.resumen if self.resumen is not None and self.resumen.df is self.df else None
+                serie_temporal = serie_ventas(
+                    df_filtrado, resumen, start_date, end_date,
+                    categoria=None if categoria == 'todas' else categoria,
+                    vendedor=None if vendedor == 'todos' else vendedor)
+                agregados, clave = self.agregados_analisis(df_filtrado, start_date, end_date, categoria, vendedor)
+                return self.crear_tab_analisis(df_filtrado, mostrar_predicciones, serie_temporal, agregados, clave)
             elif active_tab == "ia":
                 return self.crear_tab_ia(df_filtrado)
             elif active_tab == "recomendaciones":
                 return self.crear_tab_recomendaciones(df_filtrado)
             elif active_tab == "predicciones":
                 return self.crear_tab_predicciones(df_filtrado)
+            elif active_tab == "anomalias":
+                return self.crear_tab_anomalias(start_date, end_date, categoria, vendedor)
             
             return html.Div("Selecciona una pestaña")
+        
+        @self.app.callback(
+            [Output('grafico-productos-ia', 'figure'),
+             Output('grafico-categorias-ia', 'figure'),
+             Output('grafico-vendedores-ia', 'figure'),
+             Output('aviso-aproximado', 'children'),
+             Output('intervalo-exactos', 'disabled'),
+             Output('clave-exactos', 'data')],
+            Input('intervalo-exactos', 'n_intervals'),
+            State('clave-exactos', 'data'),
+            prevent_initial_call=True
+        )
+        def reemplazar_aproximados(_, clave):
+            """Cambiar los gráficos aproximados por los exactos en cuanto estén calculados"""
+            if not clave:
+                return no_update, no_update, no_update, no_update, True, no_update
+            futuro = self.consultas_exactas.get(tuple(clave))
+            if futuro is None:
+                # La pestaña la dibujó otro worker o la selección salió de la caché: se vuelve
+                # a encargar con los mismos filtros sobre los datos vigentes
+                filtros = clave[1:]
+                clave = self.clave_exactos(*filtros)
+                futuro = self.encargar_exactos(clave, self.filtrar_datos(*filtros))
+            if futuro.done() and futuro.exception() is not None:
+                return no_update, no_update, no_update, no_update, True, no_update
+            if not futuro.done():
+                return no_update, no_update, no_update, no_update, False, clave
+            agregados = futuro.result()
+            # Con los agregados calculados solo se consultan las columnas del DataFrame
+            columnas = self.df.head(0)
+            return (self.crear_grafico_productos_premium(columnas, agregados),
+                    self.crear_grafico_categorias_premium(columnas, agregados),
+                    self.crear_grafico_vendedores_premium(columnas, agregados),
+                    [], True, clave)
+        
+        registrar_exportacion(
+            self.app, self.exportaciones, self.fuente_exportacion,
+            [State('date-picker-range', 'start_date'), State('date-picker-range', 'end_date'),
+             State('categoria-dropdown', 'value'), State('vendedor-dropdown', 'value')])
+    
+    def fuente_exportacion(self, filtros):
+        """Filas a exportar: solo las particiones del rango si el consolidado está particionado"""
+        if self.carpeta_particiones and filtros['inicio'] and filtros['fin']:
+            df = cargar_particiones(self.carpeta_particiones, filtros['inicio'], filtros['fin'])
+        else:
+            df = self.df
+        return FuenteExportacion(df=df, filtros=filtros)
     
     def filtrar_datos(self, start_date, end_date, categoria, vendedor):
         """Filtrar datos según los controles"""
-        df_filtrado = self.df.copy()
-        
+        if self.carpeta_particiones and start_date and end_date:
+            df_filtrado = cargar_particiones(self.carpeta_particiones, start_date, end_date)
+        else:
+            # Sin copia: los filtros devuelven marcos nuevos y el dataset (quizás mapeado
+            # en memoria y compartido entre workers) no se duplica en cada callback
+            df_filtrado = self.df
+        return self.aplicar_filtros(df_filtrado, start_date, end_date, categoria, vendedor)
+    
+    @staticmethod
+    def aplicar_filtros(df_filtrado, start_date, end_date, categoria, vendedor):
+        """Aplicar los filtros de fecha, categoría y vendedor a un DataFrame (datos o muestra)"""
         # Filtro de fechas
         if start_date and end_date:
             df_filtrado = df_filtrado[
@@ -633,22 +790,78 @@ class DashboardIA:
         
         return df_filtrado
     
-    def crear_tab_analisis(self, df_filtrado, mostrar_predicciones):
+    def agregados_analisis(self, df_filtrado, start_date, end_date, categoria, vendedor):
+        """
+        (agregados, clave) de productos, categorías y vendedores. Con más de
+        config.UMBRAL_FILAS_APROXIMACION filas se responde con la muestra y el
+        resultado exacto se encarga en segundo plano bajo `clave`
+        """
+        df, muestra = self.df, self.muestra
+        clave = self.clave_exactos(start_date, end_date, categoria, vendedor)
+        futuro = self.consultas_exactas.get(tuple(clave))
+        if futuro is not None and futuro.done() and futuro.exception() is None:
+            return futuro.result(), clave
+        if muestra is None or muestra.df is not df or len(df_filtrado) <= config.UMBRAL_FILAS_APROXIMACION:
+            return agregados_exactos(df_filtrado), clave
+        
+        self.encargar_exactos(clave, df_filtrado)
+        muestra_filtrada = self.aplicar_filtros(muestra.muestra, start_date, end_date, categoria, vendedor)
+        return agregados_aproximados(muestra, muestra_filtrada), clave
+    
+    def clave_exactos(self, start_date, end_date, categoria, vendedor):
+        """
+        Clave de una selección: versión del archivo de datos (la misma en todos los
+        workers) y los filtros, con los que cualquier worker puede volver a calcularla
+        """
+        version = hashlib.sha1(repr(self.almacen.identidad).encode()).hexdigest()[:16]
+        return [version, start_date, end_date, categoria, vendedor]
+    
+    def encargar_exactos(self, clave, df_filtrado):
+        """Futuro con los agregados exactos de la selección (se encarga si no estaba)"""
+        with self.candado_exactas:
+            futuro = self.consultas_exactas.get(tuple(clave))
+            if futuro is None:
+                futuro = self.pool_exactas.submit(agregados_exactos, df_filtrado)
+                self.consultas_exactas[tuple(clave)] = futuro
+                # Solo se guardan las últimas selecciones
+                while len(self.consultas_exactas) > config.CACHE_MAX_ENTRADAS_FILTROS:
+                    self.consultas_exactas.pop(next(iter(self.consultas_exactas)))
+        return futuro
+    
+    def crear_aviso_aproximado(self, agregados):
+        """Insignia que indica que los gráficos muestran valores aproximados"""
+        if not agregados.get('aproximado'):
+            return []
+        return dbc.Badge(
+            f"≈ Valores aproximados: muestra de {agregados['filas_muestra']:,} filas, "
+            f"±{agregados['error_relativo']:.1%} en el total. Calculando el resultado exacto...",
+            color="warning", text_color="dark", className="mb-3 p-2"
+        )
+    
+    def crear_tab_analisis(self, df_filtrado, mostrar_predicciones, serie_temporal=None, agregados=None, clave=None):
         """Crear contenido de la pestaña de análisis con diseño premium"""
+        if agregados is None:
+            agregados = agregados_exactos(df_filtrado)
         
         # Gráfico de evolución temporal con predicciones
-        fig_temporal = self.crear_grafico_temporal_premium(df_filtrado, mostrar_predicciones)
+        fig_temporal = self.crear_grafico_temporal_premium(df_filtrado, mostrar_predicciones, serie_temporal)
         
         # Gráfico de top productos
-        fig_productos = self.crear_grafico_productos_premium(df_filtrado)
+        fig_productos = self.crear_grafico_productos_premium(df_filtrado, agregados)
         
         # Gráfico de categorías
-        fig_categorias = self.crear_grafico_categorias_premium(df_filtrado)
+        fig_categorias = self.crear_grafico_categorias_premium(df_filtrado, agregados)
         
         # Gráfico de vendedores
-        fig_vendedores = self.crear_grafico_vendedores_premium(df_filtrado)
+        fig_vendedores = self.crear_grafico_vendedores_premium(df_filtrado, agregados)
         
         return html.Div([
+            # Aviso de valores aproximados; se quita al llegar el resultado exacto
+            html.Div(self.crear_aviso_aproximado(agregados), id='aviso-aproximado'),
+            dcc.Store(id='clave-exactos', data=clave),
+            dcc.Interval(id='intervalo-exactos', interval=config.INTERVALO_CONSULTA_EXACTA_MS,
+                         disabled=not agregados.get('aproximado')),
+            
             # Primera fila - Gráfico principal
             dbc.Row([
                 dbc.Col([
@@ -673,7 +886,7 @@ class DashboardIA:
                             "Top 10 Productos"
                         ], style={'backgroundColor': '#2ecc71', 'color': 'white', 'fontWeight': 'bold'}),
                         dbc.CardBody([
-                            dcc.Graph(figure=fig_productos, style={'height': '350px'})
+                            dcc.Graph(id='grafico-productos-ia', figure=fig_productos, style={'height': '350px'})
                         ])
                     ], style={'boxShadow': '0 4px 15px rgba(0,0,0,0.1)', 'border': 'none'})
                 ], width=6),
@@ -684,7 +897,7 @@ class DashboardIA:
                             "Distribución por Categorías"
                         ], style={'backgroundColor': '#f39c12', 'color': 'white', 'fontWeight': 'bold'}),
                         dbc.CardBody([
-                            dcc.Graph(figure=fig_categorias, style={'height': '350px'})
+                            dcc.Graph(id='grafico-categorias-ia', figure=fig_categorias, style={'height': '350px'})
                         ])
                     ], style={'boxShadow': '0 4px 15px rgba(0,0,0,0.1)', 'border': 'none'})
                 ], width=6)
@@ -699,26 +912,34 @@ class DashboardIA:
                             "Rendimiento por Vendedor"
                         ], style={'backgroundColor': '#9b59b6', 'color': 'white', 'fontWeight': 'bold'}),
                         dbc.CardBody([
-                            dcc.Graph(figure=fig_vendedores, style={'height': '350px'})
+                            dcc.Graph(id='grafico-vendedores-ia', figure=fig_vendedores, style={'height': '350px'})
                         ])
                     ], style={'boxShadow': '0 4px 15px rgba(0,0,0,0.1)', 'border': 'none'})
                 ], width=12)
             ])
         ])
     
-    def crear_grafico_temporal_premium(self, df_filtrado, mostrar_predicciones):
+    def crear_grafico_temporal_premium(self, df_filtrado, mostrar_predicciones, serie_temporal=None):
         """Crear gráfico temporal con diseño premium y predicciones"""
-        # Agrupar por fecha
-        ventas_diarias = df_filtrado.groupby('FECHA')['TOTAL_VENTA'].sum().reset_index()
+        # Agrupar por día, semana o mes según el rango
+        ventas_periodo, granularidad = serie_temporal or serie_ventas(df_filtrado)
+        periodo = nombre_granularidad(granularidad)
+        nombre_serie = '📊 Ventas Históricas'
+        valores = ventas_periodo['TOTAL_VENTA']
+        if mostrar_predicciones and granularidad != 'D':
+            # Las predicciones son diarias: la historia se muestra como promedio diario del periodo
+            valores = promedio_diario(ventas_periodo)
+            nombre_serie = f'📊 Ventas Históricas (promedio diario por {periodo})'
         
         fig = go.Figure()
         
         # Datos históricos con diseño mejorado
-        fig.add_trace(go.Scatter(
-            x=ventas_diarias['FECHA'],
-            y=ventas_diarias['TOTAL_VENTA'],
+        # Historias largas: la serie se reduce conservando su forma (y pasa a WebGL si es densa)
+        fig.add_trace(traza_temporal(
+            ventas_periodo['FECHA'],
+            valores,
             mode='lines+markers',
-            name='📊 Ventas Históricas',
+            name=nombre_serie,
             line=dict(color='#3498db', width=4),
             marker=dict(size=8, color='#2980b9'),
             hovertemplate='<b>Fecha:</b> %{x}<br><b>Ventas:</b> $%{y:,.0f}<extra></extra>'
@@ -744,7 +965,7 @@ class DashboardIA:
         
         fig.update_layout(
             title={
-                'text': "📈 Evolución de Ventas en el Tiempo",
+                'text': f"📈 Evolución de Ventas por {periodo}",
                 'x': 0.5,
                 'xanchor': 'center',
                 'font': {'size': 20, 'color': '#2c3e50'}
@@ -768,8 +989,8 @@ class DashboardIA:
         
         return fig
     
-    def crear_grafico_productos_premium(self, df_filtrado):
-        """Crear gráfico de productos con diseño premium"""
+    def crear_grafico_productos_premium(self, df_filtrado, agregados=None):
+        """Crear gráfico de productos con diseño premium (agregados: ver aproximacion.agregados_exactos)"""
         if 'PRODUCTO' not in df_filtrado.columns:
             return go.Figure().add_annotation(
                 text="No hay datos de productos disponibles", 
@@ -777,7 +998,10 @@ class DashboardIA:
                 font=dict(size=16, color="gray")
             )
         
-        top_productos = df_filtrado.groupby('PRODUCTO')['TOTAL_VENTA'].sum().nlargest(10)
+        if agregados is None:
+            agregados = {'top_productos': df_filtrado.groupby('PRODUCTO')['TOTAL_VENTA'].sum().nlargest(10)}
+        top_productos = agregados['top_productos']
+        errores = agregados.get('errores', {}).get('top_productos')
         
         colors = ['#3498db', '#e74c3c', '#2ecc71', '#f39c12', '#9b59b6', 
                  '#1abc9c', '#34495e', '#e67e22', '#95a5a6', '#f1c40f']
@@ -791,13 +1015,14 @@ class DashboardIA:
                     color=colors[:len(top_productos)],
                     line=dict(color='rgba(0,0,0,0.1)', width=1)
                 ),
+                error_x=self._barras_error(errores, top_productos),
                 hovertemplate='<b>%{y}</b><br>Ventas: $%{x:,.0f}<extra></extra>'
             )
         ])
         
         fig.update_layout(
             title={
-                'text': "🏆 Top 10 Productos por Ventas",
+                'text': "🏆 Top 10 Productos por Ventas" + (" (≈)" if agregados.get('aproximado') else ""),
                 'x': 0.5,
                 'xanchor': 'center',
                 'font': {'size': 18, 'color': '#2c3e50'}
@@ -812,7 +1037,7 @@ class DashboardIA:
         
         return fig
     
-    def crear_grafico_categorias_premium(self, df_filtrado):
+    def crear_grafico_categorias_premium(self, df_filtrado, agregados=None):
         """Crear gráfico de categorías con diseño premium"""
         if 'CATEGORIA' not in df_filtrado.columns:
             return go.Figure().add_annotation(
@@ -821,7 +1046,12 @@ class DashboardIA:
                 font=dict(size=16, color="gray")
             )
         
-        ventas_categoria = df_filtrado.groupby('CATEGORIA')['TOTAL_VENTA'].sum()
+        if agregados is None:
+            agregados = {'por_categoria': df_filtrado.groupby('CATEGORIA')['TOTAL_VENTA'].sum()}
+        ventas_categoria = agregados['por_categoria']
+        errores = agregados.get('errores', {}).get('por_categoria')
+        # El pastel no admite barras de error: el margen se muestra al pasar el cursor
+        margen = '' if errores is None else '<br>Margen: ±$%{customdata:,.0f}'
         
         colors = ['#3498db', '#e74c3c', '#2ecc71', '#f39c12', '#9b59b6']
         
@@ -834,13 +1064,14 @@ class DashboardIA:
                     colors=colors[:len(ventas_categoria)],
                     line=dict(color='white', width=2)
                 ),
-                hovertemplate='<b>%{label}</b><br>Ventas: $%{value:,.0f}<br>Porcentaje: %{percent}<extra></extra>'
+                customdata=None if errores is None else errores.reindex(ventas_categoria.index).values,
+                hovertemplate='<b>%{label}</b><br>Ventas: $%{value:,.0f}' + margen + '<br>Porcentaje: %{percent}<extra></extra>'
             )
         ])
         
         fig.update_layout(
             title={
-                'text': "🎯 Distribución de Ventas por Categoría",
+                'text': "🎯 Distribución de Ventas por Categoría" + (" (≈)" if agregados.get('aproximado') else ""),
                 'x': 0.5,
                 'xanchor': 'center',
                 'font': {'size': 18, 'color': '#2c3e50'}
@@ -861,7 +1092,7 @@ class DashboardIA:
         
         return fig
     
-    def crear_grafico_vendedores_premium(self, df_filtrado):
+    def crear_grafico_vendedores_premium(self, df_filtrado, agregados=None):
         """Crear gráfico de vendedores con diseño premium"""
         if 'VENDEDOR' not in df_filtrado.columns:
             return go.Figure().add_annotation(
@@ -870,7 +1101,10 @@ class DashboardIA:
                 font=dict(size=16, color="gray")
             )
         
-        vendedor_ventas = df_filtrado.groupby('VENDEDOR')['TOTAL_VENTA'].sum().sort_values(ascending=True)
+        if agregados is None:
+            agregados = {'por_vendedor': df_filtrado.groupby('VENDEDOR')['TOTAL_VENTA'].sum()}
+        vendedor_ventas = agregados['por_vendedor'].sort_values(ascending=True)
+        errores = agregados.get('errores', {}).get('por_vendedor')
         
         colors = ['#e74c3c' if i == len(vendedor_ventas)-1 else '#3498db' for i in range(len(vendedor_ventas))]
         
@@ -883,13 +1117,14 @@ class DashboardIA:
                     color=colors,
                     line=dict(color='rgba(0,0,0,0.1)', width=1)
                 ),
+                error_x=self._barras_error(errores, vendedor_ventas),
                 hovertemplate='<b>%{y}</b><br>Ventas: $%{x:,.0f}<extra></extra>'
             )
         ])
         
         fig.update_layout(
             title={
-                'text': "👥 Rendimiento por Vendedor",
+                'text': "👥 Rendimiento por Vendedor" + (" (≈)" if agregados.get('aproximado') else ""),
                 'x': 0.5,
                 'xanchor': 'center',
                 'font': {'size': 18, 'color': '#2c3e50'}
@@ -904,6 +1139,13 @@ class DashboardIA:
         
         return fig
     
+    @staticmethod
+    def _barras_error(errores, valores):
+        """Barras de error de los valores aproximados (ninguna si son exactos)"""
+        if errores is None:
+            return None
+        return dict(type='data', array=errores.reindex(valores.index).values, color='#7f8c8d', thickness=1.5)
+    
     # Mantener compatibilidad con métodos anteriores
     def crear_grafico_temporal(self, df_filtrado, mostrar_predicciones):
         return self.crear_grafico_temporal_premium(df_filtrado, mostrar_predicciones)
@@ -1147,7 +1389,9 @@ class DashboardIA:
                 columns=[
                     {'name': '📅 Fecha', 'id': 'FECHA', 'type': 'datetime'},
                     {'name': '💰 Venta Predicha ($)', 'id': 'VENTA_PREDICHA', 'type': 'numeric', 'format': {'specifier': ',.2f'}},
-                    {'name': '🎯 Confianza (%)', 'id': 'CONFIANZA', 'type': 'numeric', 'format': {'specifier': '.1f'}}
+                    {'name': '🎯 Confianza (%)', 'id': 'CONFIANZA', 'type': 'numeric', 'format': {'specifier': '.1f'}},
+                    {'name': '⬇️ Límite Inferior ($)', 'id': 'LIMITE_INFERIOR', 'type': 'numeric', 'format': {'specifier': ',.2f'}},
+                    {'name': '⬆️ Límite Superior ($)', 'id': 'LIMITE_SUPERIOR', 'type': 'numeric', 'format': {'specifier': ',.2f'}}
                 ],
                 style_cell={
                     'textAlign': 'center',
@@ -1224,13 +1468,96 @@ class DashboardIA:
                 ], color="danger", className="text-center")
             ])
     
-    def ejecutar(self, puerto=8051):
+    def crear_tab_anomalias(self, start_date, end_date, categoria, vendedor):
+        """Crear contenido de la pestaña de anomalías (días atípicos de cada serie)"""
+        anomalias = self.detector_anomalias().recientes(start_date, end_date)
+        # Los filtros de categoría y vendedor dejan solo la serie elegida de esa dimensión
+        if categoria and categoria != 'todas':
+            anomalias = anomalias[(anomalias['DIMENSION'] != 'CATEGORIA') | (anomalias['VALOR'] == categoria)]
+        if vendedor and vendedor != 'todos':
+            anomalias = anomalias[(anomalias['DIMENSION'] != 'VENDEDOR') | (anomalias['VALOR'] == vendedor)]
+        
+        if anomalias.empty:
+            return dbc.Alert([
+                html.H4("🚨 Sin anomalías"),
+                html.P(f"Ningún día de los últimos {config.DIAS_ANOMALIAS} se aparta de lo esperado "
+                       f"(puntaje z mayor a {config.UMBRAL_ANOMALIA}) con los filtros elegidos.")
+            ], color="success", className="text-center")
+        
+        alzas = int((anomalias['PUNTAJE'] > 0).sum())
+        resumen = dbc.Row([
+            dbc.Col(dbc.Card(dbc.CardBody([
+                html.H3(f"{alzas:,}", className="text-success mb-0"),
+                html.P("📈 Alzas atípicas", className="text-muted mb-0")
+            ]), className="text-center"), width=4),
+            dbc.Col(dbc.Card(dbc.CardBody([
+                html.H3(f"{len(anomalias) - alzas:,}", className="text-danger mb-0"),
+                html.P("📉 Caídas atípicas", className="text-muted mb-0")
+            ]), className="text-center"), width=4),
+            dbc.Col(dbc.Card(dbc.CardBody([
+                html.H3(f"{anomalias[['DIMENSION', 'VALOR']].drop_duplicates().shape[0]:,}", className="text-primary mb-0"),
+                html.P("🧭 Series afectadas", className="text-muted mb-0")
+            ]), className="text-center"), width=4)
+        ], className="mb-4")
+        
+        fig = px.scatter(
+            anomalias, x='FECHA', y='PUNTAJE', color='DIMENSION', symbol='TIPO',
+            hover_data={'VALOR': True, 'TOTAL_VENTA': ':$,.0f', 'ESPERADO': ':$,.0f', 'IMPACTO': ':$,.0f', 'PUNTAJE': ':.1f'},
+            color_discrete_sequence=config.COLORES_GRAFICOS
+        )
+        for umbral in (config.UMBRAL_ANOMALIA, -config.UMBRAL_ANOMALIA):
+            fig.add_hline(y=umbral, line_dash='dash', line_color='#7f8c8d')
+        fig.update_layout(
+            title={
+                'text': "🚨 Días Atípicos por Serie (puntaje z)",
+                'x': 0.5,
+                'xanchor': 'center',
+                'font': {'size': 18, 'color': '#2c3e50'}
+            },
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+            margin=dict(l=20, r=20, t=60, b=20)
+        )
+        
+        # Las que más se apartan en pesos primero (no las series chicas con puntaje alto)
+        principales = anomalias.reindex(anomalias['IMPACTO'].abs().sort_values(ascending=False).index)
+        tabla = dash_table.DataTable(
+            data=principales.assign(FECHA=principales['FECHA'].dt.strftime('%Y-%m-%d')).to_dict('records'),
+            columns=[
+                {'name': '📅 Fecha', 'id': 'FECHA'},
+                {'name': '🧭 Dimensión', 'id': 'DIMENSION'},
+                {'name': '🏷️ Serie', 'id': 'VALOR'},
+                {'name': '💰 Ventas ($)', 'id': 'TOTAL_VENTA', 'type': 'numeric', 'format': {'specifier': ',.2f'}},
+                {'name': '🎯 Esperado ($)', 'id': 'ESPERADO', 'type': 'numeric', 'format': {'specifier': ',.2f'}},
+                {'name': '⚖️ Impacto ($)', 'id': 'IMPACTO', 'type': 'numeric', 'format': {'specifier': ',.2f'}},
+                {'name': '📏 Puntaje', 'id': 'PUNTAJE', 'type': 'numeric', 'format': {'specifier': '.1f'}},
+                {'name': '🚨 Tipo', 'id': 'TIPO'}
+            ],
+            page_size=10,
+            sort_action='native',
+            style_cell={'textAlign': 'center', 'fontFamily': 'Arial, sans-serif', 'fontSize': '14px', 'padding': '10px'},
+            style_header={'backgroundColor': '#c0392b', 'color': 'white', 'fontWeight': 'bold', 'border': 'none'},
+            style_data_conditional=[{'if': {'row_index': 'odd'}, 'backgroundColor': '#f8f9fa'}]
+        )
+        
+        return dbc.Container([
+            resumen,
+            dbc.Row([dbc.Col([dbc.Card([dbc.CardBody([dcc.Graph(figure=fig)])])])], className="mb-4"),
+            dbc.Row([dbc.Col([dbc.Card([
+                dbc.CardHeader(html.H4("📋 Anomalías Detalladas", className="mb-0")),
+                dbc.CardBody([tabla])
+            ])])])
+        ], fluid=True)
+    
+    def ejecutar(self, puerto=8051, host='0.0.0.0'):
         """Ejecutar el dashboard"""
         print(f"🚀 Iniciando Dashboard IA Premium en http://localhost:{puerto}")
         print("🤖 Funcionalidades de IA activadas" if IA_DISPONIBLE else "⚠️ IA no disponible")
         print("🎨 Interfaz premium con diseño moderno activada")
         print("🌟 Dashboard con gradientes, iconos y animaciones")
-        self.app.run(debug=False, port=puerto, host='0.0.0.0')
+        if config.AUTOREFRESH_DASHBOARD:
+            self.almacen.iniciar_vigilancia()
+        self.app.run(debug=False, port=puerto, host=host)
 
 def main():
     """Función principal"""
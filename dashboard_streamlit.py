@@ -12,6 +12,12 @@ from datetime import datetime, timedelta
 import numpy as np
 import os
 
+import config
+from almacen_datos import huella_contenido, leer_ventas
+from muestreo import traza_temporal
+from particiones import cargar_particiones, particiones_disponibles
+from series_tiempo import ResumenTemporal, nombre_granularidad, promedio_diario, serie_ventas
+
 # Importar módulo de IA
 try:
     from analisis_ia import AnalisisIA
@@ -65,27 +71,41 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
-def cargar_datos():
-    """Cargar y cachear los datos"""
-    import os
+def buscar_archivo_consolidado():
+    """Primer consolidado en la carpeta actual, o None"""
     archivos_disponibles = [f for f in os.listdir('.') if f.endswith('.xlsx') and 'consolidado' in f.lower()]
-    if not archivos_disponibles:
-        return None
-    
-    df = pd.read_excel(archivos_disponibles[0])
-    df['FECHA'] = pd.to_datetime(df['FECHA'])
-    return df
+    return archivos_disponibles[0] if archivos_disponibles else None
 
-@st.cache_resource
-def inicializar_ia(archivo_datos):
-    """Inicializar y cachear el modelo de IA"""
+# Datos y modelo se indexan por la huella del contenido (tamaño, fecha y hash):
+# cualquier versión nueva del consolidado invalida ambos a la vez.
+# Se guardan como recursos compartidos para no copiar el DataFrame completo en cada
+# ejecución del script (cache_data lo deserializa cada vez): no modificarlos.
+@st.cache_resource(ttl=config.CACHE_TTL_SEGUNDOS, max_entries=config.CACHE_MAX_VERSIONES)
+def cargar_datos(_archivo_datos, huella):
+    """Cargar y cachear los datos de una versión del consolidado"""
+    return leer_ventas(_archivo_datos)
+
+@st.cache_resource(ttl=config.CACHE_TTL_SEGUNDOS, max_entries=config.CACHE_MAX_VERSIONES)
+def inicializar_ia(_df, huella):
+    """Inicializar y cachear el modelo de IA de una versión, reutilizando el DataFrame ya cargado"""
     if IA_DISPONIBLE:
-        ia = AnalisisIA(archivo_datos)
+        ia = AnalisisIA(df=_df)
         ia.entrenar_modelo_prediccion()
         return ia
     return None
 
+@st.cache_resource(ttl=config.CACHE_TTL_SEGUNDOS, max_entries=config.CACHE_MAX_VERSIONES)
+def resumen_temporal(_df, huella):
+    """Ventas por día, semana y mes de una versión (en total, por categoría y por vendedor)"""
+    return ResumenTemporal(_df)
+
+if config.AUTOREFRESH_DASHBOARD:
+    @st.fragment(run_every=config.INTERVALO_ACTUALIZACION_SEGUNDOS)
+    def vigilar_datos(huella):
+        """Volver a ejecutar la página cuando aparece una versión nueva del consolidado"""
+        if huella_contenido(buscar_archivo_consolidado()) != huella:
+            st.rerun()
+
 def formato_numero(num):
     """Formatear números de manera legible"""
     if num >= 1000000:
@@ -95,18 +115,26 @@ def formato_numero(num):
     else:
         return f"${num:.0f}"
 
-def crear_grafico_temporal_streamlit(df_filtrado, ia_modelo=None, mostrar_predicciones=False):
-    """Crear gráfico temporal optimizado para Streamlit"""
-    ventas_diarias = df_filtrado.groupby('FECHA')['TOTAL_VENTA'].sum().reset_index()
+def crear_grafico_temporal_streamlit(df_filtrado, ia_modelo=None, mostrar_predicciones=False, serie_temporal=None):
+    """Crear gráfico temporal optimizado para Streamlit (por día, semana o mes según el rango)"""
+    ventas_periodo, granularidad = serie_temporal or serie_ventas(df_filtrado)
+    periodo = nombre_granularidad(granularidad)
+    nombre_serie = '📊 Ventas Históricas'
+    valores = ventas_periodo['TOTAL_VENTA']
+    if mostrar_predicciones and granularidad != 'D':
+        # Las predicciones son diarias: la historia se muestra como promedio diario del periodo
+        valores = promedio_diario(ventas_periodo)
+        nombre_serie = f'📊 Ventas Históricas (promedio diario por {periodo})'
     
     fig = go.Figure()
     
     # Datos históricos
-    fig.add_trace(go.Scatter(
-        x=ventas_diarias['FECHA'],
-        y=ventas_diarias['TOTAL_VENTA'],
+    # Historias largas: la serie se reduce conservando su forma (y pasa a WebGL si es densa)
+    fig.add_trace(traza_temporal(
+        ventas_periodo['FECHA'],
+        valores,
         mode='lines+markers',
-        name='📊 Ventas Históricas',
+        name=nombre_serie,
         line=dict(color='#1f77b4', width=3),
         marker=dict(size=6),
         hovertemplate='<b>%{x}</b><br>Ventas: $%{y:,.0f}<extra></extra>'
@@ -131,7 +159,7 @@ def crear_grafico_temporal_streamlit(df_filtrado, ia_modelo=None, mostrar_predic
             pass
     
     fig.update_layout(
-        title="📈 Evolución de Ventas en el Tiempo",
+        title=f"📈 Evolución de Ventas por {periodo}",
         xaxis_title="Fecha",
         yaxis_title="Ventas ($)",
         template="plotly_white",
@@ -188,6 +216,142 @@ def crear_grafico_categorias_streamlit(df_filtrado):
     
     return fig
 
+# --- CACHÉS POR VERSIÓN DE DATOS Y FILTROS ---
+# Cada caché se indexa con la huella del archivo (su versión) y la tupla de
+# filtros; los argumentos que empiezan con "_" (DataFrame, modelo) no se hashean.
+
+@st.cache_resource(ttl=config.CACHE_TTL_SEGUNDOS, max_entries=config.CACHE_MAX_ENTRADAS_FILTROS)
+def filtrar_datos(_df, huella, filtros):
+    """Filas que cumplen los filtros (recurso compartido, no modificarlo)"""
+    fecha_inicio, fecha_fin, categoria, vendedor = filtros
+    if config.USAR_PARTICIONES and particiones_disponibles('.'):
+        # Consolidado particionado: solo se leen los meses que se cruzan con el rango
+        _df = cargar_particiones('.', fecha_inicio, fecha_fin)
+    mascara = (_df['FECHA'] >= pd.to_datetime(fecha_inicio)) & (_df['FECHA'] <= pd.to_datetime(fecha_fin))
+    if categoria != 'Todas' and 'CATEGORIA' in _df.columns:
+        mascara &= _df['CATEGORIA'] == categoria
+    if vendedor != 'Todos' and 'VENDEDOR' in _df.columns:
+        mascara &= _df['VENDEDOR'] == vendedor
+    return _df[mascara]
+
+@st.cache_data(ttl=config.CACHE_TTL_SEGUNDOS, max_entries=config.CACHE_MAX_ENTRADAS_FILTROS)
+def calcular_metricas(_df_filtrado, huella, filtros):
+    """Métricas principales de la selección"""
+    num_transacciones = len(_df_filtrado)
+    mejor_vendedor = None
+    if 'VENDEDOR' in _df_filtrado.columns and num_transacciones > 0:
+        mejor_vendedor = _df_filtrado.groupby('VENDEDOR')['TOTAL_VENTA'].sum().idxmax()
+    return {
+        'num_transacciones': num_transacciones,
+        'total_ventas': _df_filtrado['TOTAL_VENTA'].sum(),
+        'productos_vendidos': _df_filtrado['CANTIDAD'].sum() if 'CANTIDAD' in _df_filtrado.columns else 0,
+        'venta_promedio': _df_filtrado['TOTAL_VENTA'].mean() if num_transacciones > 0 else 0,
+        'mejor_vendedor': mejor_vendedor,
+        'ventas_ultima_semana': _df_filtrado['TOTAL_VENTA'].tail(7).sum()
+    }
+
+@st.cache_data(ttl=config.CACHE_TTL_SEGUNDOS, max_entries=config.CACHE_MAX_ENTRADAS_FILTROS)
+def figura_temporal(_df_filtrado, _ia_modelo, _resumen, huella, filtros, mostrar_predicciones):
+    """Gráfico temporal de la selección, con o sin predicciones (serie desde los resúmenes)"""
+    fecha_inicio, fecha_fin, categoria, vendedor = filtros
+    serie_temporal = serie_ventas(_df_filtrado, _resumen, fecha_inicio, fecha_fin,
+                                  categoria=None if categoria == 'Todas' else categoria,
+                                  vendedor=None if vendedor == 'Todos' else vendedor)
+    return crear_grafico_temporal_streamlit(_df_filtrado, _ia_modelo, mostrar_predicciones, serie_temporal)
+
+@st.cache_data(ttl=config.CACHE_TTL_SEGUNDOS, max_entries=config.CACHE_MAX_ENTRADAS_FILTROS)
+def figuras_resumen(_df_filtrado, huella, filtros):
+    """Gráficos de productos y categorías de la selección"""
+    return crear_grafico_productos_streamlit(_df_filtrado), crear_grafico_categorias_streamlit(_df_filtrado)
+
+@st.cache_data(ttl=config.CACHE_TTL_SEGUNDOS, max_entries=config.CACHE_MAX_VERSIONES)
+def tendencias_ia(_ia_modelo, huella):
+    """Tendencias sobre todos los datos: solo cambian con una versión nueva del archivo"""
+    return _ia_modelo.analizar_tendencias()
+
+@st.cache_data(ttl=config.CACHE_TTL_SEGUNDOS, max_entries=config.CACHE_MAX_VERSIONES)
+def recomendaciones_ia(_ia_modelo, huella):
+    """Recomendaciones sobre todos los datos: solo cambian con una versión nueva del archivo"""
+    return _ia_modelo.generar_recomendaciones()
+
+@st.fragment
+def seccion_predicciones(df_filtrado, ia_modelo, resumen, huella, filtros, metricas):
+    """Predicciones y evolución temporal: el interruptor solo vuelve a ejecutar esta sección"""
+    mostrar_predicciones = st.toggle(
+        "🔮 Mostrar predicciones IA",
+        value=IA_DISPONIBLE,
+        disabled=not IA_DISPONIBLE,
+        key='mostrar_predicciones'
+    )
+    
+    # Predicciones con IA (si está disponible)
+    if mostrar_predicciones and ia_modelo:
+        st.header("🔮 Predicciones con IA")
+        
+        try:
+            pred_7_dias = ia_modelo.predecir_ventas_futuras(7)
+            if pred_7_dias is not None:
+                col_pred1, col_pred2, col_pred3 = st.columns(3)
+                
+                with col_pred1:
+                    st.metric(
+                        label="📈 Predicción 7 días",
+                        value=formato_numero(pred_7_dias['VENTA_PREDICHA'].sum()),
+                        delta=f"Confianza: {pred_7_dias['CONFIANZA'].mean():.1f}%"
+                    )
+                
+                with col_pred2:
+                    ultima_semana = metricas['ventas_ultima_semana']
+                    crecimiento = ((pred_7_dias['VENTA_PREDICHA'].sum() - ultima_semana) / 
+                                 ultima_semana * 100) if metricas['num_transacciones'] >= 7 else 0
+                    st.metric(
+                        label="📊 Crecimiento Esperado",
+                        value=f"{crecimiento:+.1f}%",
+                        delta="vs. última semana"
+                    )
+                
+                with col_pred3:
+                    st.metric(
+                        label="🎯 Precisión del Modelo",
+                        value="99.9%",
+                        delta="R² Score"
+                    )
+                
+                # Tabla de predicciones
+                st.subheader("📋 Predicciones Detalladas")
+                st.dataframe(
+                    pred_7_dias[['FECHA', 'VENTA_PREDICHA', 'CONFIANZA', 'LIMITE_INFERIOR', 'LIMITE_SUPERIOR']].head(7),
+                    column_config={
+                        "FECHA": st.column_config.DateColumn("📅 Fecha"),
+                        "VENTA_PREDICHA": st.column_config.NumberColumn(
+                            "💰 Venta Predicha",
+                            format="$%.2f"
+                        ),
+                        "CONFIANZA": st.column_config.ProgressColumn(
+                            "🎯 Confianza",
+                            min_value=0,
+                            max_value=100,
+                            format="%.1f%%"
+                        ),
+                        "LIMITE_INFERIOR": st.column_config.NumberColumn(
+                            "⬇️ Límite Inferior",
+                            format="$%.2f"
+                        ),
+                        "LIMITE_SUPERIOR": st.column_config.NumberColumn(
+                            "⬆️ Límite Superior",
+                            format="$%.2f"
+                        )
+                    },
+                    hide_index=True
+                )
+        except Exception as e:
+            st.error(f"Error al generar predicciones: {str(e)}")
+    
+    # Gráfico temporal
+    st.header("📈 Análisis Visual")
+    st.plotly_chart(figura_temporal(df_filtrado, ia_modelo, resumen, huella, filtros, mostrar_predicciones),
+                    use_container_width=True)
+
 def main():
     """Función principal del dashboard Streamlit"""
     
@@ -200,7 +364,9 @@ def main():
         st.warning("⚠️ IA no disponible. Instala: pip install scikit-learn")
     
     # Cargar datos
-    df = cargar_datos()
+    archivo_datos = buscar_archivo_consolidado()
+    huella = huella_contenido(archivo_datos)
+    df = cargar_datos(archivo_datos, huella) if huella is not None else None
     if df is None:
         st.error("❌ No se encontró archivo de datos consolidados")
         st.info("💡 Ejecuta primero el script de consolidación")
@@ -209,11 +375,11 @@ def main():
     # Inicializar IA
     ia_modelo = None
     if IA_DISPONIBLE:
-        import os
-        archivos_disponibles = [f for f in os.listdir('.') if f.endswith('.xlsx') and 'consolidado' in f.lower()]
-        if archivos_disponibles:
-            with st.spinner("🤖 Entrenando modelo de IA..."):
-                ia_modelo = inicializar_ia(archivos_disponibles[0])
+        with st.spinner("🤖 Entrenando modelo de IA..."):
+            ia_modelo = inicializar_ia(df, huella)
+    
+    if config.AUTOREFRESH_DASHBOARD:
+        vigilar_datos(huella)
     
     # Sidebar con controles
     with st.sidebar:
@@ -248,34 +414,16 @@ def main():
         vendedores = ['Todos'] + list(df['VENDEDOR'].dropna().unique()) if 'VENDEDOR' in df.columns else ['Todos']
         vendedor_seleccionado = st.selectbox("Seleccionar vendedor", vendedores)
         
-        # Control de predicciones
-        st.subheader("🔮 Predicciones IA")
-        mostrar_predicciones = st.toggle(
-            "Mostrar predicciones",
-            value=IA_DISPONIBLE,
-            disabled=not IA_DISPONIBLE
-        )
-        
         # Información adicional
         st.markdown("---")
         st.info(f"📊 **Total registros:** {len(df):,}")
         if IA_DISPONIBLE and ia_modelo:
             st.success("🤖 **IA:** Modelo entrenado")
         
-    # Filtrar datos
-    df_filtrado = df.copy()
-    
-    # Aplicar filtros
-    df_filtrado = df_filtrado[
-        (df_filtrado['FECHA'] >= pd.to_datetime(fecha_inicio)) &
-        (df_filtrado['FECHA'] <= pd.to_datetime(fecha_fin))
-    ]
-    
-    if categoria_seleccionada != 'Todas' and 'CATEGORIA' in df_filtrado.columns:
-        df_filtrado = df_filtrado[df_filtrado['CATEGORIA'] == categoria_seleccionada]
-    
-    if vendedor_seleccionado != 'Todos' and 'VENDEDOR' in df_filtrado.columns:
-        df_filtrado = df_filtrado[df_filtrado['VENDEDOR'] == vendedor_seleccionado]
+    # Filtrar datos (cacheado por versión del archivo y filtros)
+    filtros = (fecha_inicio, fecha_fin, categoria_seleccionada, vendedor_seleccionado)
+    df_filtrado = filtrar_datos(df, huella, filtros)
+    metricas = calcular_metricas(df_filtrado, huella, filtros)
     
     # Métricas principales
     st.header("📊 Métricas Principales")
@@ -283,31 +431,29 @@ def main():
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        total_ventas = df_filtrado['TOTAL_VENTA'].sum()
         st.metric(
             label="💰 Ventas Totales",
-            value=formato_numero(total_ventas),
-            delta=f"{len(df_filtrado)} transacciones"
+            value=formato_numero(metricas['total_ventas']),
+            delta=f"{metricas['num_transacciones']} transacciones"
         )
     
     with col2:
-        productos_vendidos = df_filtrado['CANTIDAD'].sum() if 'CANTIDAD' in df_filtrado.columns else 0
+        productos_vendidos = metricas['productos_vendidos']
         st.metric(
             label="📦 Productos Vendidos",
             value=f"{productos_vendidos:,}",
-            delta=f"Promedio: {productos_vendidos/len(df_filtrado):.1f}" if len(df_filtrado) > 0 else "0"
+            delta=f"Promedio: {productos_vendidos/metricas['num_transacciones']:.1f}" if metricas['num_transacciones'] > 0 else "0"
         )
     
     with col3:
-        venta_promedio = df_filtrado['TOTAL_VENTA'].mean() if len(df_filtrado) > 0 else 0
         st.metric(
             label="🎯 Venta Promedio",
-            value=formato_numero(venta_promedio)
+            value=formato_numero(metricas['venta_promedio'])
         )
     
     with col4:
-        if 'VENDEDOR' in df_filtrado.columns and len(df_filtrado) > 0:
-            mejor_vendedor = df_filtrado.groupby('VENDEDOR')['TOTAL_VENTA'].sum().idxmax()
+        mejor_vendedor = metricas['mejor_vendedor']
+        if mejor_vendedor is not None:
             mejor_vendedor_display = mejor_vendedor[:15] + "..." if len(mejor_vendedor) > 15 else mejor_vendedor
         else:
             mejor_vendedor_display = "N/A"
@@ -317,79 +463,21 @@ def main():
             value=mejor_vendedor_display
         )
     
-    # Predicciones con IA (si está disponible)
-    if mostrar_predicciones and ia_modelo:
-        st.header("🔮 Predicciones con IA")
-        
-        try:
-            pred_7_dias = ia_modelo.predecir_ventas_futuras(7)
-            if pred_7_dias is not None:
-                col_pred1, col_pred2, col_pred3 = st.columns(3)
-                
-                with col_pred1:
-                    st.metric(
-                        label="📈 Predicción 7 días",
-                        value=formato_numero(pred_7_dias['VENTA_PREDICHA'].sum()),
-                        delta=f"Confianza: {pred_7_dias['CONFIANZA'].mean():.1f}%"
-                    )
-                
-                with col_pred2:
-                    crecimiento = ((pred_7_dias['VENTA_PREDICHA'].sum() - df_filtrado['TOTAL_VENTA'].tail(7).sum()) / 
-                                 df_filtrado['TOTAL_VENTA'].tail(7).sum() * 100) if len(df_filtrado) >= 7 else 0
-                    st.metric(
-                        label="📊 Crecimiento Esperado",
-                        value=f"{crecimiento:+.1f}%",
-                        delta="vs. última semana"
-                    )
-                
-                with col_pred3:
-                    st.metric(
-                        label="🎯 Precisión del Modelo",
-                        value="99.9%",
-                        delta="R² Score"
-                    )
-                
-                # Tabla de predicciones
-                st.subheader("📋 Predicciones Detalladas")
-                st.dataframe(
-                    pred_7_dias[['FECHA', 'VENTA_PREDICHA', 'CONFIANZA']].head(7),
-                    column_config={
-                        "FECHA": st.column_config.DateColumn("📅 Fecha"),
-                        "VENTA_PREDICHA": st.column_config.NumberColumn(
-                            "💰 Venta Predicha",
-                            format="$%.2f"
-                        ),
-                        "CONFIANZA": st.column_config.ProgressColumn(
-                            "🎯 Confianza",
-                            min_value=0,
-                            max_value=100,
-                            format="%.1f%%"
-                        )
-                    },
-                    hide_index=True
-                )
-        except Exception as e:
-            st.error(f"Error al generar predicciones: {str(e)}")
-    
-    # Gráficos principales
-    st.header("📈 Análisis Visual")
-    
-    # Gráfico temporal
-    fig_temporal = crear_grafico_temporal_streamlit(df_filtrado, ia_modelo, mostrar_predicciones)
-    st.plotly_chart(fig_temporal, use_container_width=True)
+    # Predicciones y gráfico temporal en un fragmento propio
+    seccion_predicciones(df_filtrado, ia_modelo, resumen_temporal(df, huella), huella, filtros, metricas)
     
     # Segunda fila de gráficos
     col_left, col_right = st.columns(2)
     
+    fig_productos, fig_categorias = figuras_resumen(df_filtrado, huella, filtros)
+    
     with col_left:
-        fig_productos = crear_grafico_productos_streamlit(df_filtrado)
         if fig_productos:
             st.plotly_chart(fig_productos, use_container_width=True)
         else:
             st.info("📦 No hay datos de productos disponibles")
     
     with col_right:
-        fig_categorias = crear_grafico_categorias_streamlit(df_filtrado)
         if fig_categorias:
             st.plotly_chart(fig_categorias, use_container_width=True)
         else:
@@ -404,7 +492,7 @@ def main():
         with col_ia1:
             st.subheader("📊 Tendencias Detectadas")
             try:
-                tendencias = ia_modelo.analizar_tendencias()
+                tendencias = tendencias_ia(ia_modelo, huella)
                 if tendencias:
                     st.markdown(f"**📈 Tendencia General:** {tendencias.get('tendencia_general', 'N/A')}")
                     st.markdown(f"**⭐ Producto Estrella:** {tendencias.get('producto_estrella', 'N/A')}")
@@ -417,7 +505,7 @@ def main():
         with col_ia2:
             st.subheader("💡 Recomendaciones")
             try:
-                recomendaciones = ia_modelo.generar_recomendaciones()
+                recomendaciones = recomendaciones_ia(ia_modelo, huella)
                 for i, rec in enumerate(recomendaciones[:3]):  # Mostrar solo las primeras 3
                     color = ["blue", "green", "orange"][i % 3]
                     st.markdown(f"**{rec['tipo']}**")
@@ -5,111 +5,273 @@ Script de demostración para mostrar las capacidades de IA del sistema
 
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
 import os
 
-def crear_datos_demo_ia():
-    """Crear datos de demostración optimizados para IA"""
-    print("🎯 Creando datos de demostración para IA...")
-    
-    # Configurar semilla para reproducibilidad
-    np.random.seed(42)
-    
-    # Productos con diferentes características
-    productos = [
-        {"nombre": "iPhone 15 Pro", "categoria": "Electrónicos", "precio_base": 1299.99, "demanda": "alta"},
-        {"nombre": "Samsung Galaxy S24", "categoria": "Electrónicos", "precio_base": 1199.99, "demanda": "alta"},
-        {"nombre": "MacBook Pro", "categoria": "Computadoras", "precio_base": 2499.99, "demanda": "media"},
-        {"nombre": "Dell XPS 13", "categoria": "Computadoras", "precio_base": 1499.99, "demanda": "media"},
-        {"nombre": "iPad Air", "categoria": "Tablets", "precio_base": 699.99, "demanda": "alta"},
-        {"nombre": "Surface Pro", "categoria": "Tablets", "precio_base": 1099.99, "demanda": "baja"},
-        {"nombre": "AirPods Pro", "categoria": "Accesorios", "precio_base": 299.99, "demanda": "muy_alta"},
-        {"nombre": "Magic Mouse", "categoria": "Accesorios", "precio_base": 99.99, "demanda": "baja"},
-        {"nombre": "Monitor 4K", "categoria": "Monitores", "precio_base": 599.99, "demanda": "media"},
-        {"nombre": "Webcam HD", "categoria": "Accesorios", "precio_base": 149.99, "demanda": "media"}
-    ]
-    
-    # Vendedores con diferentes rendimientos
-    vendedores = [
-        {"nombre": "Ana García", "rendimiento": "excelente", "especialidad": "Electrónicos"},
-        {"nombre": "Carlos López", "rendimiento": "bueno", "especialidad": "Computadoras"},
-        {"nombre": "María Rodríguez", "rendimiento": "excelente", "especialidad": "Tablets"},
-        {"nombre": "Juan Martínez", "rendimiento": "regular", "especialidad": "Accesorios"},
-        {"nombre": "Laura Sánchez", "rendimiento": "bueno", "especialidad": "Monitores"},
-        {"nombre": "Pedro González", "rendimiento": "regular", "especialidad": "Electrónicos"}
-    ]
-    
-    # Factores de demanda por nivel
-    factores_demanda = {
-        "muy_alta": (3, 8),
-        "alta": (2, 5),
-        "media": (1, 3),
-        "baja": (1, 2)
+# Catálogo base de la demo: productos con diferentes características
+PRODUCTOS_BASE = [
+    {"nombre": "iPhone 15 Pro", "categoria": "Electrónicos", "precio_base": 1299.99, "demanda": "alta", "peso": 0.15},
+    {"nombre": "Samsung Galaxy S24", "categoria": "Electrónicos", "precio_base": 1199.99, "demanda": "alta", "peso": 0.12},
+    {"nombre": "MacBook Pro", "categoria": "Computadoras", "precio_base": 2499.99, "demanda": "media", "peso": 0.08},
+    {"nombre": "Dell XPS 13", "categoria": "Computadoras", "precio_base": 1499.99, "demanda": "media", "peso": 0.06},
+    {"nombre": "iPad Air", "categoria": "Tablets", "precio_base": 699.99, "demanda": "alta", "peso": 0.13},
+    {"nombre": "Surface Pro", "categoria": "Tablets", "precio_base": 1099.99, "demanda": "baja", "peso": 0.04},
+    {"nombre": "AirPods Pro", "categoria": "Accesorios", "precio_base": 299.99, "demanda": "muy_alta", "peso": 0.20},
+    {"nombre": "Magic Mouse", "categoria": "Accesorios", "precio_base": 99.99, "demanda": "baja", "peso": 0.03},
+    {"nombre": "Monitor 4K", "categoria": "Monitores", "precio_base": 599.99, "demanda": "media", "peso": 0.07},
+    {"nombre": "Webcam HD", "categoria": "Accesorios", "precio_base": 149.99, "demanda": "media", "peso": 0.12}
+]
+
+# Vendedores con diferentes rendimientos
+VENDEDORES_BASE = [
+    {"nombre": "Ana García", "rendimiento": "excelente", "especialidad": "Electrónicos"},
+    {"nombre": "Carlos López", "rendimiento": "bueno", "especialidad": "Computadoras"},
+    {"nombre": "María Rodríguez", "rendimiento": "excelente", "especialidad": "Tablets"},
+    {"nombre": "Juan Martínez", "rendimiento": "regular", "especialidad": "Accesorios"},
+    {"nombre": "Laura Sánchez", "rendimiento": "bueno", "especialidad": "Monitores"},
+    {"nombre": "Pedro González", "rendimiento": "regular", "especialidad": "Electrónicos"}
+]
+
+# Factores de demanda por nivel (cantidad mínima y máxima por transacción)
+FACTORES_DEMANDA = {
+    "muy_alta": (3, 8),
+    "alta": (2, 5),
+    "media": (1, 3),
+    "baja": (1, 2)
+}
+
+# Factores de rendimiento
+FACTORES_RENDIMIENTO = {
+    "excelente": 1.3,
+    "bueno": 1.1,
+    "regular": 0.9
+}
+
+# Límite de filas de una hoja de Excel (sin contar el encabezado)
+MAX_FILAS_HOJA_EXCEL = 1048575
+
+def crear_catalogo(num_productos=None, num_vendedores=None, num_categorias=None, semilla=42):
+    """
+    Construir el catálogo de productos, vendedores y categorías como arreglos.
+    Parte del catálogo base y lo amplía con elementos sintéticos si se piden más.
+    """
+    rng = np.random.default_rng(semilla)
+    num_productos = num_productos or len(PRODUCTOS_BASE)
+    num_vendedores = num_vendedores or len(VENDEDORES_BASE)
+
+    categorias = list(dict.fromkeys(p["categoria"] for p in PRODUCTOS_BASE))
+    if num_categorias:
+        categorias = (categorias + [f"Categoría {i + 1}" for i in range(len(categorias), num_categorias)])[:num_categorias]
+    indice_categoria = {categoria: i for i, categoria in enumerate(categorias)}
+
+    # Productos: los del catálogo base y, si faltan, productos sintéticos
+    base = PRODUCTOS_BASE[:num_productos]
+    extra = num_productos - len(base)
+    niveles = list(FACTORES_DEMANDA)
+    demanda = np.array([p["demanda"] for p in base] + list(rng.choice(niveles, extra)))
+    producto_categoria = np.array(
+        [indice_categoria.get(p["categoria"], i % len(categorias)) for i, p in enumerate(base)] +
+        list(np.arange(len(base), num_productos) % len(categorias)), dtype=np.int32)
+    pesos = np.array([p["peso"] for p in base] + list(rng.pareto(1.5, extra) + 0.01))
+
+    productos = {
+        "nombre": np.array([p["nombre"] for p in base] + [f"Producto {i + 1:05d}" for i in range(len(base), num_productos)]),
+        "categoria": producto_categoria,
+        "precio_base": np.array([p["precio_base"] for p in base] +
+                                list(np.round(rng.lognormal(5.5, 1.0, extra), 2))),
+        "peso": pesos / pesos.sum(),
+        "cantidad_min": np.array([FACTORES_DEMANDA[d][0] for d in demanda]),
+        "cantidad_max": np.array([FACTORES_DEMANDA[d][1] for d in demanda])
     }
-    
-    # Factores de rendimiento
-    factores_rendimiento = {
-        "excelente": 1.3,
-        "bueno": 1.1,
-        "regular": 0.9
+
+    # Vendedores: los del catálogo base y, si faltan, vendedores sintéticos
+    base = VENDEDORES_BASE[:num_vendedores]
+    extra = num_vendedores - len(base)
+    rendimiento = [v["rendimiento"] for v in base] + list(rng.choice(list(FACTORES_RENDIMIENTO), extra))
+    vendedores = {
+        "nombre": np.array([v["nombre"] for v in base] + [f"Vendedor {i + 1:04d}" for i in range(len(base), num_vendedores)]),
+        "especialidad": np.array([indice_categoria.get(v["especialidad"], -1) for v in base] +
+                                 list(rng.integers(0, len(categorias), extra)), dtype=np.int32),
+        "factor": np.array([FACTORES_RENDIMIENTO[r] for r in rendimiento])
     }
+
+    # Especialistas por categoría en una matriz rellena para elegirlos sin bucles
+    especialistas = [np.flatnonzero(vendedores["especialidad"] == c) for c in range(len(categorias))]
+    num_especialistas = np.array([len(e) for e in especialistas])
+    matriz = np.zeros((len(categorias), max(1, num_especialistas.max())), dtype=np.int32)
+    for c, e in enumerate(especialistas):
+        matriz[c, :len(e)] = e
+    vendedores["especialistas"] = matriz
+    vendedores["num_especialistas"] = num_especialistas
+
+    return {"productos": productos, "vendedores": vendedores, "categorias": np.array(categorias)}
+
+def generar_bloque_ventas(fechas, catalogo, rng, transacciones_dia=12, estacionalidad=0.2):
+    """
+    Generar todas las transacciones de un rango de fechas de forma vectorizada.
+    La estacionalidad es la amplitud de la variación anual del número de transacciones.
+    """
+    productos = catalogo["productos"]
+    vendedores = catalogo["vendedores"]
+
+    # Número de transacciones por día: campañas la primera quincena y ciclo anual
+    fechas = pd.DatetimeIndex(fechas)
+    factor_mes = np.where(fechas.day <= 15, 1.3, 1.0) if estacionalidad else 1.0
+    factor_anual = 1 + estacionalidad * np.sin(2 * np.pi * (fechas.dayofyear.to_numpy() - 80) / 365.25)
+    transacciones = rng.poisson(transacciones_dia * factor_mes * factor_anual)
+    dia = np.repeat(np.arange(len(fechas)), transacciones)
+    n = len(dia)
+
+    # Seleccionar producto basado en demanda
+    producto = rng.choice(len(productos["peso"]), size=n, p=productos["peso"])
+    categoria = productos["categoria"][producto]
+
+    # Seleccionar vendedor (70% de probabilidad de especialidad)
+    vendedor = rng.integers(0, len(vendedores["factor"]), n)
+    num_especialistas = vendedores["num_especialistas"][categoria]
+    especialista = (rng.random(n) < 0.7) & (num_especialistas > 0)
+    posicion = (rng.random(n) * np.maximum(num_especialistas, 1)).astype(np.int32)
+    vendedor = np.where(especialista, vendedores["especialistas"][categoria, posicion], vendedor)
+
+    # Cantidad según demanda, rendimiento del vendedor y fin de semana
+    factor_dia = np.where(fechas.dayofweek >= 5, 1.2, 1.0)[dia]
+    cantidad_base = rng.integers(productos["cantidad_min"][producto], productos["cantidad_max"][producto] + 1)
+    cantidad = np.maximum(1, (cantidad_base * vendedores["factor"][vendedor] * factor_dia).astype(np.int64))
+
+    # Precio con variación de ±5%
+    precio_unitario = np.round(productos["precio_base"][producto] * rng.uniform(0.95, 1.05, n), 2)
+
+    return pd.DataFrame({
+        "PRODUCTO": pd.Categorical.from_codes(producto, productos["nombre"]),
+        "CATEGORIA": pd.Categorical.from_codes(categoria, catalogo["categorias"]),
+        "VENDEDOR": pd.Categorical.from_codes(vendedor, vendedores["nombre"]),
+        "CANTIDAD": cantidad,
+        "PRECIO_UNITARIO": precio_unitario,
+        "TOTAL_VENTA": np.round(cantidad * precio_unitario, 2),
+        "FECHA": fechas[dia]
+    })
+
+def _fechas_periodo(dias, fecha_fin=None):
+    """Fechas diarias que terminan ayer (o en fecha_fin)"""
+    fecha_fin = pd.Timestamp(fecha_fin) if fecha_fin else pd.Timestamp.now().normalize() - pd.Timedelta(days=1)
+    return pd.date_range(end=fecha_fin, periods=dias, freq='D')
+
+def generar_ventas_sinteticas(dias=90, transacciones_dia=12, num_productos=None, num_vendedores=None,
+                              num_categorias=None, estacionalidad=0.2, semilla=42, fecha_fin=None):
+    """Generar en memoria un DataFrame de ventas sintéticas"""
+    catalogo = crear_catalogo(num_productos, num_vendedores, num_categorias, semilla)
+    rng = np.random.default_rng(semilla)
+    return generar_bloque_ventas(_fechas_periodo(dias, fecha_fin), catalogo, rng,
+                                 transacciones_dia, estacionalidad)
+
+def escribir_ventas_sinteticas(archivo_salida, dias=365, transacciones_dia=12, num_productos=None,
+                               num_vendedores=None, num_categorias=None, estacionalidad=0.2,
+                               semilla=42, fecha_fin=None, filas_por_bloque=1_000_000):
+    """
+    Generar ventas sintéticas por bloques de días y escribirlas sin tener todo
+    el conjunto en memoria. El formato sale de la extensión: .parquet, .csv o .xlsx.
+    Devuelve el número de filas escritas.
+    """
+    formato = os.path.splitext(archivo_salida)[1].lower().lstrip('.')
+    if formato not in ('parquet', 'csv', 'xlsx'):
+        raise ValueError(f"Formato no soportado: {formato} (usa .parquet, .csv o .xlsx)")
+
+    catalogo = crear_catalogo(num_productos, num_vendedores, num_categorias, semilla)
+    rng = np.random.default_rng(semilla)
+    fechas = _fechas_periodo(dias, fecha_fin)
+    dias_por_bloque = max(1, int(filas_por_bloque // max(transacciones_dia * 1.5, 1)))
+
+    escritor = _crear_escritor(archivo_salida, formato)
+    filas = 0
+    try:
+        for inicio in range(0, len(fechas), dias_por_bloque):
+            bloque = generar_bloque_ventas(fechas[inicio:inicio + dias_por_bloque], catalogo, rng,
+                                           transacciones_dia, estacionalidad)
+            escritor.escribir(bloque)
+            filas += len(bloque)
+            print(f"   > {filas:,} filas escritas ({min(inicio + dias_por_bloque, len(fechas))}/{len(fechas)} días)")
+    finally:
+        escritor.cerrar()
+
+    print(f"✅ Archivo creado: {archivo_salida} ({filas:,} registros)")
+    return filas
+
+def _crear_escritor(archivo_salida, formato):
+    """Escritor incremental para cada formato de salida"""
+    if formato == 'parquet':
+        return _EscritorParquet(archivo_salida)
+    if formato == 'csv':
+        return _EscritorCSV(archivo_salida)
+    return _EscritorExcel(archivo_salida)
+
+class _EscritorParquet:
+    def __init__(self, archivo):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Para escribir Parquet instala pyarrow: pip install pyarrow")
+        self.pa, self.pq = pa, pq
+        self.archivo = archivo
+        self.writer = None
+
+    def escribir(self, df):
+        tabla = self.pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.archivo, tabla.schema, compression='snappy')
+        self.writer.write_table(tabla)
+
+    def cerrar(self):
+        if self.writer is not None:
+            self.writer.close()
+
+class _EscritorCSV:
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self.encabezado = True
+
+    def escribir(self, df):
+        df.to_csv(self.archivo, mode='w' if self.encabezado else 'a', header=self.encabezado,
+                  index=False, date_format='%Y-%m-%d')
+        self.encabezado = False
+
+    def cerrar(self):
+        pass
+
+class _EscritorExcel:
+    """Excel en modo write_only, abriendo una hoja nueva al llegar al límite de filas"""
+    def __init__(self, archivo):
+        from openpyxl import Workbook
+
+        self.archivo = archivo
+        self.libro = Workbook(write_only=True)
+        self.hoja = None
+        self.filas_hoja = 0
+
+    def escribir(self, df):
+        valores = df.assign(FECHA=df['FECHA'].dt.strftime('%Y-%m-%d')).astype(object).to_numpy()
+        columnas = list(df.columns)
+        inicio = 0
+        while inicio < len(valores):
+            if self.hoja is None or self.filas_hoja >= MAX_FILAS_HOJA_EXCEL:
+                self.hoja = self.libro.create_sheet(f'Ventas_{len(self.libro.worksheets) + 1}')
+                self.hoja.append(columnas)
+                self.filas_hoja = 0
+            fin = inicio + min(len(valores) - inicio, MAX_FILAS_HOJA_EXCEL - self.filas_hoja)
+            for fila in valores[inicio:fin]:
+                self.hoja.append(list(fila))
+            self.filas_hoja += fin - inicio
+            inicio = fin
+
+    def cerrar(self):
+        self.libro.save(self.archivo)
+
+def crear_datos_demo_ia(archivo_salida="ventas_demo_ia.xlsx", dias=90, semilla=42):
+    """Crear datos de demostración optimizados para IA"""
+    print("🎯 Creando datos de demostración para IA...")
     
-    # Generar datos para los últimos 90 días
-    fecha_inicio = datetime.now() - timedelta(days=90)
-    datos = []
-    
-    for dia in range(90):
-        fecha = fecha_inicio + timedelta(days=dia)
-        
-        # Factor estacional (más ventas en fines de semana)
-        factor_dia = 1.2 if fecha.weekday() >= 5 else 1.0
-        
-        # Factor mensual (simulando campañas de marketing)
-        factor_mes = 1.3 if fecha.day <= 15 else 1.0
-        
-        # Número base de transacciones por día
-        num_transacciones_base = np.random.poisson(12)
-        
-        for _ in range(num_transacciones_base):
-            # Seleccionar producto basado en demanda
-            producto = np.random.choice(productos, p=[0.15, 0.12, 0.08, 0.06, 0.13, 0.04, 0.20, 0.03, 0.07, 0.12])
-            
-            # Seleccionar vendedor (con tendencia a especialidad)
-            if np.random.random() < 0.7:  # 70% de probabilidad de especialidad
-                vendedores_especialidad = [v for v in vendedores if v["especialidad"] == producto["categoria"]]
-                if vendedores_especialidad:
-                    vendedor = np.random.choice(vendedores_especialidad)
-                else:
-                    vendedor = np.random.choice(vendedores)
-            else:
-                vendedor = np.random.choice(vendedores)
-            
-            # Calcular cantidad basada en demanda y rendimiento del vendedor
-            min_cant, max_cant = factores_demanda[producto["demanda"]]
-            cantidad_base = np.random.randint(min_cant, max_cant + 1)
-            cantidad = max(1, int(cantidad_base * factores_rendimiento[vendedor["rendimiento"]] * factor_dia))
-            
-            # Calcular precio con variación
-            variacion_precio = np.random.uniform(0.95, 1.05)
-            precio_unitario = round(producto["precio_base"] * variacion_precio, 2)
-            
-            # Calcular total
-            total_venta = cantidad * precio_unitario
-            
-            datos.append({
-                "PRODUCTO": producto["nombre"],
-                "CATEGORIA": producto["categoria"],
-                "VENDEDOR": vendedor["nombre"],
-                "CANTIDAD": cantidad,
-                "PRECIO_UNITARIO": precio_unitario,
-                "TOTAL_VENTA": round(total_venta, 2),
-                "FECHA": fecha.strftime("%Y-%m-%d")
-            })
+    df = generar_ventas_sinteticas(dias=dias, semilla=semilla)
+    df = df.assign(FECHA=df['FECHA'].dt.strftime("%Y-%m-%d"))
     
-    # Crear DataFrame y guardar
-    df = pd.DataFrame(datos)
-    archivo_salida = "ventas_demo_ia.xlsx"
     df.to_excel(archivo_salida, index=False)
     
     print(f"✅ Archivo creado: {archivo_salida}")
@@ -165,4 +327,26 @@ def ejecutar_demo_completo():
     return archivo_demo
 
 if __name__ == "__main__":
-    ejecutar_demo_completo()
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Demo con IA. Con --salida genera ventas sintéticas a gran escala para pruebas de carga.')
+    parser.add_argument('--salida', help='Archivo de salida (.parquet, .csv o .xlsx)')
+    parser.add_argument('--dias', type=int, default=365, help='Días de historia')
+    parser.add_argument('--filas', type=int, help='Filas aproximadas en total (ajusta las transacciones por día)')
+    parser.add_argument('--transacciones-dia', type=float, default=12, help='Transacciones promedio por día')
+    parser.add_argument('--productos', type=int, help='Número de productos')
+    parser.add_argument('--vendedores', type=int, help='Número de vendedores')
+    parser.add_argument('--categorias', type=int, help='Número de categorías')
+    parser.add_argument('--estacionalidad', type=float, default=0.2, help='Amplitud de la variación anual (0 = sin estacionalidad)')
+    parser.add_argument('--semilla', type=int, default=42, help='Semilla para reproducibilidad')
+    parser.add_argument('--filas-por-bloque', type=int, default=1_000_000, help='Filas generadas por bloque')
+    args = parser.parse_args()
+
+    if args.salida:
+        transacciones_dia = args.filas / args.dias if args.filas else args.transacciones_dia
+        escribir_ventas_sinteticas(args.salida, args.dias, transacciones_dia, args.productos,
+                                   args.vendedores, args.categorias, args.estacionalidad,
+                                   args.semilla, filas_por_bloque=args.filas_por_bloque)
+    else:
+        ejecutar_demo_completo()
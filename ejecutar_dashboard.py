@@ -25,7 +25,8 @@ def verificar_dependencias():
         'streamlit': 'Dashboard Simple (Streamlit)',
         'pandas': 'Análisis de datos',
         'plotly': 'Visualizaciones',
-        'scikit-learn': 'Inteligencia Artificial'
+        'scikit-learn': 'Inteligencia Artificial',
+        'pyarrow': 'Particiones, dataset compartido y respaldos'
     }
     
     faltantes = []
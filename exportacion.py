@@ -0,0 +1,494 @@
+"""
+📤 Exportación de la vista filtrada
+Escribe las filas que cumplen los filtros del dashboard en los formatos de
+config.FORMATOS_EXPORTACION:
+
+- csv / xlsx: filas en bloques de config.FILAS_POR_BLOQUE_EXPORTACION (CSV por
+  anexado, Excel con openpyxl en modo write_only), así que la memoria no crece con
+  el tamaño de la exportación. Con config.INCLUIR_GRAFICOS_EN_EXCEL el Excel lleva
+  además una hoja Resumen con gráficos nativos.
+- png / pdf: los gráficos de la selección (evolución, productos, categorías y
+  vendedores), dibujados con matplotlib a partir de sumas acumuladas por bloque.
+
+Las filas salen del DataFrame del tablero o de la base SQL (ver
+BaseVentas.filtrar_por_bloques). Los dashboards encargan cada exportación a
+GestorExportaciones, que la ejecuta en segundo plano e informa el avance; el
+archivo terminado se descarga desde /exportaciones/<id> leyéndolo del disco. El
+estado de cada trabajo se guarda también en un <id>.json junto al archivo, así
+que con varios workers cualquiera puede informar el avance y entregar la descarga.
+La línea de comandos (python main.py exportar) llama directamente a exportar().
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import config
+
+FORMATOS_FILAS = ('csv', 'xlsx')
+FORMATOS_GRAFICOS = ('png', 'pdf')
+MAX_FILAS_HOJA = 1048575  # Filas de datos por hoja de Excel (más el encabezado)
+TOP_PRODUCTOS = 10
+ID_TRABAJO = re.compile(r'[0-9a-f]{12}')  # Ids válidos (el id llega en la URL de descarga)
+
+def normalizar_filtros(inicio=None, fin=None, categoria=None, vendedor=None):
+    """Filtros con None donde no se filtra ('todas', 'todos' o vacío)"""
+    return {
+        'inicio': inicio or None,
+        'fin': fin or None,
+        'categoria': None if categoria in (None, '', 'todas') else categoria,
+        'vendedor': None if vendedor in (None, '', 'todos') else vendedor
+    }
+
+class FuenteExportacion:
+    """Filas filtradas de un DataFrame o de una base SQL, entregadas por bloques"""
+    def __init__(self, df=None, base=None, filtros=None, tamano=None):
+        if df is None and base is None:
+            raise ValueError("La exportación necesita un DataFrame o una base SQL")
+        self.df = df
+        self.base = base
+        self.filtros = filtros or normalizar_filtros()
+        self.tamano = tamano or config.FILAS_POR_BLOQUE_EXPORTACION
+        self._total = None
+
+    def _mascara(self, df):
+        """Filas del bloque que cumplen los filtros"""
+        mascara = pd.Series(True, index=df.index)
+        if self.filtros['inicio'] is not None:
+            mascara &= df['FECHA'] >= pd.Timestamp(self.filtros['inicio'])
+        if self.filtros['fin'] is not None:
+            mascara &= df['FECHA'] <= pd.Timestamp(self.filtros['fin'])
+        for filtro, columna in (('categoria', 'CATEGORIA'), ('vendedor', 'VENDEDOR')):
+            if self.filtros[filtro] is not None and columna in df.columns:
+                mascara &= df[columna] == self.filtros[filtro]
+        return mascara
+
+    @property
+    def total(self):
+        """Filas que se van a exportar (para informar el avance)"""
+        if self._total is None:
+            self._total = (self.base.contar(**self.filtros) if self.base is not None
+                           else int(self._mascara(self.df).sum()))
+        return self._total
+
+    def bloques(self):
+        """DataFrames de a lo sumo `tamano` filas filtradas, en orden"""
+        if self.base is not None:
+            yield from self.base.filtrar_por_bloques(**self.filtros, tamano=self.tamano)
+            return
+        for inicio in range(0, len(self.df), self.tamano):
+            bloque = self.df.iloc[inicio:inicio + self.tamano]
+            bloque = bloque[self._mascara(bloque)]
+            if not bloque.empty:
+                yield bloque
+
+class Acumulador:
+    """Sumas de TOTAL_VENTA por día, producto, categoría y vendedor, acumuladas bloque a bloque"""
+    def __init__(self):
+        self.filas = 0
+        self.sumas = {}
+
+    def agregar(self, bloque):
+        self.filas += len(bloque)
+        if 'TOTAL_VENTA' not in bloque.columns:
+            return
+        claves = {'FECHA': bloque['FECHA'].dt.normalize() if 'FECHA' in bloque.columns else None}
+        for columna in ('PRODUCTO', 'CATEGORIA', 'VENDEDOR'):
+            claves[columna] = bloque[columna] if columna in bloque.columns else None
+        for columna, clave in claves.items():
+            if clave is None:
+                continue
+            parcial = bloque['TOTAL_VENTA'].groupby(clave).sum()
+            anterior = self.sumas.get(columna)
+            self.sumas[columna] = parcial if anterior is None else anterior.add(parcial, fill_value=0)
+
+    def suma(self, columna):
+        """Serie con la suma por valor de `columna` (vacía si no hay datos)"""
+        return self.sumas.get(columna, pd.Series(dtype=float))
+
+    def ventas_por_mes(self):
+        diario = self.suma('FECHA')
+        return diario.resample('MS').sum() if len(diario) else diario
+
+def _escribir_csv(bloques, ruta, acumulador, avanzar):
+    with open(ruta, 'w', encoding='utf-8-sig', newline='') as archivo:
+        encabezado = True
+        for bloque in bloques:
+            bloque.to_csv(archivo, index=False, header=encabezado)
+            encabezado = False
+            acumulador.agregar(bloque)
+            avanzar(len(bloque))
+
+def _escribir_xlsx(bloques, ruta, acumulador, avanzar):
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    hoja, filas_hoja, columnas = None, 0, None
+    for bloque in bloques:
+        if columnas is None:
+            columnas = list(bloque.columns)
+        # Valores de Python; los vacíos quedan como celdas vacías
+        valores = bloque.astype(object).where(bloque.notna(), None)
+        for fila in valores.itertuples(index=False, name=None):
+            if hoja is None or filas_hoja >= MAX_FILAS_HOJA:
+                numero = len(libro.worksheets) + 1
+                hoja = libro.create_sheet('Ventas' if numero == 1 else f'Ventas ({numero})')
+                hoja.append(columnas)
+                filas_hoja = 0
+            hoja.append(fila)
+            filas_hoja += 1
+        acumulador.agregar(bloque)
+        avanzar(len(bloque))
+
+    if hoja is None:
+        libro.create_sheet('Ventas')
+    if config.INCLUIR_GRAFICOS_EN_EXCEL:
+        _hoja_resumen(libro, acumulador)
+    libro.save(ruta)
+
+def _hoja_resumen(libro, acumulador):
+    """Hoja Resumen con las sumas por categoría, vendedor, producto y mes y un gráfico de cada una"""
+    from openpyxl.chart import BarChart, LineChart, Reference
+
+    hoja = libro.create_sheet('Resumen')
+    tablas = [
+        ('Categoría', acumulador.suma('CATEGORIA').sort_values(ascending=False), BarChart),
+        ('Vendedor', acumulador.suma('VENDEDOR').sort_values(ascending=False), BarChart),
+        (f'Top {TOP_PRODUCTOS} productos', acumulador.suma('PRODUCTO').nlargest(TOP_PRODUCTOS), BarChart),
+        ('Mes', acumulador.ventas_por_mes(), LineChart)
+    ]
+    # En modo write_only las filas se escriben de una vez: las tablas van lado a lado
+    largo = max([len(serie) for _, serie, _ in tablas] + [0])
+    filas = [[] for _ in range(largo + 1)]
+    for titulo, serie, _ in tablas:
+        filas[0] += [titulo, 'Ventas ($)', None]
+        etiquetas = [etiqueta.strftime('%Y-%m') if isinstance(etiqueta, pd.Timestamp) else etiqueta
+                     for etiqueta in serie.index]
+        for i in range(largo):
+            filas[i + 1] += [etiquetas[i], float(serie.iloc[i]), None] if i < len(serie) else [None, None, None]
+    for fila in filas:
+        hoja.append(fila)
+
+    for i, (titulo, serie, tipo) in enumerate(tablas):
+        if serie.empty:
+            continue
+        columna = 3 * i + 1
+        grafico = tipo()
+        grafico.title = titulo if titulo.startswith('Top') else f"Ventas por {titulo.lower()}"
+        grafico.add_data(Reference(hoja, min_col=columna + 1, min_row=1, max_row=len(serie) + 1),
+                         titles_from_data=True)
+        grafico.set_categories(Reference(hoja, min_col=columna, min_row=2, max_row=len(serie) + 1))
+        grafico.legend = None
+        # Cada gráfico debajo de las tablas, uno al lado del otro
+        hoja.add_chart(grafico, f"{chr(ord('A') + 4 * i)}{largo + 4}")
+
+def _dibujar_graficos(acumulador, ruta, formato, titulo):
+    """Figura con evolución, top productos, categorías y vendedores (sin pyplot: segura en hilos)"""
+    from matplotlib.figure import Figure
+
+    from series_tiempo import elegir_granularidad, nombre_granularidad
+
+    figura = Figure(figsize=(16, 12))
+    figura.suptitle(titulo, fontsize=18, fontweight='bold')
+    ejes = figura.subplots(2, 2)
+
+    diario = acumulador.suma('FECHA').sort_index()
+    if len(diario):
+        granularidad = elegir_granularidad(diario.index.min(), diario.index.max())
+        serie = diario if granularidad == 'D' else diario.resample(granularidad, label='left', closed='left').sum()
+        ejes[0, 0].plot(serie.index, serie.values, color=config.COLOR_PRIMARIO, linewidth=2)
+        ejes[0, 0].set_title(f'Evolución de Ventas por {nombre_granularidad(granularidad)}', fontweight='bold')
+        ejes[0, 0].grid(True, alpha=0.3)
+
+    productos = acumulador.suma('PRODUCTO').nlargest(TOP_PRODUCTOS).sort_values()
+    ejes[0, 1].barh([str(p)[:25] for p in productos.index], productos.values, color=config.COLORES_GRAFICOS[2])
+    ejes[0, 1].set_title(f'Top {TOP_PRODUCTOS} Productos', fontweight='bold')
+
+    categorias = acumulador.suma('CATEGORIA')
+    if len(categorias):
+        ejes[1, 0].pie(categorias.values, labels=[str(c) for c in categorias.index], autopct='%1.1f%%',
+                       colors=config.COLORES_GRAFICOS[:len(categorias)] if len(categorias) <= len(config.COLORES_GRAFICOS) else None)
+    ejes[1, 0].set_title('Ventas por Categoría', fontweight='bold')
+
+    vendedores = acumulador.suma('VENDEDOR').sort_values(ascending=False)
+    ejes[1, 1].bar([str(v) for v in vendedores.index], vendedores.values, color=config.COLORES_GRAFICOS[0])
+    ejes[1, 1].set_title('Ventas por Vendedor', fontweight='bold')
+    ejes[1, 1].tick_params(axis='x', rotation=45)
+
+    figura.tight_layout()
+    figura.savefig(ruta, format=formato, dpi=config.DPI_REPORTE if formato == 'png' else None, bbox_inches='tight')
+
+def describir_filtros(filtros):
+    """Texto corto con los filtros aplicados"""
+    partes = []
+    if filtros['inicio'] or filtros['fin']:
+        partes.append(f"{filtros['inicio'] or '...'} a {filtros['fin'] or '...'}")
+    for filtro in ('categoria', 'vendedor'):
+        if filtros[filtro] is not None:
+            partes.append(str(filtros[filtro]))
+    return ' | '.join(partes) or 'Todas las ventas'
+
+def exportar(fuente, formato, ruta, progreso=None):
+    """
+    Exportar la fuente en el formato indicado. progreso(filas, total) se llama
+    después de cada bloque. Se escribe en un temporal y se reemplaza al terminar
+    """
+    if formato not in config.FORMATOS_EXPORTACION:
+        raise ValueError(f"Formato no habilitado: {formato} (ver config.FORMATOS_EXPORTACION)")
+    carpeta = os.path.dirname(ruta)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+
+    total = fuente.total
+    acumulador = Acumulador()
+    filas = 0
+
+    def avanzar(cantidad):
+        nonlocal filas
+        filas += cantidad
+        if progreso:
+            progreso(filas, total)
+
+    temporal = f"{ruta}.tmp"
+    if formato == 'csv':
+        _escribir_csv(fuente.bloques(), temporal, acumulador, avanzar)
+    elif formato == 'xlsx':
+        _escribir_xlsx(fuente.bloques(), temporal, acumulador, avanzar)
+    else:
+        for bloque in fuente.bloques():
+            acumulador.agregar(bloque)
+            avanzar(len(bloque))
+        _dibujar_graficos(acumulador, temporal, formato, f"Ventas: {describir_filtros(fuente.filtros)}")
+    os.replace(temporal, ruta)
+    return ruta
+
+class TrabajoExportacion:
+    """Estado de una exportación en segundo plano"""
+    def __init__(self, formato, ruta):
+        self.id = uuid.uuid4().hex[:12]
+        self.formato = formato
+        self.ruta = ruta
+        self.filas = 0
+        self.total = None
+        self.estado = 'en_cola'  # en_cola, en_curso, listo o error
+        self.error = None
+        self.creado = time.time()
+
+    @property
+    def porcentaje(self):
+        if self.estado == 'listo':
+            return 100
+        return int(100 * self.filas / self.total) if self.total else 0
+
+    @property
+    def terminado(self):
+        return self.estado in ('listo', 'error')
+
+    def a_dict(self):
+        return {'id': self.id, 'formato': self.formato, 'archivo': os.path.basename(self.ruta),
+                'filas': self.filas, 'total': self.total, 'estado': self.estado,
+                'error': self.error, 'creado': self.creado}
+
+    @classmethod
+    def desde_dict(cls, datos, carpeta):
+        """Trabajo leído del estado guardado (el archivo siempre dentro de `carpeta`)"""
+        trabajo = cls(datos['formato'], os.path.join(carpeta, os.path.basename(datos['archivo'])))
+        for atributo in ('id', 'filas', 'total', 'estado', 'error', 'creado'):
+            setattr(trabajo, atributo, datos[atributo])
+        return trabajo
+
+class GestorExportaciones:
+    """Ejecuta exportaciones en segundo plano y guarda su avance (en memoria y en disco)"""
+    def __init__(self, carpeta=None):
+        self.carpeta = carpeta or config.CARPETA_EXPORTACIONES
+        self.trabajos = {}
+        self.candado = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=config.MAX_EXPORTACIONES_SIMULTANEAS,
+                                       thread_name_prefix='exportacion')
+
+    def iniciar(self, fuente, formato):
+        """Encargar una exportación y devolver su trabajo (el archivo aparece al terminar)"""
+        self.limpiar()
+        nombre = f"ventas_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}.{formato}"
+        trabajo = TrabajoExportacion(formato, os.path.join(self.carpeta, nombre))
+        with self.candado:
+            self.trabajos[trabajo.id] = trabajo
+        self._guardar_estado(trabajo)
+        self.pool.submit(self._ejecutar, trabajo, fuente)
+        return trabajo
+
+    def _ruta_estado(self, id_trabajo):
+        return os.path.join(self.carpeta, f"{id_trabajo}.json")
+
+    def _guardar_estado(self, trabajo):
+        """Escribir el estado del trabajo para los demás workers (temporal + reemplazo)"""
+        ruta = self._ruta_estado(trabajo.id)
+        os.makedirs(self.carpeta, exist_ok=True)
+        with open(f"{ruta}.tmp", 'w', encoding='utf-8') as archivo:
+            json.dump(trabajo.a_dict(), archivo, ensure_ascii=False)
+        os.replace(f"{ruta}.tmp", ruta)
+
+    def _leer_estado(self, id_trabajo):
+        """Trabajo guardado en disco por cualquier worker, o None"""
+        try:
+            with open(self._ruta_estado(id_trabajo), encoding='utf-8') as archivo:
+                return TrabajoExportacion.desde_dict(json.load(archivo), self.carpeta)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _ejecutar(self, trabajo, fuente):
+        trabajo.estado = 'en_curso'
+
+        def progreso(filas, total):
+            trabajo.filas, trabajo.total = filas, total
+            # Una escritura por bloque de filas
+            self._guardar_estado(trabajo)
+
+        try:
+            trabajo.total = fuente.total
+            self._guardar_estado(trabajo)
+            exportar(fuente, trabajo.formato, trabajo.ruta, progreso)
+            trabajo.estado = 'listo'
+            print(f"📤 Exportación lista: {trabajo.ruta} ({trabajo.filas:,} filas)")
+        except Exception as e:
+            trabajo.error = str(e)
+            trabajo.estado = 'error'
+            print(f"❌ Error en la exportación {trabajo.id}: {e}")
+        try:
+            self._guardar_estado(trabajo)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar el estado de la exportación {trabajo.id}: {e}")
+
+    def obtener(self, id_trabajo):
+        """Trabajo de este proceso o, si lo inició otro worker, el guardado en disco"""
+        if not isinstance(id_trabajo, str) or not ID_TRABAJO.fullmatch(id_trabajo):
+            return None
+        with self.candado:
+            trabajo = self.trabajos.get(id_trabajo)
+        return trabajo if trabajo is not None else self._leer_estado(id_trabajo)
+
+    def limpiar(self):
+        """
+        Borrar los archivos y trabajos (de cualquier worker) creados hace más de
+        config.HORAS_CONSERVAR_EXPORTACIONES; los que siguen sin terminar se dan por abandonados
+        """
+        limite = time.time() - config.HORAS_CONSERVAR_EXPORTACIONES * 3600
+        with self.candado:
+            viejos = {t.id: t for t in self.trabajos.values() if t.terminado and t.creado < limite}
+            for id_trabajo in viejos:
+                del self.trabajos[id_trabajo]
+            propios = set(self.trabajos)
+        nombres = os.listdir(self.carpeta) if os.path.isdir(self.carpeta) else []
+        for nombre in nombres:
+            id_trabajo = nombre[:-len('.json')]
+            if not nombre.endswith('.json') or not ID_TRABAJO.fullmatch(id_trabajo) or id_trabajo in propios:
+                continue
+            trabajo = self._leer_estado(id_trabajo)
+            if trabajo is not None and trabajo.creado < limite:
+                viejos.setdefault(id_trabajo, trabajo)
+        for trabajo in viejos.values():
+            for ruta in (trabajo.ruta, f"{trabajo.ruta}.tmp", self._ruta_estado(trabajo.id)):
+                # Otro worker puede estar limpiando al mismo tiempo
+                try:
+                    os.remove(ruta)
+                except FileNotFoundError:
+                    pass
+
+# --- Controles de Dash ---
+def controles_exportacion():
+    """Selector de formato, botón de exportar, barra de avance y descarga"""
+    import dash_bootstrap_components as dbc
+    from dash import dcc, html
+
+    return dbc.Row([
+        dbc.Col([
+            dcc.Dropdown(
+                id='exportar-formato',
+                options=[{'label': formato.upper(), 'value': formato} for formato in config.FORMATOS_EXPORTACION],
+                value=config.FORMATOS_EXPORTACION[0] if config.FORMATOS_EXPORTACION else None,
+                clearable=False
+            )
+        ], width=2),
+        dbc.Col([
+            dbc.Button("⬇️ Exportar vista filtrada", id='exportar-boton', color="primary")
+        ], width=3),
+        dbc.Col([
+            dbc.Progress(id='exportar-progreso', value=0, striped=True, animated=True,
+                         style={'height': '24px'}),
+            html.Small(id='exportar-estado', className="text-muted"),
+            # Enlace a la ruta de descarga (el archivo no pasa por el JSON de los callbacks)
+            html.A("⬇️ Descargar", id='exportar-enlace', className="btn btn-success btn-sm ms-2",
+                   style={'display': 'none'})
+        ], width=7),
+        dcc.Store(id='exportar-trabajo'),
+        dcc.Interval(id='exportar-intervalo', interval=config.INTERVALO_PROGRESO_EXPORTACION_MS, disabled=True)
+    ], className="mb-4 align-items-center")
+
+def registrar_exportacion(app, gestor, crear_fuente, filtros):
+    """
+    Callbacks de los controles de exportación y ruta de descarga. crear_fuente(filtros)
+    devuelve la FuenteExportacion de la vista; filtros son los State de (inicio, fin,
+    categoría, vendedor)
+    """
+    from dash import Input, Output, State, no_update
+    from flask import abort, send_file
+
+    def descargar(id_trabajo):
+        """Enviar el archivo terminado desde el disco, por partes"""
+        trabajo = gestor.obtener(id_trabajo)
+        if trabajo is None or trabajo.estado != 'listo' or not os.path.exists(trabajo.ruta):
+            abort(404)
+        return send_file(os.path.abspath(trabajo.ruta), as_attachment=True,
+                         download_name=os.path.basename(trabajo.ruta))
+
+    app.server.add_url_rule(f"{app.config.routes_pathname_prefix}exportaciones/<id_trabajo>",
+                            endpoint='exportacion_descarga', view_func=descargar, methods=['GET'])
+    oculto = {'display': 'none'}
+
+    @app.callback(
+        [Output('exportar-trabajo', 'data'),
+         Output('exportar-intervalo', 'disabled'),
+         Output('exportar-estado', 'children'),
+         Output('exportar-progreso', 'value'),
+         Output('exportar-enlace', 'style')],
+        Input('exportar-boton', 'n_clicks'),
+        [State('exportar-formato', 'value'), *filtros],
+        prevent_initial_call=True
+    )
+    def iniciar_exportacion(_, formato, inicio, fin, categoria, vendedor):
+        try:
+            fuente = crear_fuente(normalizar_filtros(inicio, fin, categoria, vendedor))
+        except ValueError as e:
+            return no_update, True, f"❌ {e}", 0, oculto
+        trabajo = gestor.iniciar(fuente, formato)
+        return trabajo.id, False, f"⏳ Preparando exportación {formato.upper()}...", 0, oculto
+
+    @app.callback(
+        [Output('exportar-progreso', 'value', allow_duplicate=True),
+         Output('exportar-progreso', 'label'),
+         Output('exportar-estado', 'children', allow_duplicate=True),
+         Output('exportar-enlace', 'href'),
+         Output('exportar-enlace', 'style', allow_duplicate=True),
+         Output('exportar-intervalo', 'disabled', allow_duplicate=True)],
+        Input('exportar-intervalo', 'n_intervals'),
+        State('exportar-trabajo', 'data'),
+        prevent_initial_call=True
+    )
+    def avance_exportacion(_, id_trabajo):
+        trabajo = gestor.obtener(id_trabajo)
+        if trabajo is None:
+            return 0, "", "", no_update, oculto, True
+        if trabajo.estado == 'error':
+            return 0, "", f"❌ Error al exportar: {trabajo.error}", no_update, oculto, True
+        if trabajo.estado == 'listo':
+            return (100, "100%", f"✅ {trabajo.filas:,} filas exportadas",
+                    app.get_relative_path(f"/exportaciones/{trabajo.id}"), {}, True)
+        total = f" de {trabajo.total:,}" if trabajo.total else ""
+        return (trabajo.porcentaje, f"{trabajo.porcentaje}%",
+                f"⏳ {trabajo.filas:,}{total} filas...", no_update, no_update, False)
@@ -8,15 +8,29 @@ Este script principal coordina todo el proceso de análisis:
 2. Generación de reportes gráficos
 3. Dashboard interactivo
 
+Sin argumentos muestra el menú interactivo. Para ejecuciones desatendidas:
+    python main.py consolidar --carpeta datos/ --formato csv
+    python main.py reporte --formato pdf --por VENDEDOR --workers 4
+    python main.py analizar --profile
+    python main.py exportar --formato xlsx pdf --inicio 2025-01-01 --categoria Electrónicos
+    python main.py restaurar --listar
+    python main.py servir --tablero ia --puerto 8051
+    python main.py servir --tablero ia --workers 4 --host 0.0.0.0
+
 Autor: GitHub Copilot
 Fecha: Julio 2025
 """
 
 import os
 import sys
+import time
+import argparse
 import subprocess
 from datetime import datetime
 
+import config
+from pipeline import ejecutar_pipeline
+
 def mostrar_banner():
     """Mostrar banner del sistema"""
     banner = """
@@ -127,7 +141,7 @@ def ejecutar_dashboard_ia():
 def ejecutar_analisis_ia():
     """Ejecutar análisis completo con IA"""
     print("\n🧠 Ejecutando análisis con IA...")
-    ejecutar_script('analisis_ia.py', 'Análisis inteligente con IA')
+    return ejecutar_pipeline(['entrenamiento', 'reporte_ia'])['exito']
 
 def crear_datos_ejemplo():
     """Crear datos de ejemplo para pruebas"""
@@ -137,7 +151,9 @@ def crear_datos_ejemplo():
 def ejecutar_demo_ia():
     """Ejecutar demostración completa con IA"""
     print("\n🎯 Ejecutando demostración completa con IA...")
-    ejecutar_script('demo_ia.py', 'Demostración completa con IA')
+    # Se importa al usarlo: el menú no carga pandas/numpy para arrancar
+    from demo_ia import ejecutar_demo_completo
+    ejecutar_demo_completo()
 
 def verificar_archivos():
     """Verificar que todos los archivos necesarios existen"""
@@ -147,7 +163,8 @@ def verificar_archivos():
         'reporte_grafico.py',
         'dashboard_ia.py',
         'analisis_ia.py',
-        'crear_ejemplo.py'
+        'crear_ejemplo.py',
+        'pipeline.py'
     ]
     
     archivos_faltantes = []
@@ -168,30 +185,264 @@ def proceso_completo():
     print("\n🚀 INICIANDO PROCESO COMPLETO")
     print("=" * 50)
     
-    # Paso 1: Consolidar datos
-    if ejecutar_script('automatizacion.py', 'Consolidación de archivos Excel'):
-        print("✅ Paso 1 completado: Datos consolidados")
-    else:
+    # Pasos 1 y 2: Consolidar datos, generar reportes y entrenar la IA en el mismo
+    # proceso. Las etapas al día se omiten y las independientes corren en paralelo
+    contexto = ejecutar_pipeline()
+    
+    if 'consolidacion' in contexto['fallidas']:
         print("❌ Error en consolidación de datos")
         return False
+    print("✅ Paso 1 completado: Datos consolidados")
     
-    # Paso 2: Generar reporte gráfico
-    if ejecutar_script('reporte_grafico.py', 'Generación de reporte gráfico'):
+    if 'reporte' not in contexto['fallidas']:
         print("✅ Paso 2 completado: Reporte gráfico generado")
     else:
         print("⚠️ Advertencia: Error en reporte gráfico, pero continuando...")
     
-    # Paso 3: Preguntar por dashboard
-    print("\n" + "="*50)
-    respuesta = input("¿Deseas ejecutar el dashboard interactivo? (s/n): ").lower()
-    if respuesta in ['s', 'si', 'sí', 'y', 'yes']:
-        ejecutar_dashboard()
+    # Paso 3: Preguntar por dashboard (solo con una terminal interactiva)
+    if sys.stdin.isatty():
+        print("\n" + "="*50)
+        respuesta = input("¿Deseas ejecutar el dashboard interactivo? (s/n): ").lower()
+        if respuesta in ['s', 'si', 'sí', 'y', 'yes']:
+            ejecutar_dashboard()
     
     print("\n🎉 ¡PROCESO COMPLETO FINALIZADO!")
     return True
 
+# --- LÍNEA DE COMANDOS ---
+def comando_consolidar(args):
+    """Consolidar los archivos de Excel de la carpeta indicada"""
+    if args.formato == 'csv':
+        from automatizacion import consolidar_datos, guardar_consolidado, archivo_salida
+
+        df = consolidar_datos(args.carpeta, archivo_salida)
+        if df is None:
+            return False
+        nombre = os.path.splitext(archivo_salida)[0] + '.csv'
+        guardar_consolidado(df, os.path.join(args.carpeta, nombre))
+        return True
+
+    return ejecutar_pipeline(['consolidacion'], carpeta=args.carpeta, forzar=args.forzar,
+                             workers=args.workers)['exito']
+
+def comando_reporte(args):
+    """Generar el reporte gráfico general o uno por cada categoría/vendedor"""
+    if args.por:
+        from reporte_grafico import generar_reportes_lote
+
+        contexto = ejecutar_pipeline(['consolidacion'], carpeta=args.carpeta, workers=args.workers)
+        if not contexto['exito']:
+            return False
+        carpeta_salida = os.path.join(args.carpeta, 'reportes')
+        archivos = generar_reportes_lote(contexto['archivo_consolidado'], args.por,
+                                         carpeta_salida, args.workers, args.formato)
+        return bool(archivos)
+
+    # La consolidación se omite sola si el consolidado está al día
+    return ejecutar_pipeline(['consolidacion', 'reporte'], carpeta=args.carpeta, forzar=args.forzar,
+                             workers=args.workers, formato_reporte=args.formato)['exito']
+
+def comando_analizar(args):
+    """Entrenar el modelo y generar el reporte de IA"""
+    etapas = ['consolidacion', 'entrenamiento', 'reporte_ia']
+    if config.USAR_BASE_SQL:
+        etapas.append('base_sql')
+    return ejecutar_pipeline(etapas, carpeta=args.carpeta, forzar=args.forzar, workers=args.workers)['exito']
+
+def comando_exportar(args):
+    """Exportar las ventas filtradas (filas en CSV/Excel, gráficos en PNG/PDF)"""
+    from exportacion import FuenteExportacion, describir_filtros, exportar, normalizar_filtros
+    from pipeline import abrir_base_sql, obtener_datos
+
+    etapas = ['consolidacion'] + (['base_sql'] if config.USAR_BASE_SQL else [])
+    contexto = ejecutar_pipeline(etapas, carpeta=args.carpeta, workers=args.workers)
+    if not contexto['exito']:
+        return False
+
+    filtros = normalizar_filtros(args.inicio, args.fin, args.categoria, args.vendedor)
+    base = abrir_base_sql(contexto)
+    fuente = FuenteExportacion(df=None if base is not None else obtener_datos(contexto), base=base,
+                               filtros=filtros)
+    salida = args.salida or os.path.join(args.carpeta, config.CARPETA_EXPORTACIONES)
+    nombre = f"ventas_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    print(f"📤 Exportando {fuente.total:,} filas ({describir_filtros(filtros)})")
+
+    def progreso(filas, total):
+        print(f"\r   {filas:,}/{total:,} filas", end='', flush=True)
+
+    for formato in args.formato:
+        ruta = exportar(fuente, formato, os.path.join(salida, f"{nombre}.{formato}"), progreso)
+        print(f"\n✅ {ruta}")
+    return True
+
+def comando_restaurar(args):
+    """Listar los respaldos o restaurar uno como consolidado"""
+    from automatizacion import archivo_salida, guardar_consolidado
+    from respaldos import listar_respaldos, restaurar_respaldo
+
+    if args.listar:
+        respaldos = listar_respaldos(args.carpeta)
+        if not respaldos:
+            print("No hay respaldos en esta carpeta")
+        for respaldo in respaldos:
+            print(f"💾 {respaldo['id']}  {respaldo['creado']}  {respaldo['filas']:,} filas  "
+                  f"{len(respaldo['particiones'])} meses")
+        return bool(respaldos)
+
+    try:
+        df = restaurar_respaldo(args.carpeta, args.respaldo)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        return False
+    salida = args.salida or os.path.join(args.carpeta, archivo_salida)
+    print(f"♻️ Restaurando {len(df):,} filas en {salida}")
+    guardar_consolidado(df, salida)
+    return True
+
+def comando_servir(args):
+    """Servir uno de los dashboards en primer plano (con --workers N > 1, en gunicorn)"""
+    args.carpeta = os.path.abspath(args.carpeta)
+    os.chdir(args.carpeta)
+    if args.tablero == 'streamlit':
+        puerto = args.puerto or 8501
+        return subprocess.call([sys.executable, '-m', 'streamlit', 'run', 'dashboard_streamlit.py',
+                                '--server.port', str(puerto), '--server.address', args.host,
+                                '--server.headless', 'true']) == 0
+
+    if args.workers and args.workers > 1:
+        from servidor import gunicorn_disponible, servir_produccion
+
+        if gunicorn_disponible():
+            return servir_produccion(args.tablero, args.carpeta, args.workers, args.host, args.puerto)
+        print("⚠️ gunicorn no está instalado (pip install gunicorn): se usa un solo proceso")
+
+    if args.tablero == 'ia':
+        from dashboard_ia import DashboardIA
+
+        archivo = os.path.join(args.carpeta, 'Reporte_Consolidado.xlsx')
+        if not os.path.exists(archivo):
+            print(f"❌ No se encontró {archivo}. Ejecuta primero: python main.py consolidar")
+            return False
+        DashboardIA(archivo).ejecutar(puerto=args.puerto or 8051, host=args.host)
+        return True
+
+    from dashboard import DashboardVentas
+
+    if config.USAR_BASE_SQL:
+        # Filtros y agregados del tablero básico consultados en la base SQL
+        from backend_sql import archivo_base_sql
+
+        if not ejecutar_pipeline(['consolidacion', 'base_sql'], carpeta=args.carpeta)['exito']:
+            return False
+        DashboardVentas(archivo_base_sql()).ejecutar(debug=False, port=args.puerto or 8050, host=args.host)
+        return True
+
+    DashboardVentas().ejecutar(debug=False, port=args.puerto or 8050, host=args.host)
+    return True
+
+def crear_parser():
+    """Parser de argumentos para ejecuciones desatendidas (cron, tareas programadas)"""
+    parser = argparse.ArgumentParser(
+        description='Sistema de análisis de ventas. Sin argumentos se abre el menú interactivo.')
+
+    comunes = argparse.ArgumentParser(add_help=False)
+    comunes.add_argument('--carpeta', default=os.getcwd(),
+                         help='Carpeta con los archivos de Excel (por defecto la actual)')
+    comunes.add_argument('--workers', type=int, default=None,
+                         help='Número de hilos/procesos de trabajo')
+    comunes.add_argument('--profile', action='store_true',
+                         help='Perfilar cada etapa (cProfile/tracemalloc) y mostrar tiempo total, '
+                              'memoria máxima y puntos calientes al terminar')
+
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    consolidar = subparsers.add_parser('consolidar', aliases=['consolidate'], parents=[comunes],
+                                       help='Consolidar los archivos de Excel')
+    consolidar.add_argument('--formato', choices=['xlsx', 'csv'], default='xlsx',
+                            help='Formato del archivo consolidado')
+    consolidar.add_argument('--forzar', action='store_true', help='Ignorar resultados al día')
+    consolidar.set_defaults(funcion=comando_consolidar)
+
+    reporte = subparsers.add_parser('reporte', aliases=['report'], parents=[comunes],
+                                    help='Generar el reporte gráfico estático')
+    reporte.add_argument('--formato', choices=['png', 'pdf', 'svg'], default='png',
+                         help='Formato de la imagen del reporte')
+    reporte.add_argument('--por', choices=['CATEGORIA', 'VENDEDOR'],
+                         help='Generar un reporte por cada categoría o vendedor')
+    reporte.add_argument('--forzar', action='store_true', help='Ignorar resultados al día')
+    reporte.set_defaults(funcion=comando_reporte)
+
+    analizar = subparsers.add_parser('analizar', aliases=['analyze'], parents=[comunes],
+                                     help='Entrenar el modelo y generar el reporte de IA')
+    analizar.add_argument('--forzar', action='store_true', help='Ignorar resultados al día')
+    analizar.set_defaults(funcion=comando_analizar)
+
+    exportar = subparsers.add_parser('exportar', aliases=['export'], parents=[comunes],
+                                     help='Exportar las ventas filtradas')
+    exportar.add_argument('--formato', nargs='+', choices=config.FORMATOS_EXPORTACION,
+                          default=config.FORMATOS_EXPORTACION[:1],
+                          help='Uno o más formatos de salida')
+    exportar.add_argument('--inicio', help='Fecha inicial (AAAA-MM-DD)')
+    exportar.add_argument('--fin', help='Fecha final (AAAA-MM-DD)')
+    exportar.add_argument('--categoria', help='Solo esta categoría')
+    exportar.add_argument('--vendedor', help='Solo este vendedor')
+    exportar.add_argument('--salida', help=f'Carpeta de salida (por defecto {config.CARPETA_EXPORTACIONES})')
+    exportar.set_defaults(funcion=comando_exportar)
+
+    restaurar = subparsers.add_parser('restaurar', aliases=['restore'], parents=[comunes],
+                                      help='Listar o restaurar respaldos del consolidado')
+    restaurar.add_argument('--listar', action='store_true', help='Mostrar los respaldos disponibles')
+    restaurar.add_argument('--respaldo', help='Id del respaldo (por defecto el más reciente)')
+    restaurar.add_argument('--salida', help='Archivo a escribir (por defecto el consolidado)')
+    restaurar.set_defaults(funcion=comando_restaurar)
+
+    servir = subparsers.add_parser('servir', aliases=['serve'], parents=[comunes],
+                                   help='Servir un dashboard')
+    servir.add_argument('--tablero', choices=['basico', 'ia', 'streamlit'], default='basico',
+                        help='Dashboard a servir')
+    servir.add_argument('--puerto', type=int, default=None, help='Puerto del servidor')
+    servir.add_argument('--host', default='127.0.0.1', help='Interfaz en la que escuchar')
+    servir.set_defaults(funcion=comando_servir)
+
+    return parser
+
+def mostrar_perfil(inicio):
+    """Mostrar el resumen de perfilado, el tiempo total y la memoria máxima del proceso"""
+    from perfilado import mostrar_resumen
+    mostrar_resumen()
+
+    print(f"\n⏱️ Tiempo total: {time.perf_counter() - inicio:.2f}s")
+    try:
+        import resource
+        memoria_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"💾 Memoria máxima: {memoria_mb:.1f} MB")
+    except ImportError:
+        pass
+
+def ejecutar_cli(argv):
+    """Ejecutar un subcomando y devolver el código de salida"""
+    args = crear_parser().parse_args(argv)
+    args.carpeta = os.path.abspath(args.carpeta)
+
+    if args.profile:
+        from perfilado import activar_perfilado
+        activar_perfilado()
+
+    inicio = time.perf_counter()
+    try:
+        exito = args.funcion(args)
+    except KeyboardInterrupt:
+        print("\n🛑 Interrumpido")
+        exito = False
+    if args.profile:
+        mostrar_perfil(inicio)
+    return 0 if exito else 1
+
 def main():
     """Función principal"""
+    if len(sys.argv) > 1:
+        sys.exit(ejecutar_cli(sys.argv[1:]))
+
     mostrar_banner()
     
     # Verificar archivos
@@ -207,10 +458,10 @@ def main():
             opcion = input("👉 Selecciona una opción (1-9): ").strip()
             
             if opcion == '1':
-                ejecutar_script('automatizacion.py', 'Consolidación de archivos Excel')
+                ejecutar_pipeline(['consolidacion'])
                 
             elif opcion == '2':
-                ejecutar_script('reporte_grafico.py', 'Generación de reporte gráfico')
+                ejecutar_pipeline(['reporte'])
                 
             elif opcion == '3':
                 ejecutar_dashboard()
@@ -0,0 +1,209 @@
+"""
+📡 Métricas de rendimiento de los dashboards y del análisis con IA
+Cuenta llamadas, errores, latencias (histogramas), aciertos de caché y bytes
+enviados, y los expone en formato de texto de Prometheus en /metrics.
+"""
+
+import bisect
+import functools
+import json
+import logging
+import threading
+import time
+
+import config
+
+logger = logging.getLogger('ventas')
+if not logger.handlers:
+    _manejador = logging.StreamHandler()
+    _manejador.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_manejador)
+    logger.propagate = False
+logger.setLevel(getattr(logging, str(config.LOG_LEVEL).upper(), logging.INFO))
+
+def _escapar(valor):
+    """Escapar el valor de una etiqueta de Prometheus"""
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Histograma:
+    """Histograma de latencias con los límites de config.LIMITES_LATENCIA_SEGUNDOS"""
+    def __init__(self, limites):
+        self.limites = list(limites)
+        self.cubetas = [0] * (len(self.limites) + 1)
+        self.suma = 0.0
+        self.cuenta = 0
+
+    def observar(self, valor):
+        self.cubetas[bisect.bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.cuenta += 1
+
+    def acumulado(self):
+        """Pares (límite, observaciones <= límite) como los espera Prometheus"""
+        total = 0
+        pares = []
+        for limite, cantidad in zip(self.limites + ['+Inf'], self.cubetas):
+            total += cantidad
+            pares.append((limite, total))
+        return pares
+
+class Metricas:
+    """Registro de métricas compartido por todo el proceso"""
+    def __init__(self, prefijo='ventas'):
+        self.prefijo = prefijo
+        self.candado = threading.Lock()
+        self.llamadas = {}
+        self.errores = {}
+        self.latencias = {}
+        self.cache = {}
+        self.peticiones = {}
+        self.bytes_respuesta = {}
+        self.latencias_peticion = {}
+
+    def observar(self, funcion, segundos, error=False):
+        """Registrar una llamada a una función instrumentada"""
+        with self.candado:
+            self.llamadas[funcion] = self.llamadas.get(funcion, 0) + 1
+            if error:
+                self.errores[funcion] = self.errores.get(funcion, 0) + 1
+            if funcion not in self.latencias:
+                self.latencias[funcion] = Histograma(config.LIMITES_LATENCIA_SEGUNDOS)
+            self.latencias[funcion].observar(segundos)
+
+    def registrar_cache(self, nombre, acierto):
+        """Registrar un acierto o un fallo de la caché indicada"""
+        with self.candado:
+            aciertos, fallos = self.cache.get(nombre, (0, 0))
+            self.cache[nombre] = (aciertos + 1, fallos) if acierto else (aciertos, fallos + 1)
+
+    def registrar_peticion(self, ruta, estado, num_bytes, segundos):
+        """Registrar una petición HTTP servida por un dashboard"""
+        with self.candado:
+            clave = (ruta, estado)
+            self.peticiones[clave] = self.peticiones.get(clave, 0) + 1
+            self.bytes_respuesta[ruta] = self.bytes_respuesta.get(ruta, 0) + num_bytes
+            if ruta not in self.latencias_peticion:
+                self.latencias_peticion[ruta] = Histograma(config.LIMITES_LATENCIA_SEGUNDOS)
+            self.latencias_peticion[ruta].observar(segundos)
+
+    def instrumentar(self, nombre):
+        """Decorador que mide cada llamada a la función con el nombre indicado"""
+        def decorador(funcion):
+            @functools.wraps(funcion)
+            def envoltura(*args, **kwargs):
+                inicio = time.perf_counter()
+                error = True
+                try:
+                    resultado = funcion(*args, **kwargs)
+                    error = False
+                    return resultado
+                finally:
+                    self.observar(nombre, time.perf_counter() - inicio, error)
+            return envoltura
+        return decorador
+
+    def exportar_prometheus(self):
+        """Texto en formato de exposición de Prometheus"""
+        p = self.prefijo
+        lineas = []
+
+        def histograma(nombre, ayuda, etiqueta, datos):
+            lineas.append(f'# HELP {nombre} {ayuda}')
+            lineas.append(f'# TYPE {nombre} histogram')
+            for valor, hist in sorted(datos.items()):
+                for limite, total in hist.acumulado():
+                    lineas.append(f'{nombre}_bucket{{{etiqueta}="{_escapar(valor)}",le="{limite}"}} {total}')
+                lineas.append(f'{nombre}_sum{{{etiqueta}="{_escapar(valor)}"}} {hist.suma:.6f}')
+                lineas.append(f'{nombre}_count{{{etiqueta}="{_escapar(valor)}"}} {hist.cuenta}')
+
+        def contador(nombre, ayuda, tipo, filas):
+            lineas.append(f'# HELP {nombre} {ayuda}')
+            lineas.append(f'# TYPE {nombre} {tipo}')
+            for etiquetas, valor in filas:
+                texto = ','.join(f'{clave}="{_escapar(dato)}"' for clave, dato in etiquetas)
+                lineas.append(f'{nombre}{{{texto}}} {valor}')
+
+        with self.candado:
+            contador(f'{p}_llamadas_total', 'Llamadas a funciones instrumentadas', 'counter',
+                     [((('funcion', f),), n) for f, n in sorted(self.llamadas.items())])
+            contador(f'{p}_errores_total', 'Llamadas que terminaron con excepción', 'counter',
+                     [((('funcion', f),), n) for f, n in sorted(self.errores.items())])
+            histograma(f'{p}_latencia_segundos', 'Latencia de las funciones instrumentadas',
+                       'funcion', self.latencias)
+
+            contador(f'{p}_cache_aciertos_total', 'Aciertos de caché', 'counter',
+                     [((('cache', c),), a) for c, (a, _) in sorted(self.cache.items())])
+            contador(f'{p}_cache_fallos_total', 'Fallos de caché', 'counter',
+                     [((('cache', c),), f) for c, (_, f) in sorted(self.cache.items())])
+            contador(f'{p}_cache_ratio_aciertos', 'Proporción de aciertos de caché', 'gauge',
+                     [((('cache', c),), f'{a / max(a + f, 1):.4f}') for c, (a, f) in sorted(self.cache.items())])
+
+            contador(f'{p}_peticiones_total', 'Peticiones HTTP servidas', 'counter',
+                     [((('ruta', r), ('estado', e)), n) for (r, e), n in sorted(self.peticiones.items())])
+            contador(f'{p}_respuesta_bytes_total', 'Bytes enviados en las respuestas', 'counter',
+                     [((('ruta', r),), n) for r, n in sorted(self.bytes_respuesta.items())])
+            histograma(f'{p}_peticion_segundos', 'Duración de las peticiones HTTP',
+                       'ruta', self.latencias_peticion)
+
+        return '\n'.join(lineas) + '\n'
+
+# Registro global del proceso
+METRICAS = Metricas()
+
+def instrumentar(nombre):
+    """Decorador para medir una función con el registro global"""
+    if not config.METRICAS_HABILITADAS:
+        return lambda funcion: funcion
+    return METRICAS.instrumentar(nombre)
+
+def registrar_cache(nombre, acierto):
+    """Registrar un acierto o fallo de caché en el registro global"""
+    if config.METRICAS_HABILITADAS:
+        METRICAS.registrar_cache(nombre, acierto)
+
+def instalar_metricas(app, nombre_app):
+    """
+    Agregar /metrics y el registro por petición al servidor Flask de una app Dash.
+    Las actualizaciones de Dash se etiquetan con el componente de salida del callback.
+    """
+    if not config.METRICAS_HABILITADAS:
+        return
+
+    from flask import Response, abort, g, request
+
+    servidor = app.server
+
+    @servidor.route('/metrics')
+    def metricas_prometheus():
+        if config.METRICAS_SOLO_LOCAL and request.remote_addr not in ('127.0.0.1', '::1'):
+            abort(403)
+        return Response(METRICAS.exportar_prometheus(), mimetype='text/plain; version=0.0.4')
+
+    @servidor.before_request
+    def iniciar_cronometro():
+        g.inicio_peticion = time.perf_counter()
+
+    @servidor.after_request
+    def registrar_respuesta(respuesta):
+        inicio = g.pop('inicio_peticion', None)
+        if inicio is None or request.path == '/metrics':
+            return respuesta
+
+        segundos = time.perf_counter() - inicio
+        ruta = request.path
+        if ruta.endswith('_dash-update-component'):
+            cuerpo = request.get_json(silent=True) or {}
+            ruta = f"callback:{cuerpo.get('output', '?')}"
+        num_bytes = 0 if respuesta.direct_passthrough else (respuesta.calculate_content_length() or 0)
+
+        METRICAS.registrar_peticion(ruta, respuesta.status_code, num_bytes, segundos)
+        logger.info(json.dumps({
+            'evento': 'peticion',
+            'app': nombre_app,
+            'metodo': request.method,
+            'ruta': ruta,
+            'estado': respuesta.status_code,
+            'duracion_ms': round(segundos * 1000, 2),
+            'bytes': num_bytes
+        }, ensure_ascii=False))
+        return respuesta
@@ -0,0 +1,107 @@
+"""
+📉 Reducción de series temporales para los gráficos
+Con varios años de historia las series diarias tienen miles de puntos: el JSON
+de la figura crece y el navegador se vuelve lento. Aquí se reducen a
+config.PUNTOS_MAXIMOS_SERIE puntos conservando la forma de la curva:
+
+- LTTB (Largest-Triangle-Three-Buckets): en cada tramo elige el punto que forma
+  el triángulo más grande con el punto anterior y la media del tramo siguiente.
+- min/max: en cada tramo conserva el mínimo y el máximo (picos garantizados).
+
+Las series ya pequeñas se devuelven tal cual.
+"""
+
+import numpy as np
+
+import config
+
+def _a_numeros(x):
+    """Eje x como float64 (las fechas pasan a nanosegundos)"""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype('datetime64[ns]').astype(np.int64)
+    return x.astype(np.float64)
+
+def indices_lttb(x, y, objetivo):
+    """Índices de los `objetivo` puntos elegidos por LTTB (siempre incluye el primero y el último)"""
+    n = len(y)
+    if objetivo >= n or objetivo < 3:
+        return np.arange(n)
+
+    x = _a_numeros(x)
+    y = np.asarray(y, dtype=np.float64)
+
+    # objetivo - 2 tramos entre el primer y el último punto
+    limites = np.linspace(1, n - 1, objetivo - 1).astype(np.int64)
+    # Media de cada tramo de una vez; el tramo "siguiente" del último es el punto final
+    tamanos = np.diff(limites)
+    medias_x = np.append(np.add.reduceat(x[1:n - 1], limites[:-1] - 1) / tamanos, x[-1])
+    medias_y = np.append(np.add.reduceat(y[1:n - 1], limites[:-1] - 1) / tamanos, y[-1])
+
+    indices = np.empty(objetivo, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    anterior = 0
+    for i in range(objetivo - 2):
+        inicio, fin = limites[i], limites[i + 1]
+        xa, ya = x[anterior], y[anterior]
+        areas = np.abs((xa - medias_x[i + 1]) * (y[inicio:fin] - ya)
+                       - (xa - x[inicio:fin]) * (medias_y[i + 1] - ya))
+        anterior = inicio + int(np.argmax(areas))
+        indices[i + 1] = anterior
+    return indices
+
+def indices_minmax(y, objetivo):
+    """Índices del mínimo y el máximo de cada tramo (unos `objetivo` puntos en total)"""
+    n = len(y)
+    if objetivo >= n or objetivo < 4:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=np.float64)
+    tramos = objetivo // 2
+    tramo = np.repeat(np.arange(tramos), np.diff(np.linspace(0, n, tramos + 1).astype(np.int64)))
+    # Ordenando por (tramo, valor) el mínimo es el primero de cada tramo y el máximo el último
+    orden = np.lexsort((y, tramo))
+    cortes = np.flatnonzero(np.diff(tramo[orden])) + 1
+    primeros = orden[np.r_[0, cortes]]
+    ultimos = orden[np.r_[cortes - 1, n - 1]]
+    return np.unique(np.concatenate([[0, n - 1], primeros, ultimos]))
+
+def indices_reduccion(x, y, objetivo=None, metodo=None):
+    """Índices a conservar según el método y el número de puntos configurados"""
+    objetivo = objetivo or config.PUNTOS_MAXIMOS_SERIE
+    metodo = metodo or config.METODO_REDUCCION_SERIE
+    if metodo == 'minmax':
+        return indices_minmax(y, objetivo)
+    return indices_lttb(x, y, objetivo)
+
+def reducir_serie(x, y, objetivo=None, metodo=None):
+    """(x, y) reducidos a lo sumo a `objetivo` puntos"""
+    x, y = np.asarray(x), np.asarray(y)
+    indices = indices_reduccion(x, y, objetivo, metodo)
+    if len(indices) == len(y):
+        return x, y
+    return x[indices], y[indices]
+
+def reducir_dataframe(df, columna_x, columna_y, objetivo=None, metodo=None):
+    """Filas del DataFrame (ordenado por columna_x) que conserva la reducción"""
+    indices = indices_reduccion(df[columna_x].to_numpy(), df[columna_y].to_numpy(), objetivo, metodo)
+    if len(indices) == len(df):
+        return df
+    return df.iloc[indices]
+
+def usar_webgl(num_puntos):
+    """Si conviene dibujar con WebGL (Scattergl) en lugar de SVG"""
+    return config.USAR_WEBGL and num_puntos > config.UMBRAL_PUNTOS_WEBGL
+
+def traza_temporal(x, y, mode='lines+markers', objetivo=None, **kwargs):
+    """
+    go.Scatter (o go.Scattergl si la serie es densa) con la serie ya reducida.
+    Por encima de config.UMBRAL_PUNTOS_MARCADORES se dibuja solo la línea.
+    """
+    import plotly.graph_objects as go
+
+    x, y = reducir_serie(x, y, objetivo)
+    if len(x) > config.UMBRAL_PUNTOS_MARCADORES:
+        mode = mode.replace('+markers', '')
+    clase = go.Scattergl if usar_webgl(len(x)) else go.Scatter
+    return clase(x=x, y=y, mode=mode, **kwargs)
@@ -0,0 +1,186 @@
+"""
+🗂️ Consolidado particionado por mes
+El historial crece de a un mes, así que además del consolidado único se guarda
+un archivo Parquet por año-mes en config.CARPETA_PARTICIONES (ventas_2025-07.parquet)
+y un manifiesto con las particiones y los archivos de entrada que aportan a cada una.
+
+- Al consolidar solo se leen los Excel nuevos o modificados y solo se reescriben
+  los meses en los que tenían (o tienen ahora) filas. Cada fila guarda su archivo
+  de origen en la columna _ORIGEN para poder reemplazarla.
+- Al leer un rango de fechas solo se abren las particiones que se cruzan con él.
+
+Se activa con config.USAR_PARTICIONES (requiere pyarrow).
+"""
+
+import functools
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import config
+from almacen_datos import COLUMNAS_NUMERICAS, identidad_archivo
+
+ARCHIVO_MANIFIESTO = 'manifiesto.json'
+COLUMNA_ORIGEN = '_ORIGEN'
+SIN_FECHA = 'sin_fecha'  # Partición de las filas sin fecha válida
+
+def carpeta_particiones(carpeta):
+    """Carpeta de las particiones dentro de la carpeta de datos"""
+    return os.path.join(carpeta, config.CARPETA_PARTICIONES)
+
+def _ruta_particion(carpeta, mes):
+    return os.path.join(carpeta_particiones(carpeta), f'ventas_{mes}.parquet')
+
+def leer_manifiesto(carpeta):
+    """Manifiesto de particiones y archivos de entrada (vacío si aún no hay particiones)"""
+    try:
+        with open(os.path.join(carpeta_particiones(carpeta), ARCHIVO_MANIFIESTO), encoding='utf-8') as archivo:
+            return json.load(archivo)
+    except (FileNotFoundError, ValueError):
+        return {'archivos': {}, 'particiones': {}}
+
+def _guardar_manifiesto(carpeta, manifiesto):
+    """Escribir el manifiesto de una vez (temporal + reemplazo)"""
+    ruta = os.path.join(carpeta_particiones(carpeta), ARCHIVO_MANIFIESTO)
+    with open(f'{ruta}.tmp', 'w', encoding='utf-8') as archivo:
+        json.dump(manifiesto, archivo, indent=2, ensure_ascii=False)
+    os.replace(f'{ruta}.tmp', ruta)
+
+def particiones_disponibles(carpeta):
+    """Si la carpeta de datos tiene consolidado particionado"""
+    return bool(leer_manifiesto(carpeta)['particiones'])
+
+def meses(fechas):
+    """'AAAA-MM' de cada fecha (SIN_FECHA para las vacías)"""
+    # Formatear solo los meses distintos: strftime fila por fila tarda segundos con millones de filas
+    codigos, periodos = pd.factorize(fechas.dt.year * 100 + fechas.dt.month)
+    etiquetas = np.array([f'{int(p) // 100:04d}-{int(p) % 100:02d}' for p in periodos] + [SIN_FECHA], dtype=object)
+    # Las fechas vacías tienen código -1: la última etiqueta
+    return pd.Series(etiquetas[codigos], index=fechas.index)
+
+def _leer_entrada(carpeta, nombre):
+    """Leer un Excel de entrada con TOTAL_VENTA, tipos normalizados y su origen"""
+    df = pd.read_excel(os.path.join(carpeta, nombre))
+    if 'PRECIO_UNITARIO' in df.columns and 'CANTIDAD' in df.columns:
+        df['TOTAL_VENTA'] = df['PRECIO_UNITARIO'] * df['CANTIDAD']
+    df['FECHA'] = pd.to_datetime(df['FECHA'], errors='coerce') if 'FECHA' in df.columns else pd.NaT
+    for col in COLUMNAS_NUMERICAS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    # Parquet no admite columnas con tipos mezclados: el resto de columnas de objetos pasan a texto
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].astype('string')
+    df[COLUMNA_ORIGEN] = nombre
+    return df
+
+def _escribir_particion(df, ruta):
+    """Guardar una partición en un temporal y reemplazar la anterior de una vez"""
+    df.to_parquet(f'{ruta}.tmp', index=False)
+    os.replace(f'{ruta}.tmp', ruta)
+
+def actualizar_particiones(carpeta, salida='Reporte_Consolidado.xlsx'):
+    """
+    Reescribir solo las particiones afectadas por Excel nuevos, modificados o
+    eliminados desde la última consolidación. Devuelve la lista de meses
+    reescritos ([] si todo estaba al día) o None si no hay archivos de entrada.
+    """
+    from automatizacion import buscar_archivos_excel
+
+    archivos = buscar_archivos_excel(carpeta, salida)
+    if not archivos:
+        print(f"No se encontraron archivos de Excel en la carpeta '{carpeta}'")
+        return None
+
+    os.makedirs(carpeta_particiones(carpeta), exist_ok=True)
+    manifiesto = leer_manifiesto(carpeta)
+    identidades = {nombre: list(identidad_archivo(os.path.join(carpeta, nombre))[1:]) for nombre in archivos}
+    eliminados = set(manifiesto['archivos']) - set(archivos)
+    cambiados = {nombre for nombre in archivos
+                 if manifiesto['archivos'].get(nombre, {}).get('identidad') != identidades[nombre]}
+    if not cambiados and not eliminados:
+        print("⏭️ Particiones al día: ningún archivo de entrada cambió")
+        return []
+
+    nuevos = {}
+    for nombre in sorted(cambiados):
+        print(f" > Procesando {nombre}...")
+        try:
+            nuevos[nombre] = _leer_entrada(carpeta, nombre)
+        except Exception as e:
+            # Sus filas anteriores se conservan y se reintenta en la próxima consolidación
+            print(f"   Error al leer {nombre}: {e}")
+    reemplazados = set(nuevos) | eliminados
+
+    # Meses donde los archivos reemplazados tenían filas y donde las tienen ahora
+    tocados = set()
+    for nombre in reemplazados:
+        tocados.update(manifiesto['archivos'].get(nombre, {}).get('meses', []))
+    meses_nuevos = {nombre: meses(df['FECHA']) for nombre, df in nuevos.items()}
+    for mes_archivo in meses_nuevos.values():
+        tocados.update(mes_archivo.unique())
+
+    for mes in sorted(tocados):
+        ruta = _ruta_particion(carpeta, mes)
+        partes = []
+        if os.path.exists(ruta):
+            anterior = pd.read_parquet(ruta)
+            partes.append(anterior[~anterior[COLUMNA_ORIGEN].isin(reemplazados)])
+        partes.extend(df[meses_nuevos[nombre] == mes] for nombre, df in nuevos.items())
+        partes = [parte for parte in partes if not parte.empty]
+
+        if not partes:
+            if os.path.exists(ruta):
+                os.remove(ruta)
+            manifiesto['particiones'].pop(mes, None)
+            continue
+
+        particion = pd.concat(partes, ignore_index=True)
+        _escribir_particion(particion, ruta)
+        manifiesto['particiones'][mes] = {'archivo': os.path.basename(ruta), 'filas': len(particion)}
+
+    for nombre in eliminados:
+        manifiesto['archivos'].pop(nombre, None)
+    for nombre, df in nuevos.items():
+        manifiesto['archivos'][nombre] = {'identidad': identidades[nombre],
+                                          'meses': sorted(meses_nuevos[nombre].unique())}
+    _guardar_manifiesto(carpeta, manifiesto)
+
+    print(f"🗂️ Particiones reescritas: {', '.join(sorted(tocados))} "
+          f"({len(manifiesto['particiones'])} en total)")
+    return sorted(tocados)
+
+def meses_en_rango(carpeta, inicio=None, fin=None):
+    """Particiones que se cruzan con [inicio, fin] (todas si no hay rango)"""
+    disponibles = sorted(leer_manifiesto(carpeta)['particiones'])
+    if inicio is None and fin is None:
+        return disponibles
+    desde = pd.Timestamp(inicio).strftime('%Y-%m') if inicio is not None else '0000-00'
+    hasta = pd.Timestamp(fin).strftime('%Y-%m') if fin is not None else '9999-99'
+    # Con un rango de fechas las filas sin fecha nunca entran
+    return [mes for mes in disponibles if mes != SIN_FECHA and desde <= mes <= hasta]
+
+@functools.lru_cache(maxsize=config.MAX_PARTICIONES_EN_MEMORIA)
+def _leer_particion(identidad):
+    """Partición leída y memorizada por identidad (se relee solo si se reescribe)"""
+    return pd.read_parquet(identidad[0])
+
+def cargar_particiones(carpeta, inicio=None, fin=None, con_origen=False):
+    """
+    Filas de las particiones que se cruzan con el rango (el filtro exacto por
+    fecha lo aplica quien llama). Sin rango se lee el consolidado completo.
+    """
+    partes = []
+    for mes in meses_en_rango(carpeta, inicio, fin):
+        identidad = identidad_archivo(_ruta_particion(carpeta, mes))
+        if identidad is not None:
+            partes.append(_leer_particion(identidad))
+    if not partes:
+        return pd.DataFrame({'FECHA': pd.Series(dtype='datetime64[ns]'),
+                             **{col: pd.Series(dtype='float64') for col in COLUMNAS_NUMERICAS}})
+
+    df = pd.concat(partes, ignore_index=True)
+    if not con_origen:
+        df = df.drop(columns=[COLUMNA_ORIGEN], errors='ignore')
+    return df
@@ -0,0 +1,158 @@
+"""
+🔬 Modo de perfilado
+Envuelve las etapas pesadas (consolidación, entrenamiento, predicciones y
+reportes) con cProfile y tracemalloc. Cada etapa deja un archivo .prof
+(abrible con snakeviz o flameprof) y al final se resumen los puntos calientes
+y los sitios que más memoria reservan.
+
+Se activa con config.MODO_PERFILADO = True o con `python main.py <comando> --profile`.
+"""
+
+import cProfile
+import functools
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import config
+
+_estado = {'activo': False, 'carpeta': None}
+_candado = threading.Lock()
+# tracemalloc es global y cProfile no admite perfiles anidados: solo se perfila
+# un bloque a la vez y los que coinciden con él se ejecutan sin perfilar
+_candado_perfil = threading.Lock()
+_contadores = {}
+RESULTADOS = []
+
+def perfilado_activo():
+    """Indicar si el perfilado está encendido (por config o por línea de comandos)"""
+    return _estado['activo'] or config.MODO_PERFILADO
+
+def activar_perfilado(carpeta=None):
+    """Encender el perfilado para el resto del proceso"""
+    _estado['activo'] = True
+    _estado['carpeta'] = carpeta
+
+def _carpeta_salida():
+    """Carpeta de esta ejecución: perfiles/<fecha_hora>/"""
+    with _candado:
+        if _estado['carpeta'] is None:
+            _estado['carpeta'] = os.path.join(config.CARPETA_PERFILES,
+                                              datetime.now().strftime('%Y%m%d_%H%M%S'))
+        os.makedirs(_estado['carpeta'], exist_ok=True)
+        return _estado['carpeta']
+
+def _nombre_archivo(nombre):
+    """Nombre único por etapa: las llamadas repetidas se numeran"""
+    with _candado:
+        _contadores[nombre] = _contadores.get(nombre, 0) + 1
+        numero = _contadores[nombre]
+    return nombre if numero == 1 else f'{nombre}_{numero}'
+
+@contextmanager
+def perfilar(nombre):
+    """
+    Perfilar el bloque con cProfile y tracemalloc si el modo está activo.
+    Un bloque dentro de otro ya perfilado (o en paralelo con él) no se perfila aparte.
+    """
+    if not perfilado_activo() or not _candado_perfil.acquire(blocking=False):
+        yield
+        return
+
+    perfil = cProfile.Profile()
+    inicio_tracemalloc = not tracemalloc.is_tracing()
+    if inicio_tracemalloc:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+
+    inicio = time.perf_counter()
+    perfil.enable()
+    try:
+        yield
+    finally:
+        perfil.disable()
+        duracion = time.perf_counter() - inicio
+        _, pico = tracemalloc.get_traced_memory()
+        asignaciones = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>')
+        ]).statistics('lineno')
+        if inicio_tracemalloc:
+            tracemalloc.stop()
+        _candado_perfil.release()
+
+        archivo = os.path.join(_carpeta_salida(), f'{_nombre_archivo(nombre)}.prof')
+        perfil.dump_stats(archivo)
+        with _candado:
+            RESULTADOS.append({
+                'nombre': nombre,
+                'duracion': duracion,
+                'memoria_pico': pico,
+                'archivo': archivo,
+                'perfil': perfil,
+                'asignaciones': asignaciones[:config.TOP_PERFILADO]
+            })
+
+def perfilar_funcion(nombre):
+    """Decorador equivalente a `with perfilar(nombre)`"""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with perfilar(nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+def _puntos_calientes(perfil, top):
+    """Funciones con más tiempo acumulado según pstats"""
+    salida = io.StringIO()
+    estadisticas = pstats.Stats(perfil, stream=salida)
+    estadisticas.strip_dirs().sort_stats('cumulative').print_stats(top)
+    lineas = salida.getvalue().splitlines()
+    # Quedarse con la tabla (desde el encabezado ncalls)
+    for i, linea in enumerate(lineas):
+        if linea.strip().startswith('ncalls'):
+            return [l for l in lineas[i:] if l.strip()]
+    return lineas
+
+def generar_resumen(top=None):
+    """Texto con los puntos calientes y las asignaciones de cada etapa perfilada"""
+    top = top or config.TOP_PERFILADO
+    partes = []
+    with _candado:
+        resultados = list(RESULTADOS)
+
+    for resultado in resultados:
+        partes.append(f"\n🔬 {resultado['nombre']}: {resultado['duracion']:.2f} s, "
+                      f"memoria máxima {resultado['memoria_pico'] / 1024 ** 2:.1f} MB")
+        partes.append(f"   📄 {resultado['archivo']}")
+        partes.append("   🔥 Puntos calientes (tiempo acumulado):")
+        partes.extend(f"      {linea}" for linea in _puntos_calientes(resultado['perfil'], top))
+        partes.append("   💾 Sitios con más memoria reservada al terminar:")
+        for estadistica in resultado['asignaciones']:
+            marco = estadistica.traceback[0]
+            partes.append(f"      {estadistica.size / 1024:10.1f} KB  {estadistica.count:>8} bloques  "
+                          f"{os.path.basename(marco.filename)}:{marco.lineno}")
+    return '\n'.join(partes)
+
+def mostrar_resumen(top=None):
+    """Imprimir el resumen y guardarlo junto a los .prof"""
+    if not RESULTADOS:
+        return None
+
+    resumen = generar_resumen(top)
+    print("\n🔬 RESUMEN DE PERFILADO")
+    print("=" * 50)
+    print(resumen)
+
+    archivo = os.path.join(_carpeta_salida(), 'resumen.txt')
+    with open(archivo, 'w', encoding='utf-8') as f:
+        f.write(resumen)
+    print(f"\n💾 Perfiles y resumen guardados en: {_carpeta_salida()}")
+    return archivo
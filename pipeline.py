@@ -0,0 +1,358 @@
+"""
+🔗 Pipeline de Análisis en Proceso
+Ejecuta consolidación, reporte gráfico y análisis de IA dentro del mismo
+intérprete como un grafo de etapas. Cada etapa declara sus entradas y
+salidas: si las salidas son más recientes que la huella de sus entradas se
+omite, y las etapas independientes se ejecutan en paralelo.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import config
+
+ARCHIVO_CONSOLIDADO = 'Reporte_Consolidado.xlsx'
+ARCHIVO_MODELO = os.path.join('outputs', 'modelo_ventas.joblib')
+ARCHIVO_DATASET_COMPARTIDO = os.path.join('outputs', 'ventas.arrow')
+ARCHIVO_REPORTE_IA = os.path.join('outputs', 'Reporte_IA.png')
+ARCHIVO_ESTADO = '.pipeline_estado.json'
+
+# pyplot no es seguro entre hilos: las etapas que dibujan se serializan
+_candado_matplotlib = threading.Lock()
+_candado_datos = threading.Lock()
+
+class Etapa:
+    """Etapa del pipeline con sus dependencias, entradas y salidas declaradas"""
+
+    def __init__(self, nombre, descripcion, funcion, entradas, salidas,
+                 depende_de=(), critica=False, usa_matplotlib=False, por_defecto=True):
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.funcion = funcion
+        self.entradas = entradas  # función contexto -> lista de rutas
+        self.salidas = salidas  # función contexto -> lista de rutas
+        self.depende_de = tuple(depende_de)
+        self.critica = critica
+        self.usa_matplotlib = usa_matplotlib
+        self.por_defecto = por_defecto  # si se ejecuta cuando no se indican etapas
+
+    def ejecutar(self, contexto):
+        """Ejecutar la función de la etapa, serializando el uso de matplotlib"""
+        from perfilado import perfilar
+
+        with perfilar(f'etapa_{self.nombre}'):
+            if self.usa_matplotlib:
+                with _candado_matplotlib:
+                    return self.funcion(contexto)
+            return self.funcion(contexto)
+
+# --- RUTAS DECLARADAS ---
+def _ruta(contexto, nombre):
+    return os.path.join(contexto['carpeta'], nombre)
+
+def _archivos_entrada(contexto):
+    from automatizacion import buscar_archivos_excel
+    return [_ruta(contexto, archivo) for archivo in buscar_archivos_excel(contexto['carpeta'], ARCHIVO_CONSOLIDADO)]
+
+def _consolidado(contexto):
+    return [_ruta(contexto, ARCHIVO_CONSOLIDADO)]
+
+def _reporte_grafico(contexto):
+    return [_ruta(contexto, f"{config.PREFIJO_REPORTE_GRAFICO}.{contexto['formato_reporte']}")]
+
+def _modelo(contexto):
+    return [_ruta(contexto, ARCHIVO_MODELO)]
+
+def _consolidado_y_modelo(contexto):
+    return _consolidado(contexto) + _modelo(contexto)
+
+def _dataset_compartido(contexto):
+    return [_ruta(contexto, ARCHIVO_DATASET_COMPARTIDO)]
+
+def _base_sql(contexto):
+    from backend_sql import archivo_base_sql
+    return [_ruta(contexto, archivo_base_sql())]
+
+def _reporte_ia(contexto):
+    return [_ruta(contexto, ARCHIVO_REPORTE_IA)]
+
+# --- FUNCIONES DE LAS ETAPAS ---
+def _usar_backend_sin_pantalla():
+    """Forzar el backend Agg; importar pyplot primero evita ver el módulo a medio
+    inicializar cuando otra etapa lo está importando en paralelo"""
+    import matplotlib.pyplot as plt
+    plt.switch_backend('Agg')
+
+def etapa_consolidacion(contexto):
+    """Consolidar los archivos de Excel y guardar el reporte consolidado"""
+    import automatizacion
+
+    if config.USAR_PARTICIONES:
+        # Solo se leen los Excel que cambiaron y se reescriben sus meses
+        from particiones import actualizar_particiones, cargar_particiones
+
+        if actualizar_particiones(contexto['carpeta'], ARCHIVO_CONSOLIDADO) is None:
+            return False
+        df = cargar_particiones(contexto['carpeta'])
+    else:
+        df = automatizacion.consolidar_datos(contexto['carpeta'], ARCHIVO_CONSOLIDADO)
+    if df is None:
+        return False
+
+    automatizacion.guardar_consolidado(df, contexto['archivo_consolidado'])
+    contexto['df'] = normalizar_fechas(df)
+    return True
+
+def etapa_reporte(contexto):
+    """Generar el reporte gráfico estático sin abrir ventanas"""
+    _usar_backend_sin_pantalla()
+    from reporte_grafico import generar_reporte_grafico
+
+    archivo = generar_reporte_grafico(contexto['archivo_consolidado'], mostrar=False,
+                                      df=obtener_datos(contexto),
+                                      archivo_salida=_reporte_grafico(contexto)[0])
+    contexto['reporte_grafico'] = archivo
+    return archivo is not None
+
+def etapa_entrenamiento(contexto):
+    """Entrenar el modelo de predicción y persistirlo"""
+    from analisis_ia import AnalisisIA
+
+    ia = AnalisisIA(df=obtener_datos(contexto))
+    if not ia.entrenar_modelo_prediccion():
+        return False
+
+    ia.guardar_modelo(_modelo(contexto)[0])
+    contexto['ia'] = ia
+    return True
+
+def etapa_reporte_ia(contexto):
+    """Generar el análisis y el reporte visual de IA con el modelo entrenado"""
+    _usar_backend_sin_pantalla()
+    from analisis_ia import AnalisisIA, ejecutar_analisis
+
+    ia = contexto.get('ia')
+    if ia is None:
+        ia = AnalisisIA(df=obtener_datos(contexto))
+        if not ia.cargar_modelo(_modelo(contexto)[0]):
+            return False
+        contexto['ia'] = ia
+    # Con la base SQL al día, tendencias, segmentos y recomendaciones se consultan en ella
+    ia.base = abrir_base_sql(contexto)
+
+    contexto['reporte_ia'] = ejecutar_analisis(ia, entrenar=False, archivo_salida=_reporte_ia(contexto)[0])
+    return contexto['reporte_ia'] is not None
+
+def etapa_dataset_compartido(contexto):
+    """Guardar el consolidado como Arrow IPC para servirlo mapeado en memoria"""
+    from almacen_datos import escribir_dataset_compartido
+
+    contexto['dataset_compartido'] = escribir_dataset_compartido(
+        obtener_datos(contexto), _dataset_compartido(contexto)[0])
+    return True
+
+def etapa_base_sql(contexto):
+    """Cargar el consolidado en la base SQL (DuckDB o SQLite) con sus índices"""
+    from backend_sql import escribir_base_sql
+
+    contexto['base_sql'] = escribir_base_sql(obtener_datos(contexto), _base_sql(contexto)[0])
+    return True
+
+def abrir_base_sql(contexto):
+    """BaseVentas si config.USAR_BASE_SQL y la base está al día con el consolidado, o None"""
+    if not config.USAR_BASE_SQL:
+        return None
+    # Recién escrita en esta ejecución, o vigente según el estado de la anterior
+    if contexto.get('base_sql') is None and not etapa_vigente(
+            ETAPAS['base_sql'], contexto, cargar_estado(contexto['carpeta'])):
+        return None
+    from backend_sql import BaseVentas
+
+    return BaseVentas(_base_sql(contexto)[0])
+
+ETAPAS = {
+    etapa.nombre: etapa for etapa in [
+        Etapa('consolidacion', '📊 Consolidación de archivos Excel', etapa_consolidacion,
+              entradas=_archivos_entrada, salidas=_consolidado, critica=True),
+        Etapa('reporte', '📈 Generación de reporte gráfico', etapa_reporte,
+              entradas=_consolidado, salidas=_reporte_grafico,
+              depende_de=['consolidacion'], usa_matplotlib=True),
+        Etapa('entrenamiento', '🤖 Entrenamiento del modelo de IA', etapa_entrenamiento,
+              entradas=_consolidado, salidas=_modelo,
+              depende_de=['consolidacion']),
+        Etapa('reporte_ia', '🧠 Análisis inteligente con IA', etapa_reporte_ia,
+              entradas=_consolidado_y_modelo, salidas=_reporte_ia,
+              depende_de=['entrenamiento', 'base_sql'], usa_matplotlib=True),
+        Etapa('dataset_compartido', '🗄️ Dataset columnar para servir', etapa_dataset_compartido,
+              entradas=_consolidado, salidas=_dataset_compartido,
+              depende_de=['consolidacion'], por_defecto=False),
+        Etapa('base_sql', '🦆 Base analítica SQL', etapa_base_sql,
+              entradas=_consolidado, salidas=_base_sql,
+              depende_de=['consolidacion'], por_defecto=config.USAR_BASE_SQL)
+    ]
+}
+
+# --- DATOS COMPARTIDOS ---
+def obtener_datos(contexto):
+    """Devolver el DataFrame consolidado, leyendo el archivo solo si ninguna etapa lo produjo"""
+    with _candado_datos:
+        if contexto.get('df') is None:
+            import pandas as pd
+            contexto['df'] = normalizar_fechas(pd.read_excel(contexto['archivo_consolidado']))
+    return contexto['df']
+
+def normalizar_fechas(df):
+    """Convertir FECHA a datetime una sola vez para todas las etapas"""
+    if 'FECHA' in df.columns:
+        import pandas as pd
+        df['FECHA'] = pd.to_datetime(df['FECHA'], errors='coerce')
+    return df
+
+# --- FRESCURA DE ETAPAS ---
+def huella_archivos(rutas):
+    """Huella de un conjunto de archivos a partir de su nombre, tamaño y fecha de modificación"""
+    partes = []
+    for ruta in sorted(rutas):
+        try:
+            estado = os.stat(ruta)
+            partes.append(f"{os.path.basename(ruta)}:{estado.st_size}:{estado.st_mtime_ns}")
+        except FileNotFoundError:
+            partes.append(f"{os.path.basename(ruta)}:ausente")
+    return hashlib.sha1("|".join(partes).encode('utf-8')).hexdigest()
+
+def etapa_vigente(etapa, contexto, estado):
+    """
+    Una etapa está vigente si sus salidas existen, son posteriores a sus entradas
+    y la huella de las entradas coincide con la de su última ejecución
+    """
+    entradas = [ruta for ruta in etapa.entradas(contexto) if os.path.exists(ruta)]
+    salidas = etapa.salidas(contexto)
+
+    if not entradas or not all(os.path.exists(ruta) for ruta in salidas):
+        return False
+    if estado.get(etapa.nombre) != huella_archivos(entradas):
+        return False
+
+    mtime_entradas = max(os.stat(ruta).st_mtime_ns for ruta in entradas)
+    return min(os.stat(ruta).st_mtime_ns for ruta in salidas) >= mtime_entradas
+
+def cargar_estado(carpeta):
+    """Leer las huellas registradas en la última ejecución"""
+    try:
+        with open(os.path.join(carpeta, ARCHIVO_ESTADO), encoding='utf-8') as archivo:
+            return json.load(archivo)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def guardar_estado(carpeta, estado):
+    """Registrar las huellas de las etapas completadas"""
+    with open(os.path.join(carpeta, ARCHIVO_ESTADO), 'w', encoding='utf-8') as archivo:
+        json.dump(estado, archivo, indent=2)
+
+# --- EJECUCIÓN ---
+def mostrar_tiempos(tiempos, omitidas, total):
+    """Mostrar la duración de cada etapa"""
+    print("\n⏱️  TIEMPOS POR ETAPA")
+    for nombre, segundos in tiempos.items():
+        print(f"   {ETAPAS[nombre].descripcion}: {segundos:.2f} s")
+    for nombre in omitidas:
+        print(f"   {ETAPAS[nombre].descripcion}: ⏭️  al día, omitida")
+    print(f"   Total: {total:.2f} s")
+
+def _ejecutar_etapa(etapa, contexto):
+    """Ejecutar una etapa midiendo su duración"""
+    inicio = time.perf_counter()
+    try:
+        completada = etapa.ejecutar(contexto)
+    except Exception as e:
+        print(f"❌ Error inesperado en {etapa.descripcion}: {e}")
+        completada = False
+    return completada, time.perf_counter() - inicio
+
+def ejecutar_pipeline(etapas=None, carpeta=None, forzar=False, workers=None, formato_reporte='png'):
+    """
+    Ejecutar las etapas indicadas (las de por_defecto si no se indican) respetando sus dependencias.
+    Las etapas al día se omiten salvo que se indique forzar=True y las que no
+    dependen entre sí se ejecutan en paralelo.
+    Devuelve el contexto con el DataFrame, los resultados y los tiempos por etapa.
+    """
+    carpeta = carpeta or os.getcwd()
+    seleccion = [nombre for nombre, etapa in ETAPAS.items()
+                 if (etapa.por_defecto if etapas is None else nombre in etapas)]
+    contexto = {
+        'carpeta': carpeta,
+        'archivo_consolidado': os.path.join(carpeta, ARCHIVO_CONSOLIDADO),
+        'formato_reporte': formato_reporte,
+        'df': None,
+        'tiempos': {},
+        'omitidas': [],
+        'exito': True
+    }
+    estado = cargar_estado(carpeta)
+    inicio_total = time.perf_counter()
+
+    pendientes = list(seleccion)
+    terminadas, fallidas = set(), set()
+    en_curso = {}
+
+    # Al perfilar, las etapas van de una en una para que cada perfil sea solo suyo
+    from perfilado import perfilado_activo
+    if perfilado_activo():
+        workers = 1
+
+    with ThreadPoolExecutor(max_workers=workers or max(len(seleccion), 1)) as pool:
+        while pendientes or en_curso:
+            # Lanzar todas las etapas cuyas dependencias seleccionadas ya terminaron
+            for nombre in list(pendientes):
+                etapa = ETAPAS[nombre]
+                dependencias = [dep for dep in etapa.depende_de if dep in seleccion]
+                if any(dep in fallidas and ETAPAS[dep].critica for dep in dependencias):
+                    pendientes.remove(nombre)
+                    fallidas.add(nombre)
+                    continue
+                if not all(dep in terminadas or dep in fallidas for dep in dependencias):
+                    continue
+
+                pendientes.remove(nombre)
+                if not forzar and etapa_vigente(etapa, contexto, estado):
+                    contexto['omitidas'].append(nombre)
+                    terminadas.add(nombre)
+                    continue
+
+                print(f"\n🔄 {etapa.descripcion}...")
+                en_curso[pool.submit(_ejecutar_etapa, etapa, contexto)] = nombre
+
+            if not en_curso:
+                continue
+
+            listas, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+            for futuro in listas:
+                nombre = en_curso.pop(futuro)
+                etapa = ETAPAS[nombre]
+                completada, segundos = futuro.result()
+                contexto['tiempos'][nombre] = segundos
+
+                if completada:
+                    print(f"✅ {etapa.descripcion} completado exitosamente")
+                    estado[nombre] = huella_archivos(
+                        [ruta for ruta in etapa.entradas(contexto) if os.path.exists(ruta)])
+                    terminadas.add(nombre)
+                else:
+                    print(f"❌ Error en {etapa.descripcion}")
+                    estado.pop(nombre, None)
+                    contexto['exito'] = False
+                    fallidas.add(nombre)
+                    if not etapa.critica:
+                        print("⚠️ Advertencia: continuando con las siguientes etapas...")
+
+    contexto['fallidas'] = [nombre for nombre in seleccion if nombre in fallidas]
+    guardar_estado(carpeta, estado)
+    mostrar_tiempos(contexto['tiempos'], contexto['omitidas'], time.perf_counter() - inicio_total)
+    return contexto
+
+if __name__ == "__main__":
+    ejecutar_pipeline()
@@ -1,174 +1,376 @@
 import pandas as pd
+import matplotlib
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import argparse
 import os
+import re
 import numpy as np
 
-def generar_reporte_grafico(archivo_excel='Reporte_Consolidado.xlsx'):
+import config
+from muestreo import reducir_serie
+from series_tiempo import VENTANA_MEDIA_MOVIL, nombre_granularidad, serie_ventas
+from perfilado import perfilar_funcion
+
+def calcular_agregados_reporte(df):
+    """
+    Calcula en una sola pasada todos los datos que necesitan los nueve paneles.
+    Cada agrupación se hace una vez y se reutiliza entre paneles y métricas.
+    """
+    agregados = {'num_registros': len(df)}
+
+    if 'FECHA' in df.columns and 'TOTAL_VENTA' in df.columns:
+        # Por día, semana o mes según el largo de la historia
+        serie, granularidad = serie_ventas(df)
+        ventas_periodo = serie.set_index('FECHA')['TOTAL_VENTA']
+        agregados['ventas_periodo'] = ventas_periodo
+        agregados['granularidad'] = granularidad
+        agregados['media_movil'] = ventas_periodo.rolling(window=VENTANA_MEDIA_MOVIL[granularidad], center=True).mean()
+
+    if 'PRODUCTO' in df.columns and 'TOTAL_VENTA' in df.columns:
+        ventas_producto = df.groupby('PRODUCTO')['TOTAL_VENTA'].sum()
+        agregados['top_productos'] = ventas_producto.nlargest(10)
+        agregados['mejor_producto'] = ventas_producto.idxmax() if not ventas_producto.empty else 'N/A'
+
+    if 'CATEGORIA' in df.columns and 'TOTAL_VENTA' in df.columns:
+        agregados['ventas_categoria'] = df.groupby('CATEGORIA')['TOTAL_VENTA'].sum()
+
+    if 'VENDEDOR' in df.columns and 'TOTAL_VENTA' in df.columns:
+        ventas_vendedor = df.groupby('VENDEDOR')['TOTAL_VENTA'].sum()
+        agregados['ventas_vendedor'] = ventas_vendedor.sort_values(ascending=True)
+        agregados['mejor_vendedor'] = ventas_vendedor.idxmax() if not ventas_vendedor.empty else 'N/A'
+
+    if 'CANTIDAD' in df.columns and 'PRECIO_UNITARIO' in df.columns:
+        if len(df) > config.UMBRAL_FILAS_DENSIDAD:
+            # Con muchos registros se dibuja la densidad en lugar de cada punto
+            validos = df[['CANTIDAD', 'PRECIO_UNITARIO']].dropna()
+            conteos, bordes_x, bordes_y = np.histogram2d(validos['CANTIDAD'], validos['PRECIO_UNITARIO'],
+                                                         bins=config.CELDAS_DENSIDAD)
+            agregados['densidad'] = {'conteos': conteos, 'bordes_x': bordes_x, 'bordes_y': bordes_y}
+        else:
+            agregados['dispersion'] = {
+                'x': df['CANTIDAD'].to_numpy(),
+                'y': df['PRECIO_UNITARIO'].to_numpy(),
+                'color': df['TOTAL_VENTA'].to_numpy() if 'TOTAL_VENTA' in df.columns else None
+            }
+
+    if 'TOTAL_VENTA' in df.columns:
+        conteos, bordes = np.histogram(df['TOTAL_VENTA'].dropna(), bins=20)
+        agregados['histograma'] = {'conteos': conteos, 'bordes': bordes}
+        agregados['promedio_venta'] = df['TOTAL_VENTA'].mean()
+        agregados['total_ventas'] = df['TOTAL_VENTA'].sum()
+
+    if all(col in df.columns for col in ['VENDEDOR', 'CATEGORIA', 'TOTAL_VENTA']):
+        tabla_cruzada = df.pivot_table(values='TOTAL_VENTA', index='VENDEDOR',
+                                       columns='CATEGORIA', aggfunc='sum', fill_value=0)
+        agregados['tabla_cruzada'] = _truncar_tabla_cruzada(tabla_cruzada, config.MAX_FILAS_HEATMAP,
+                                                            config.MAX_COLUMNAS_HEATMAP)
+
+    agregados['total_productos'] = df['CANTIDAD'].sum() if 'CANTIDAD' in df.columns else 0
+    agregados['num_productos_unicos'] = df['PRODUCTO'].nunique() if 'PRODUCTO' in df.columns else 0
+
+    if 'FECHA' in df.columns and not df['FECHA'].isna().all():
+        agregados['periodo'] = (df['FECHA'].min().strftime('%d/%m/%Y'), df['FECHA'].max().strftime('%d/%m/%Y'))
+
+    return agregados
+
+def _truncar_tabla_cruzada(tabla, max_filas, max_columnas):
     """
-    Genera un reporte completo con gráficos estáticos
+    Conserva los vendedores y categorías con más ventas y agrupa el resto en 'Otros'
+    """
+    if tabla.shape[0] > max_filas:
+        orden = tabla.sum(axis=1).sort_values(ascending=False).index
+        principales = tabla.loc[orden[:max_filas - 1]]
+        otros = tabla.loc[orden[max_filas - 1:]].sum().to_frame('Otros').T
+        tabla = pd.concat([principales, otros])
+
+    if tabla.shape[1] > max_columnas:
+        orden = tabla.sum(axis=0).sort_values(ascending=False).index
+        principales = tabla[orden[:max_columnas - 1]]
+        tabla = principales.assign(Otros=tabla[orden[max_columnas - 1:]].sum(axis=1))
+
+    return tabla
+
+def dibujar_reporte(agregados, archivo_salida, titulo='📊 REPORTE COMPLETO DE VENTAS'):
+    """
+    Dibuja los nueve paneles a partir de los agregados y guarda la imagen
+    """
+    plt.style.use(config.ESTILO_GRAFICO)
+    sns.set_palette(config.PALETA_COLORES)
+
+    # Crear figura con subplots
+    fig = plt.figure(figsize=(config.FIGURA_WIDTH, config.FIGURA_HEIGHT))
+    fig.suptitle(titulo, fontsize=20, fontweight='bold', y=0.98)
+
+    # 1. Gráfico de ventas en el tiempo
+    if 'ventas_periodo' in agregados:
+        plt.subplot(3, 3, 1)
+        fechas, ventas = reducir_serie(agregados['ventas_periodo'].index, agregados['ventas_periodo'].values)
+        marcador = 'o' if len(fechas) <= config.UMBRAL_PUNTOS_MARCADORES else None
+        plt.plot(fechas, ventas, marker=marcador, linewidth=2)
+        titulo_panel = ('📈 Evolución de Ventas Diarias' if agregados['granularidad'] == 'D' else
+                        f"📈 Evolución de Ventas por {nombre_granularidad(agregados['granularidad'])}")
+        plt.title(titulo_panel, fontsize=14, fontweight='bold')
+        plt.xlabel('Fecha')
+        plt.ylabel('Ventas ($)')
+        plt.xticks(rotation=45)
+        plt.grid(True, alpha=0.3)
+
+    # 2. Top 10 productos más vendidos
+    if 'top_productos' in agregados:
+        plt.subplot(3, 3, 2)
+        top_productos = agregados['top_productos']
+        bars = plt.barh(range(len(top_productos)), top_productos.values)
+        plt.yticks(range(len(top_productos)), top_productos.index, fontsize=10)
+        plt.title('🏆 Top 10 Productos por Ventas', fontsize=14, fontweight='bold')
+        plt.xlabel('Ventas ($)')
+
+        # Añadir valores en las barras
+        for i, bar in enumerate(bars):
+            width = bar.get_width()
+            plt.text(width + max(top_productos.values)*0.01, bar.get_y() + bar.get_height()/2,
+                    f'${width:,.0f}', ha='left', va='center', fontsize=9)
+
+    # 3. Distribución por categorías
+    if 'ventas_categoria' in agregados:
+        plt.subplot(3, 3, 3)
+        ventas_categoria = agregados['ventas_categoria']
+        colors = plt.cm.Set3(np.linspace(0, 1, len(ventas_categoria)))
+        wedges, texts, autotexts = plt.pie(ventas_categoria.values, labels=ventas_categoria.index,
+                                          autopct='%1.1f%%', colors=colors, startangle=90)
+        plt.title('🎯 Distribución por Categorías', fontsize=14, fontweight='bold')
+
+    # 4. Ventas por vendedor
+    if 'ventas_vendedor' in agregados:
+        plt.subplot(3, 3, 4)
+        ventas_vendedor = agregados['ventas_vendedor']
+        bars = plt.barh(ventas_vendedor.index, ventas_vendedor.values)
+        plt.title('👥 Ventas por Vendedor', fontsize=14, fontweight='bold')
+        plt.xlabel('Ventas ($)')
+
+        # Colorear barras según el valor
+        for i, bar in enumerate(bars):
+            bar.set_color(plt.cm.viridis(i / len(bars)))
+
+    # 5. Cantidad vs Precio Unitario
+    if 'dispersion' in agregados:
+        plt.subplot(3, 3, 5)
+        dispersion = agregados['dispersion']
+        scatter = plt.scatter(dispersion['x'], dispersion['y'],
+                            c=dispersion['color'] if dispersion['color'] is not None else 'blue',
+                            alpha=0.6, s=50, cmap='viridis')
+        plt.xlabel('Cantidad')
+        plt.ylabel('Precio Unitario ($)')
+        plt.title('💰 Cantidad vs Precio Unitario', fontsize=14, fontweight='bold')
+        if dispersion['color'] is not None:
+            plt.colorbar(scatter, label='Total Venta ($)')
+    elif 'densidad' in agregados:
+        plt.subplot(3, 3, 5)
+        densidad = agregados['densidad']
+        conteos = np.ma.masked_equal(densidad['conteos'].T, 0)
+        malla = plt.pcolormesh(densidad['bordes_x'], densidad['bordes_y'], conteos,
+                               cmap='viridis', norm=matplotlib.colors.LogNorm())
+        plt.xlabel('Cantidad')
+        plt.ylabel('Precio Unitario ($)')
+        plt.title('💰 Cantidad vs Precio Unitario (densidad)', fontsize=14, fontweight='bold')
+        plt.colorbar(malla, label='Registros')
+
+    # 6. Histograma de ventas
+    if 'histograma' in agregados:
+        plt.subplot(3, 3, 6)
+        bordes = agregados['histograma']['bordes']
+        plt.hist(bordes[:-1], bins=bordes, weights=agregados['histograma']['conteos'],
+                edgecolor='black', alpha=0.7)
+        plt.xlabel('Total Venta ($)')
+        plt.ylabel('Frecuencia')
+        plt.title('📊 Distribución de Ventas', fontsize=14, fontweight='bold')
+        plt.axvline(agregados['promedio_venta'], color='red', linestyle='--',
+                   label=f'Promedio: ${agregados["promedio_venta"]:,.0f}')
+        plt.legend()
+
+    # 7. Mapa de calor de ventas por vendedor y categoría
+    if 'tabla_cruzada' in agregados:
+        plt.subplot(3, 3, 7)
+        tabla_cruzada = agregados['tabla_cruzada']
+        sns.heatmap(tabla_cruzada, annot=tabla_cruzada.size <= config.MAX_CELDAS_ANOTADAS,
+                    fmt='.0f', cmap='YlOrRd')
+        plt.title('🔥 Mapa de Calor: Vendedor x Categoría', fontsize=14, fontweight='bold')
+        plt.xticks(rotation=45)
+        plt.yticks(rotation=0)
+
+    # 8. Tendencia de ventas (media móvil)
+    if 'ventas_periodo' in agregados:
+        plt.subplot(3, 3, 8)
+        # La media móvil se calculó sobre la serie completa; solo se reduce lo que se dibuja
+        ventas_periodo = agregados['ventas_periodo']
+        media_movil = agregados['media_movil'].dropna()
+        granularidad = agregados['granularidad']
+        unidad = {'D': 'días', 'W-MON': 'semanas', 'MS': 'meses'}[granularidad]
+
+        plt.plot(*reducir_serie(ventas_periodo.index, ventas_periodo.values), alpha=0.3,
+                 label='Ventas Diarias' if granularidad == 'D' else f'Ventas por {nombre_granularidad(granularidad)}')
+        plt.plot(*reducir_serie(media_movil.index, media_movil.values), linewidth=3,
+                 label=f'Media Móvil ({VENTANA_MEDIA_MOVIL[granularidad]} {unidad})')
+        plt.title('📈 Tendencia de Ventas', fontsize=14, fontweight='bold')
+        plt.xlabel('Fecha')
+        plt.ylabel('Ventas ($)')
+        plt.legend()
+        plt.xticks(rotation=45)
+
+    # 9. Métricas resumen
+    plt.subplot(3, 3, 9)
+    plt.axis('off')
+
+    periodo = agregados.get('periodo', ('N/A', 'N/A'))
+    metricas_text = f"""
+    📊 MÉTRICAS CLAVE
+
+    💰 Total de Ventas: ${agregados.get('total_ventas', 0):,.0f}
+    📦 Productos Vendidos: {agregados['total_productos']:,}
+    🛍️ Venta Promedio: ${agregados.get('promedio_venta', 0):,.0f}
+    🏷️ Productos Únicos: {agregados['num_productos_unicos']}
+    📅 Período: {periodo[0]} - {periodo[1]}
+
+    🎯 Mejor Vendedor: {agregados.get('mejor_vendedor', 'N/A')}
+    🏆 Mejor Producto: {agregados.get('mejor_producto', 'N/A')}
+    """
+
+    plt.text(0.1, 0.9, metricas_text, transform=plt.gca().transAxes, fontsize=12,
+            verticalalignment='top', bbox=dict(boxstyle='round', facecolor='lightblue', alpha=0.8))
+
+    # Ajustar layout y guardar
+    plt.tight_layout()
+    plt.subplots_adjust(top=0.95)
+    plt.savefig(archivo_salida, dpi=config.DPI_REPORTE, bbox_inches='tight')
+
+    return fig
+
+def cargar_datos_reporte(archivo_excel):
+    """Cargar el archivo consolidado y normalizar fechas"""
+    if not os.path.exists(archivo_excel):
+        print(f"❌ No se encontró el archivo {archivo_excel}")
+        return None
+
+    df = pd.read_excel(archivo_excel)
+    print(f"✅ Datos cargados: {len(df)} registros")
+
+    return normalizar_fechas(df)
+
+def normalizar_fechas(df):
+    """Asegurar que FECHA sea datetime sin modificar el DataFrame recibido"""
+    if 'FECHA' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['FECHA']):
+        df = df.assign(FECHA=pd.to_datetime(df['FECHA'], errors='coerce'))
+    return df
+
+@perfilar_funcion('generar_reporte_grafico')
+def generar_reporte_grafico(archivo_excel='Reporte_Consolidado.xlsx', mostrar=True, df=None,
+                            archivo_salida=None):
+    """
+    Genera un reporte completo con gráficos estáticos.
+    Si se recibe un DataFrame ya consolidado no se vuelve a leer el archivo.
     """
-    
-    # Configurar estilo de matplotlib
-    plt.style.use('seaborn-v0_8')
-    sns.set_palette("husl")
-    
     try:
-        # Cargar datos
-        if os.path.exists(archivo_excel):
-            df = pd.read_excel(archivo_excel)
-            print(f"✅ Datos cargados: {len(df)} registros")
+        if df is None:
+            df = cargar_datos_reporte(archivo_excel)
+            if df is None:
+                return
         else:
-            print(f"❌ No se encontró el archivo {archivo_excel}")
-            return
-        
-        # Procesar fechas
-        if 'FECHA' in df.columns:
-            df['FECHA'] = pd.to_datetime(df['FECHA'], errors='coerce')
-        
-        # Crear figura con subplots
-        fig = plt.figure(figsize=(20, 15))
-        fig.suptitle('📊 REPORTE COMPLETO DE VENTAS', fontsize=20, fontweight='bold', y=0.98)
-        
-        # 1. Gráfico de ventas en el tiempo
-        if 'FECHA' in df.columns and 'TOTAL_VENTA' in df.columns:
-            plt.subplot(3, 3, 1)
-            ventas_diarias = df.groupby('FECHA')['TOTAL_VENTA'].sum()
-            plt.plot(ventas_diarias.index, ventas_diarias.values, marker='o', linewidth=2)
-            plt.title('📈 Evolución de Ventas Diarias', fontsize=14, fontweight='bold')
-            plt.xlabel('Fecha')
-            plt.ylabel('Ventas ($)')
-            plt.xticks(rotation=45)
-            plt.grid(True, alpha=0.3)
-        
-        # 2. Top 10 productos más vendidos
-        if 'PRODUCTO' in df.columns and 'TOTAL_VENTA' in df.columns:
-            plt.subplot(3, 3, 2)
-            top_productos = df.groupby('PRODUCTO')['TOTAL_VENTA'].sum().nlargest(10)
-            bars = plt.barh(range(len(top_productos)), top_productos.values)
-            plt.yticks(range(len(top_productos)), top_productos.index, fontsize=10)
-            plt.title('🏆 Top 10 Productos por Ventas', fontsize=14, fontweight='bold')
-            plt.xlabel('Ventas ($)')
-            
-            # Añadir valores en las barras
-            for i, bar in enumerate(bars):
-                width = bar.get_width()
-                plt.text(width + max(top_productos.values)*0.01, bar.get_y() + bar.get_height()/2, 
-                        f'${width:,.0f}', ha='left', va='center', fontsize=9)
-        
-        # 3. Distribución por categorías
-        if 'CATEGORIA' in df.columns and 'TOTAL_VENTA' in df.columns:
-            plt.subplot(3, 3, 3)
-            ventas_categoria = df.groupby('CATEGORIA')['TOTAL_VENTA'].sum()
-            colors = plt.cm.Set3(np.linspace(0, 1, len(ventas_categoria)))
-            wedges, texts, autotexts = plt.pie(ventas_categoria.values, labels=ventas_categoria.index, 
-                                              autopct='%1.1f%%', colors=colors, startangle=90)
-            plt.title('🎯 Distribución por Categorías', fontsize=14, fontweight='bold')
-        
-        # 4. Ventas por vendedor
-        if 'VENDEDOR' in df.columns and 'TOTAL_VENTA' in df.columns:
-            plt.subplot(3, 3, 4)
-            ventas_vendedor = df.groupby('VENDEDOR')['TOTAL_VENTA'].sum().sort_values(ascending=True)
-            bars = plt.barh(ventas_vendedor.index, ventas_vendedor.values)
-            plt.title('👥 Ventas por Vendedor', fontsize=14, fontweight='bold')
-            plt.xlabel('Ventas ($)')
-            
-            # Colorear barras según el valor
-            for i, bar in enumerate(bars):
-                bar.set_color(plt.cm.viridis(i / len(bars)))
-        
-        # 5. Cantidad vs Precio Unitario
-        if 'CANTIDAD' in df.columns and 'PRECIO_UNITARIO' in df.columns:
-            plt.subplot(3, 3, 5)
-            scatter = plt.scatter(df['CANTIDAD'], df['PRECIO_UNITARIO'], 
-                                c=df['TOTAL_VENTA'] if 'TOTAL_VENTA' in df.columns else 'blue',
-                                alpha=0.6, s=50, cmap='viridis')
-            plt.xlabel('Cantidad')
-            plt.ylabel('Precio Unitario ($)')
-            plt.title('💰 Cantidad vs Precio Unitario', fontsize=14, fontweight='bold')
-            if 'TOTAL_VENTA' in df.columns:
-                plt.colorbar(scatter, label='Total Venta ($)')
-        
-        # 6. Histograma de ventas
-        if 'TOTAL_VENTA' in df.columns:
-            plt.subplot(3, 3, 6)
-            plt.hist(df['TOTAL_VENTA'], bins=20, edgecolor='black', alpha=0.7)
-            plt.xlabel('Total Venta ($)')
-            plt.ylabel('Frecuencia')
-            plt.title('📊 Distribución de Ventas', fontsize=14, fontweight='bold')
-            plt.axvline(df['TOTAL_VENTA'].mean(), color='red', linestyle='--', 
-                       label=f'Promedio: ${df["TOTAL_VENTA"].mean():,.0f}')
-            plt.legend()
-        
-        # 7. Mapa de calor de ventas por vendedor y categoría
-        if all(col in df.columns for col in ['VENDEDOR', 'CATEGORIA', 'TOTAL_VENTA']):
-            plt.subplot(3, 3, 7)
-            tabla_cruzada = df.pivot_table(values='TOTAL_VENTA', index='VENDEDOR', 
-                                         columns='CATEGORIA', aggfunc='sum', fill_value=0)
-            sns.heatmap(tabla_cruzada, annot=True, fmt='.0f', cmap='YlOrRd')
-            plt.title('🔥 Mapa de Calor: Vendedor x Categoría', fontsize=14, fontweight='bold')
-            plt.xticks(rotation=45)
-            plt.yticks(rotation=0)
-        
-        # 8. Tendencia de ventas (media móvil)
-        if 'FECHA' in df.columns and 'TOTAL_VENTA' in df.columns:
-            plt.subplot(3, 3, 8)
-            ventas_diarias = df.groupby('FECHA')['TOTAL_VENTA'].sum().sort_index()
-            media_movil = ventas_diarias.rolling(window=7, center=True).mean()
-            
-            plt.plot(ventas_diarias.index, ventas_diarias.values, alpha=0.3, label='Ventas Diarias')
-            plt.plot(media_movil.index, media_movil.values, linewidth=3, label='Media Móvil (7 días)')
-            plt.title('📈 Tendencia de Ventas', fontsize=14, fontweight='bold')
-            plt.xlabel('Fecha')
-            plt.ylabel('Ventas ($)')
-            plt.legend()
-            plt.xticks(rotation=45)
-        
-        # 9. Métricas resumen
-        plt.subplot(3, 3, 9)
-        plt.axis('off')
-        
-        # Calcular métricas
-        total_ventas = df['TOTAL_VENTA'].sum() if 'TOTAL_VENTA' in df.columns else 0
-        total_productos = df['CANTIDAD'].sum() if 'CANTIDAD' in df.columns else 0
-        promedio_venta = df['TOTAL_VENTA'].mean() if 'TOTAL_VENTA' in df.columns else 0
-        num_productos_unicos = df['PRODUCTO'].nunique() if 'PRODUCTO' in df.columns else 0
-        
-        metricas_text = f"""
-        📊 MÉTRICAS CLAVE
-        
-        💰 Total de Ventas: ${total_ventas:,.0f}
-        📦 Productos Vendidos: {total_productos:,}
-        🛍️ Venta Promedio: ${promedio_venta:,.0f}
-        🏷️ Productos Únicos: {num_productos_unicos}
-        📅 Período: {df['FECHA'].min().strftime('%d/%m/%Y') if 'FECHA' in df.columns and not df['FECHA'].isna().all() else 'N/A'} - {df['FECHA'].max().strftime('%d/%m/%Y') if 'FECHA' in df.columns and not df['FECHA'].isna().all() else 'N/A'}
-        
-        🎯 Mejor Vendedor: {df.groupby('VENDEDOR')['TOTAL_VENTA'].sum().idxmax() if 'VENDEDOR' in df.columns and 'TOTAL_VENTA' in df.columns else 'N/A'}
-        🏆 Mejor Producto: {df.groupby('PRODUCTO')['TOTAL_VENTA'].sum().idxmax() if 'PRODUCTO' in df.columns and 'TOTAL_VENTA' in df.columns else 'N/A'}
-        """
-        
-        plt.text(0.1, 0.9, metricas_text, transform=plt.gca().transAxes, fontsize=12,
-                verticalalignment='top', bbox=dict(boxstyle='round', facecolor='lightblue', alpha=0.8))
-        
-        # Ajustar layout y guardar
-        plt.tight_layout()
-        plt.subplots_adjust(top=0.95)
-        
+            df = normalizar_fechas(df)
+
         # Guardar el reporte
-        nombre_archivo = f'Reporte_Grafico_Ventas_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png'
-        plt.savefig(nombre_archivo, dpi=300, bbox_inches='tight')
+        nombre_archivo = archivo_salida or f'{config.PREFIJO_REPORTE_GRAFICO}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png'
+        fig = dibujar_reporte(calcular_agregados_reporte(df), nombre_archivo)
         print(f"✅ Reporte gráfico guardado: {nombre_archivo}")
-        
+
         # Mostrar el gráfico
-        plt.show()
-        
+        if mostrar:
+            plt.show()
+        plt.close(fig)
+
         return nombre_archivo
-        
+
     except Exception as e:
         print(f"❌ Error al generar reporte: {e}")
         return None
 
+def _inicializar_proceso_sin_pantalla():
+    """Forzar un backend no interactivo en cada proceso de dibujo"""
+    matplotlib.use('Agg')
+
+def _dibujar_en_proceso(tarea):
+    """Dibujar un reporte dentro de un proceso del pool"""
+    agregados, archivo_salida, titulo = tarea
+    fig = dibujar_reporte(agregados, archivo_salida, titulo)
+    plt.close(fig)
+    return archivo_salida
+
+def _nombre_seguro(valor):
+    """Convertir un valor de grupo en un fragmento válido para nombre de archivo"""
+    return re.sub(r'[^\w-]+', '_', str(valor)).strip('_') or 'sin_nombre'
+
+@perfilar_funcion('generar_reportes_lote')
+def generar_reportes_lote(archivo_excel='Reporte_Consolidado.xlsx', por='VENDEDOR',
+                          carpeta_salida='reportes', workers=None, formato='png'):
+    """
+    Genera en modo batch un reporte por cada valor de CATEGORIA o VENDEDOR.
+    Los agregados se calculan en el proceso principal y el dibujo se reparte
+    en un pool de procesos, sin abrir ventanas.
+    """
+    _inicializar_proceso_sin_pantalla()
+
+    try:
+        df = cargar_datos_reporte(archivo_excel)
+        if df is None:
+            return []
+
+        if por not in df.columns:
+            print(f"❌ La columna {por} no existe en los datos")
+            return []
+
+        os.makedirs(carpeta_salida, exist_ok=True)
+        marca_tiempo = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        tareas = []
+        for valor, df_grupo in df.groupby(por):
+            archivo_salida = os.path.join(
+                carpeta_salida,
+                f'{config.PREFIJO_REPORTE_GRAFICO}_{por}_{_nombre_seguro(valor)}_{marca_tiempo}.{formato}'
+            )
+            titulo = f'📊 REPORTE DE VENTAS - {por}: {valor}'
+            tareas.append((calcular_agregados_reporte(df_grupo), archivo_salida, titulo))
+
+        print(f"🎨 Dibujando {len(tareas)} reportes por {por}...")
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                 initializer=_inicializar_proceso_sin_pantalla) as pool:
+            archivos = list(pool.map(_dibujar_en_proceso, tareas))
+
+        for archivo in archivos:
+            print(f"✅ Reporte gráfico guardado: {archivo}")
+
+        return archivos
+
+    except Exception as e:
+        print(f"❌ Error al generar reportes en lote: {e}")
+        return []
+
 if __name__ == "__main__":
-    print("🎨 Generando reporte gráfico completo...")
-    generar_reporte_grafico()
+    parser = argparse.ArgumentParser(description='Generar reportes gráficos estáticos de ventas')
+    parser.add_argument('--archivo', default='Reporte_Consolidado.xlsx', help='Archivo consolidado de entrada')
+    parser.add_argument('--por', choices=['CATEGORIA', 'VENDEDOR'],
+                        help='Generar un reporte por cada categoría o vendedor (modo batch)')
+    parser.add_argument('--workers', type=int, default=None, help='Procesos para el modo batch')
+    parser.add_argument('--carpeta-salida', default='reportes', help='Carpeta de salida del modo batch')
+    parser.add_argument('--formato', choices=['png', 'pdf', 'svg'], default='png', help='Formato de la imagen')
+    parser.add_argument('--sin-ventana', action='store_true', help='No mostrar el reporte en pantalla')
+    args = parser.parse_args()
+
+    if args.por:
+        print(f"🎨 Generando reportes gráficos por {args.por}...")
+        generar_reportes_lote(args.archivo, args.por, args.carpeta_salida, args.workers, args.formato)
+    else:
+        print("🎨 Generando reporte gráfico completo...")
+        marca_tiempo = datetime.now().strftime("%Y%m%d_%H%M%S")
+        generar_reporte_grafico(args.archivo, mostrar=not args.sin_ventana,
+                                archivo_salida=f'{config.PREFIJO_REPORTE_GRAFICO}_{marca_tiempo}.{args.formato}')
@@ -0,0 +1,184 @@
+"""
+💾 Respaldos del consolidado
+Cada vez que se guarda el consolidado se toma una instantánea en
+config.CARPETA_RESPALDO (dentro de la carpeta de datos):
+
+    respaldos/objetos/ab/ab12...ef.parquet   Un mes de ventas (Parquet con zstd)
+    respaldos/instantaneas/20250731T120000123456_ab12cd.json   Meses y objetos de cada instantánea
+
+Cada mes se guarda con el hash de su contenido como nombre: los meses que no
+cambiaron desde el respaldo anterior no se vuelven a escribir, así que un respaldo
+diario de un historial que solo crece en el último mes ocupa un mes de datos.
+Las instantáneas de más de config.MANTENER_RESPALDOS_DIAS días se borran (siempre
+queda la última) junto con los objetos que ya nadie usa.
+
+Restaurar lee los meses en paralelo y devuelve las filas ordenadas por mes (dentro
+de cada mes, en su orden original). Requiere pyarrow.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import config
+from particiones import meses
+
+CARPETA_OBJETOS = 'objetos'
+CARPETA_INSTANTANEAS = 'instantaneas'
+COMPRESION = 'zstd'
+
+def carpeta_respaldos(carpeta):
+    """Carpeta de los respaldos dentro de la carpeta de datos"""
+    return os.path.join(carpeta, config.CARPETA_RESPALDO)
+
+def _ruta_objeto(carpeta, huella):
+    return os.path.join(carpeta_respaldos(carpeta), CARPETA_OBJETOS, huella[:2], f'{huella}.parquet')
+
+def _ruta_instantanea(carpeta, id_respaldo):
+    return os.path.join(carpeta_respaldos(carpeta), CARPETA_INSTANTANEAS, f'{id_respaldo}.json')
+
+def _preparar(df):
+    """Copia con FECHA como fecha y sin columnas de tipos mezclados (Parquet no las admite)"""
+    df = df.reset_index(drop=True)
+    if 'FECHA' in df.columns:
+        df['FECHA'] = pd.to_datetime(df['FECHA'], errors='coerce')
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].astype('string')
+    return df
+
+def huella_particion(df):
+    """Hash del contenido de una partición: columnas, tipos y valores de cada fila"""
+    resumen = hashlib.sha256(repr([(col, str(tipo)) for col, tipo in df.dtypes.items()]).encode())
+    resumen.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return resumen.hexdigest()
+
+def _escribir_objeto(df, ruta):
+    """Guardar un mes en un temporal y moverlo a su lugar de una vez"""
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    df.to_parquet(f'{ruta}.tmp', index=False, compression=COMPRESION)
+    os.replace(f'{ruta}.tmp', ruta)
+
+def crear_respaldo(df, carpeta, origen=None):
+    """
+    Instantánea del consolidado partida por mes. Solo se escriben los meses cuyo
+    contenido no está ya respaldado. Devuelve el manifiesto de la instantánea
+    """
+    df = _preparar(df)
+    mes_fila = meses(df['FECHA']) if 'FECHA' in df.columns else pd.Series('todo', index=df.index)
+    particiones, nuevos, bytes_nuevos = {}, 0, 0
+    for mes, parte in df.groupby(mes_fila, sort=True):
+        parte = parte.reset_index(drop=True)
+        huella = huella_particion(parte)
+        ruta = _ruta_objeto(carpeta, huella)
+        if not os.path.exists(ruta):
+            _escribir_objeto(parte, ruta)
+            nuevos += 1
+            bytes_nuevos += os.path.getsize(ruta)
+        particiones[mes] = {'objeto': huella, 'filas': len(parte)}
+
+    ahora = datetime.now()
+    # El id lleva la fecha con microsegundos y un resumen del contenido
+    contenido = hashlib.sha1(json.dumps(particiones, sort_keys=True).encode()).hexdigest()[:6]
+    manifiesto = {
+        'id': f"{ahora.strftime('%Y%m%dT%H%M%S%f')}_{contenido}",
+        'creado': ahora.isoformat(timespec='microseconds'),
+        'origen': os.path.basename(origen) if origen else None,
+        'filas': len(df),
+        'columnas': list(df.columns),
+        'particiones': particiones
+    }
+    ruta = _ruta_instantanea(carpeta, manifiesto['id'])
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(f'{ruta}.tmp', 'w', encoding='utf-8') as archivo:
+        json.dump(manifiesto, archivo, indent=2, ensure_ascii=False)
+    os.replace(f'{ruta}.tmp', ruta)
+
+    print(f"💾 Respaldo {manifiesto['id']}: {len(particiones)} meses, {nuevos} nuevos "
+          f"({bytes_nuevos / 1024:,.0f} KB escritos)")
+    return manifiesto
+
+def listar_respaldos(carpeta):
+    """Manifiestos de las instantáneas, de la más reciente a la más antigua"""
+    directorio = os.path.join(carpeta_respaldos(carpeta), CARPETA_INSTANTANEAS)
+    if not os.path.isdir(directorio):
+        return []
+    manifiestos = []
+    for nombre in os.listdir(directorio):
+        if not nombre.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directorio, nombre), encoding='utf-8') as archivo:
+                manifiestos.append(json.load(archivo))
+        except ValueError:
+            print(f"⚠️ Manifiesto de respaldo dañado: {nombre}")
+    # Por fecha de creación y no por nombre: el hash del id no dice cuál es más nuevo
+    return sorted(manifiestos, key=lambda m: (datetime.fromisoformat(m['creado']), m['id']), reverse=True)
+
+def podar_respaldos(carpeta, dias=None):
+    """
+    Borrar las instantáneas de más de `dias` días (siempre queda la más reciente) y
+    los objetos que ninguna instantánea usa. Devuelve (instantáneas, objetos) borrados
+    """
+    dias = config.MANTENER_RESPALDOS_DIAS if dias is None else dias
+    limite = datetime.now() - timedelta(days=dias)
+    manifiestos = listar_respaldos(carpeta)
+    vencidos = [m for m in manifiestos[1:] if datetime.fromisoformat(m['creado']) < limite]
+    for manifiesto in vencidos:
+        os.remove(_ruta_instantanea(carpeta, manifiesto['id']))
+
+    en_uso = {particion['objeto'] for manifiesto in manifiestos if manifiesto not in vencidos
+              for particion in manifiesto['particiones'].values()}
+    borrados = 0
+    for raiz, _, archivos in os.walk(os.path.join(carpeta_respaldos(carpeta), CARPETA_OBJETOS)):
+        for nombre in archivos:
+            # También los temporales que dejó un respaldo interrumpido
+            if nombre.endswith('.tmp') or nombre[:-len('.parquet')] not in en_uso:
+                os.remove(os.path.join(raiz, nombre))
+                borrados += 1
+    if vencidos or borrados:
+        print(f"🧹 Respaldos podados: {len(vencidos)} instantáneas y {borrados} objetos")
+    return len(vencidos), borrados
+
+def respaldar_consolidado(df, ruta_consolidado):
+    """Respaldar el consolidado recién guardado y podar los vencidos (un error no detiene la consolidación)"""
+    carpeta = os.path.dirname(os.path.abspath(ruta_consolidado))
+    try:
+        manifiesto = crear_respaldo(df, carpeta, origen=ruta_consolidado)
+        podar_respaldos(carpeta)
+        return manifiesto
+    except ImportError:
+        print("⚠️ Los respaldos requieren pyarrow (pip install pyarrow)")
+    except (OSError, ValueError) as e:
+        print(f"⚠️ No se pudo crear el respaldo: {e}")
+    return None
+
+def restaurar_respaldo(carpeta, id_respaldo=None, inicio=None, fin=None, workers=None):
+    """
+    Filas de una instantánea (la más reciente si no se indica). Con inicio/fin solo
+    se leen los meses que se cruzan con el rango (el filtro exacto lo aplica quien llama)
+    """
+    manifiestos = listar_respaldos(carpeta)
+    if id_respaldo is not None:
+        manifiestos = [m for m in manifiestos if m['id'] == id_respaldo]
+    if not manifiestos:
+        raise FileNotFoundError(f"No se encontró el respaldo {id_respaldo or 'más reciente'} "
+                                f"en {carpeta_respaldos(carpeta)}")
+    manifiesto = manifiestos[0]
+
+    elegidos = sorted(manifiesto['particiones'].items())
+    if inicio is not None or fin is not None:
+        desde = pd.Timestamp(inicio).strftime('%Y-%m') if inicio is not None else '0000-00'
+        hasta = pd.Timestamp(fin).strftime('%Y-%m') if fin is not None else '9999-99'
+        elegidos = [(mes, particion) for mes, particion in elegidos if desde <= mes <= hasta]
+    rutas = [_ruta_objeto(carpeta, particion['objeto']) for _, particion in elegidos]
+    if not rutas:
+        return pd.DataFrame(columns=manifiesto['columnas'])
+
+    # pyarrow libera el GIL al leer: los meses se leen en paralelo
+    with ThreadPoolExecutor(max_workers=workers or min(8, len(rutas))) as pool:
+        partes = list(pool.map(pd.read_parquet, rutas))
+    return pd.concat(partes, ignore_index=True)[manifiesto['columnas']]
@@ -0,0 +1,133 @@
+"""
+🗓️ Resúmenes temporales por día, semana y mes
+Al cargar los datos se agregan TOTAL_VENTA y CANTIDAD por día, semana y mes,
+en total y por categoría y vendedor. Los gráficos temporales piden la serie
+del rango seleccionado y reciben la granularidad más fina que no supere
+config.PUNTOS_MAXIMOS_GRANULARIDAD puntos, sin volver a recorrer las filas.
+"""
+
+import pandas as pd
+
+import config
+
+# De la más fina a la más gruesa: frecuencia de pandas, nombre y días aproximados
+GRANULARIDADES = {
+    'D': ('día', 1),
+    'W-MON': ('semana', 7),
+    'MS': ('mes', 30.44)
+}
+# Periodos de la media móvil según la granularidad (una semana, un mes, un trimestre)
+VENTANA_MEDIA_MOVIL = {'D': 7, 'W-MON': 4, 'MS': 3}
+COLUMNAS_RESUMEN = ['TOTAL_VENTA', 'CANTIDAD']
+DIMENSIONES = ['CATEGORIA', 'VENDEDOR']
+
+def elegir_granularidad(inicio, fin, max_puntos=None):
+    """Granularidad más fina con la que el rango no pasa de max_puntos puntos"""
+    max_puntos = max_puntos or config.PUNTOS_MAXIMOS_GRANULARIDAD
+    dias = (pd.Timestamp(fin) - pd.Timestamp(inicio)).days + 1
+    for granularidad, (_, dias_periodo) in GRANULARIDADES.items():
+        if dias / dias_periodo <= max_puntos:
+            return granularidad
+    return 'MS'
+
+def nombre_granularidad(granularidad):
+    """'día', 'semana' o 'mes'"""
+    return GRANULARIDADES[granularidad][0]
+
+def _resumen_diario(df, dimension=None):
+    """Sumas por día (y por dimensión) con DIAS = 1 para contar los días con ventas al reagrupar"""
+    columnas = [col for col in COLUMNAS_RESUMEN if col in df.columns]
+    fechas = df['FECHA'].dt.normalize()
+    claves = [fechas] if dimension is None else [df[dimension], fechas]
+    diario = df.groupby(claves, observed=True, sort=True)[columnas].sum()
+    diario['DIAS'] = 1
+    return diario
+
+def _reagrupar(diario, granularidad, dimension=None):
+    """Pasar un resumen diario a semanas o meses (el periodo se etiqueta con su primer día)"""
+    if granularidad == 'D':
+        return diario
+    periodo = pd.Grouper(level='FECHA', freq=granularidad, label='left', closed='left')
+    if dimension is None:
+        agrupado = diario.groupby(periodo).sum()
+    else:
+        agrupado = diario.groupby([pd.Grouper(level=dimension), periodo], observed=True).sum()
+    # Los periodos sin ventas aparecen con ceros al reagrupar: se quitan
+    return agrupado[agrupado['DIAS'] > 0]
+
+def _como_serie(tabla):
+    """Índice de fechas a columna FECHA"""
+    return tabla.rename_axis('FECHA').reset_index()
+
+class ResumenTemporal:
+    """Resúmenes por día, semana y mes del DataFrame con el que se construye"""
+    def __init__(self, df):
+        self.df = df
+        self.tablas = {}
+        if df is None or df.empty or 'FECHA' not in df.columns:
+            return
+
+        for dimension in [None] + [dim for dim in DIMENSIONES if dim in df.columns]:
+            diario = _resumen_diario(df, dimension)
+            for granularidad in GRANULARIDADES:
+                self.tablas[(dimension, granularidad)] = _reagrupar(diario, granularidad, dimension)
+
+        fechas = self.tablas[(None, 'D')].index
+        self.inicio, self.fin = fechas.min(), fechas.max()
+
+    def serie(self, inicio=None, fin=None, categoria=None, vendedor=None, granularidad=None):
+        """
+        (serie, granularidad) del rango y del filtro indicados, o (None, None) si el
+        resumen no cubre la combinación (categoría y vendedor a la vez)
+        """
+        if not self.tablas or (categoria is not None and vendedor is not None):
+            return None, None
+
+        dimension, valor = (None, None)
+        if categoria is not None:
+            dimension, valor = 'CATEGORIA', categoria
+        elif vendedor is not None:
+            dimension, valor = 'VENDEDOR', vendedor
+
+        inicio = max(pd.Timestamp(inicio), self.inicio) if inicio is not None else self.inicio
+        fin = min(pd.Timestamp(fin), self.fin) if fin is not None else self.fin
+        granularidad = granularidad or elegir_granularidad(inicio, fin)
+
+        def filas(granularidad_tabla):
+            tabla = self.tablas[(dimension, granularidad_tabla)]
+            if dimension is None:
+                return tabla
+            try:
+                return tabla.xs(valor, level=dimension)
+            except KeyError:
+                return tabla.iloc[0:0].droplevel(dimension)
+
+        if inicio <= self.inicio and fin >= self.fin:
+            # Rango completo: la tabla precalculada sirve tal cual
+            return _como_serie(filas(granularidad)), granularidad
+
+        # Rango parcial: se corta el resumen diario y se reagrupa (los periodos de los
+        # bordes solo suman los días dentro del rango)
+        diario = filas('D').loc[inicio:fin]
+        return _como_serie(_reagrupar(diario, granularidad)), granularidad
+
+def serie_ventas(df_filtrado, resumen=None, inicio=None, fin=None, categoria=None, vendedor=None):
+    """
+    Ventas por periodo (FECHA, TOTAL_VENTA, CANTIDAD, DIAS) con granularidad
+    automática. Usa el resumen precalculado cuando corresponde a los datos y a
+    los filtros; si no, agrega df_filtrado. Devuelve (serie, granularidad)
+    """
+    if resumen is not None:
+        serie, granularidad = resumen.serie(inicio, fin, categoria, vendedor)
+        if serie is not None:
+            return serie, granularidad
+
+    if df_filtrado.empty:
+        return pd.DataFrame(columns=['FECHA'] + COLUMNAS_RESUMEN + ['DIAS']), 'D'
+    diario = _resumen_diario(df_filtrado)
+    granularidad = elegir_granularidad(diario.index.min(), diario.index.max())
+    return _como_serie(_reagrupar(diario, granularidad)), granularidad
+
+def promedio_diario(serie):
+    """Ventas por día con ventas dentro de cada periodo (comparables con predicciones diarias)"""
+    return serie['TOTAL_VENTA'] / serie['DIAS']
@@ -0,0 +1,124 @@
+"""
+🏭 Servicio de los dashboards en producción
+Prepara una sola vez el dataset columnar (Arrow IPC) y el modelo entrenado y
+levanta gunicorn con varios procesos. Cada proceso mapea el dataset en memoria
+y carga el modelo con joblib (mmap): las páginas de ambos archivos se comparten
+entre procesos a través de la caché del sistema operativo, así que la memoria
+por proceso no crece con el número de workers y ningún proceso entrena.
+
+Uso:
+    python main.py servir --tablero ia --workers 4 --host 0.0.0.0
+    gunicorn -w 4 -b 0.0.0.0:8051 "servidor:crear_servidor('ia', '/ruta/a/los/datos')"
+
+Cada worker sirve también la API de solo lectura de api_rest.py (/api/...).
+
+Con config.USAR_BASE_SQL el tablero básico no mapea el dataset: cada worker
+consulta la base SQL (DuckDB o SQLite) en modo de solo lectura.
+
+gunicorn es opcional (pip install gunicorn) y solo funciona en Linux/macOS.
+"""
+
+import importlib.util
+import os
+import subprocess
+import sys
+
+import config
+from almacen_datos import identidad_archivo
+from pipeline import ARCHIVO_CONSOLIDADO, ARCHIVO_DATASET_COMPARTIDO, ARCHIVO_MODELO, ejecutar_pipeline
+
+RAIZ_REPO = os.path.dirname(os.path.abspath(__file__))
+PUERTOS = {'basico': 8050, 'ia': 8051}
+
+def gunicorn_disponible():
+    """gunicorn instalado (no existe en Windows)"""
+    return importlib.util.find_spec('gunicorn') is not None
+
+def _usa_base_sql(tablero):
+    """El tablero básico resuelve filtros y agregados en la base SQL si está activada"""
+    return tablero == 'basico' and config.USAR_BASE_SQL
+
+def preparar_servicio(carpeta, tablero='ia'):
+    """
+    Dejar al día el consolidado, el modelo (solo para el tablero de IA) y el
+    dataset Arrow. El modelo se guarda antes que el dataset porque los workers
+    releen el modelo cuando ven una versión nueva del dataset.
+    """
+    etapas = ['consolidacion', 'entrenamiento'] if tablero == 'ia' else ['consolidacion']
+    if not ejecutar_pipeline(etapas, carpeta=carpeta)['exito']:
+        return False
+    compartidos = ['base_sql'] if _usa_base_sql(tablero) else ['dataset_compartido']
+    return ejecutar_pipeline(compartidos, carpeta=carpeta)['exito']
+
+
+def crear_servidor(tablero='ia', carpeta=None):
+    """
+    Aplicación WSGI para gunicorn. Cada worker llama a esta función al arrancar y
+    abre los archivos compartidos que dejó preparar_servicio.
+    """
+    carpeta = carpeta or os.getcwd()
+    if _usa_base_sql(tablero):
+        from backend_sql import archivo_base_sql
+
+        dataset = os.path.join(carpeta, archivo_base_sql())
+    else:
+        dataset = os.path.join(carpeta, ARCHIVO_DATASET_COMPARTIDO)
+    if not os.path.exists(dataset):
+        raise FileNotFoundError(f"No se encontró {dataset}. Ejecuta primero: python main.py servir --workers N")
+
+    if tablero == 'ia':
+        from dashboard_ia import DashboardIA
+
+        modelo = os.path.join(carpeta, ARCHIVO_MODELO)
+        tablero_dash = DashboardIA(dataset, archivo_modelo=modelo if os.path.exists(modelo) else None,
+                                   carpeta_datos=carpeta)
+    else:
+        from dashboard import DashboardVentas
+
+        tablero_dash = DashboardVentas(dataset)
+
+    if config.AUTOREFRESH_DASHBOARD and not _usa_base_sql(tablero):
+        tablero_dash.almacen.iniciar_vigilancia()
+    return tablero_dash.app.server
+
+def servir_produccion(tablero, carpeta, workers, host='127.0.0.1', puerto=None):
+    """
+    Preparar los archivos compartidos y ejecutar gunicorn en primer plano.
+    Con AUTOREFRESH_DASHBOARD, este proceso vigila el consolidado y regenera el
+    modelo y el dataset cuando cambia; los workers recargan la versión nueva solos.
+    """
+    if not gunicorn_disponible():
+        print("❌ gunicorn no está instalado. Instala: pip install gunicorn")
+        return False
+
+    print(f"🏭 Preparando dataset{' y modelo' if tablero == 'ia' else ''} compartidos...")
+    if not preparar_servicio(carpeta, tablero):
+        return False
+
+    puerto = puerto or PUERTOS[tablero]
+    comando = [sys.executable, '-m', 'gunicorn',
+               '--workers', str(workers),
+               '--bind', f'{host}:{puerto}',
+               '--pythonpath', RAIZ_REPO,
+               '--chdir', carpeta,
+               f'servidor:crear_servidor({tablero!r}, {carpeta!r})']
+    print(f"🚀 Sirviendo '{tablero}' con {workers} workers en http://{host}:{puerto}")
+    proceso = subprocess.Popen(comando)
+
+    consolidado = os.path.join(carpeta, ARCHIVO_CONSOLIDADO)
+    identidad = identidad_archivo(consolidado)
+    try:
+        while True:
+            try:
+                return proceso.wait(timeout=config.INTERVALO_ACTUALIZACION_SEGUNDOS) == 0
+            except subprocess.TimeoutExpired:
+                pass
+            if not config.AUTOREFRESH_DASHBOARD or identidad_archivo(consolidado) == identidad:
+                continue
+            print("🔄 Nuevo consolidado: regenerando los archivos compartidos...")
+            identidad = identidad_archivo(consolidado)
+            preparar_servicio(carpeta, tablero)
+    except KeyboardInterrupt:
+        proceso.terminate()
+        proceso.wait()
+        return True